@@ -0,0 +1,303 @@
+#############################################################################
+# ParaTrac: Scalable Tracking Tools for Parallel Applications
+# Copyright (C) 2009,2010  Nan Dun <dunnan@yl.is.s.u-tokyo.ac.jp>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#############################################################################
+
+#
+# fs/analysis.py
+# Vectorized analysis of system call streams
+#
+# All routines take numpy arrays (one element per system call) and
+# avoid per-call Python loops, so they scale to very large traces.
+#
+
+import numpy
+
+#
+# Access pattern classification
+#
+ACCESS_SEQUENTIAL = 0
+ACCESS_STRIDED = 1
+ACCESS_BACKWARD = 2
+ACCESS_RANDOM = 3
+ACCESS_CLASSES = ["sequential", "strided", "backward", "random"]
+
+def stream_order(pid, fid, stamp):
+    """Return indices sorting calls by (pid, fid) stream, then by stamp"""
+    return numpy.lexsort((stamp, fid, pid))
+
+def stream_starts(pid, fid):
+    """Return a boolean mask of the first call of each (pid, fid) stream,
+    given calls already sorted by stream"""
+    n = len(pid)
+    start = numpy.ones(n, dtype=bool)
+    if n > 1:
+        start[1:] = (pid[1:] != pid[:-1]) | (fid[1:] != fid[:-1])
+    return start
+
+def access_pattern(pid, fid, stamp, offset, length):
+    """Classify each request of its (pid, fid) stream as sequential,
+    strided, backward or random
+
+    A request is sequential if it starts where the previous one ended,
+    backward if it starts before the previous one, strided if it skips
+    the same gap as a neighbouring request, and random otherwise. The
+    first request of a stream is sequential only if it starts at 0,
+    and random otherwise.
+
+    Return (order, cls, start): order sorts the input into streams, cls
+    and start are the class and first-of-stream mask of sorted requests.
+    """
+    order = stream_order(pid, fid, stamp)
+    pid = pid[order]
+    fid = fid[order]
+    off = offset[order].astype(numpy.int64)
+    length = length[order].astype(numpy.int64)
+    n = len(order)
+
+    start = stream_starts(pid, fid)
+    gap = numpy.empty(n, dtype=numpy.int64)
+    gap[start] = off[start]
+    if n > 1:
+        gap[1:][~start[1:]] = (off[1:] - off[:-1] - length[:-1])[~start[1:]]
+
+    backward = numpy.zeros(n, dtype=bool)
+    if n > 1:
+        backward[1:] = ~start[1:] & (off[1:] < off[:-1])
+
+    # strided: same non-zero gap as the previous or the next request
+    same_gap = numpy.zeros(n, dtype=bool)
+    if n > 1:
+        pair = ~start[1:] & ~start[:-1] & (gap[1:] == gap[:-1])
+        same_gap[1:] |= pair
+        same_gap[:-1] |= pair
+    strided = same_gap & (gap != 0) & ~backward
+
+    cls = numpy.empty(n, dtype=numpy.int8)
+    cls.fill(ACCESS_RANDOM)
+    cls[strided] = ACCESS_STRIDED
+    cls[backward] = ACCESS_BACKWARD
+    cls[gap == 0] = ACCESS_SEQUENTIAL
+    return order, cls, start
+
+def access_runs(cls, start):
+    """Return (run_cls, run_len) of maximal runs of the same class
+    within each stream"""
+    n = len(cls)
+    if n == 0:
+        return numpy.zeros(0, dtype=cls.dtype), numpy.zeros(0, dtype=int)
+    boundary = start.copy()
+    boundary[1:] |= cls[1:] != cls[:-1]
+    idx = numpy.flatnonzero(boundary)
+    run_len = numpy.diff(numpy.append(idx, n))
+    return cls[idx], run_len
+
+def access_summary(cls, start, length):
+    """Return per-class rows of (class, count, bytes, runs, avg run length,
+    max run length)"""
+    nc = len(ACCESS_CLASSES)
+    count = numpy.bincount(cls, minlength=nc)
+    nbytes = numpy.bincount(cls, weights=length, minlength=nc)
+    run_cls, run_len = access_runs(cls, start)
+    runs = numpy.bincount(run_cls, minlength=nc)
+    rows = []
+    for c in range(0, nc):
+        if runs[c] > 0:
+            avg_run = float(count[c]) / runs[c]
+            max_run = int(run_len[run_cls == c].max())
+        else:
+            avg_run = 0.0
+            max_run = 0
+        rows.append((ACCESS_CLASSES[c], int(count[c]), int(nbytes[c]),
+            int(runs[c]), avg_run, max_run))
+    return rows
+
+def group_classes(keys, cls, length):
+    """Return (uniq, counts, bytes) where counts and bytes are arrays of
+    shape (len(uniq), number of classes) aggregated by keys"""
+    nc = len(ACCESS_CLASSES)
+    uniq, inv = numpy.unique(keys, return_inverse=True)
+    cell = inv * nc + cls
+    size = len(uniq) * nc
+    counts = numpy.bincount(cell, minlength=size).reshape(len(uniq), nc)
+    nbytes = numpy.bincount(cell, weights=length,
+        minlength=size).reshape(len(uniq), nc)
+    return uniq, counts, nbytes
+
+def session_ids(pid, fid, is_open, is_close):
+    """Return session number of each call, given calls sorted by
+    (pid, fid) stream and stamp
+
+    A session starts at the first call of a stream, at every open and
+    right after every close, so opens and closes pair in stamp order.
+    """
+    start = stream_starts(pid, fid) | is_open
+    start[1:] |= is_close[:-1]
+    return numpy.cumsum(start) - 1
+
+#
+# Request size histograms
+#
+SIZE_BUCKETS = 48
+
+def size_bucket(length):
+    """Return log2 bucket of each request size
+
+    Bucket 0 holds empty (or failed) requests, bucket k > 0 holds sizes
+    in [2^(k-1), 2^k). Sizes beyond the last bucket are clamped to it.
+    """
+    length = numpy.asarray(length, dtype=numpy.int64)
+    bucket = numpy.zeros(len(length), dtype=numpy.int64)
+    nz = length > 0
+    bucket[nz] = numpy.floor(numpy.log2(length[nz])).astype(numpy.int64) + 1
+    return numpy.minimum(bucket, SIZE_BUCKETS - 1)
+
+def bucket_histogram(keys, bucket):
+    """Return (uniq, hist) where hist[i] counts buckets of the calls
+    whose key is uniq[i], in one bincount pass"""
+    uniq, inv = numpy.unique(keys, return_inverse=True)
+    size = len(uniq) * SIZE_BUCKETS
+    hist = numpy.bincount(inv * SIZE_BUCKETS + bucket, minlength=size)
+    return uniq, hist.reshape(len(uniq), SIZE_BUCKETS)
+
+def bucket_lower(k):
+    """Return the smallest size in bytes of bucket k"""
+    if k == 0: return 0
+    return 2 ** (k - 1)
+
+#
+# Latency heatmaps
+#
+HEATMAP_MIN = 1.0e-7
+HEATMAP_ROWS_PER_DECADE = 4
+HEATMAP_ROWS = 8 * HEATMAP_ROWS_PER_DECADE + 2
+
+def latency_row(elapsed):
+    """Return log bucket of each latency in seconds
+
+    Row 0 holds latencies below HEATMAP_MIN, row k > 0 holds latencies
+    in [HEATMAP_MIN * 10^((k-1)/R), HEATMAP_MIN * 10^(k/R)) with R rows
+    per decade. Latencies beyond the last row are clamped to it.
+    """
+    elapsed = numpy.asarray(elapsed, dtype=numpy.float64)
+    row = numpy.zeros(len(elapsed), dtype=numpy.int64)
+    nz = elapsed >= HEATMAP_MIN
+    row[nz] = numpy.floor(numpy.log10(elapsed[nz] / HEATMAP_MIN) *
+        HEATMAP_ROWS_PER_DECADE).astype(numpy.int64) + 1
+    return numpy.minimum(row, HEATMAP_ROWS - 1)
+
+def latency_row_lower(k):
+    """Return the smallest latency in seconds of row k"""
+    if k == 0: return 0.0
+    return HEATMAP_MIN * 10.0 ** (float(k - 1) / HEATMAP_ROWS_PER_DECADE)
+
+def heatmap(keys, col, row, nkeys, ncols):
+    """Return counts[nkeys, ncols, HEATMAP_ROWS] of calls by key, time
+    column and latency row in one bincount pass"""
+    size = nkeys * ncols * HEATMAP_ROWS
+    cell = (numpy.asarray(keys, dtype=numpy.int64) * ncols + col) * \
+        HEATMAP_ROWS + row
+    return numpy.bincount(cell, minlength=size).reshape(nkeys, ncols,
+        HEATMAP_ROWS)
+
+#
+# Grouped aggregation
+#
+def group_sum(keys, weights=None):
+    """Return (uniq, sums) of weights (or counts if None) grouped by keys"""
+    uniq, inv = numpy.unique(keys, return_inverse=True)
+    return uniq, numpy.bincount(inv, weights=weights, minlength=len(uniq))
+
+#
+# Concurrency (in-flight calls) by sweep line
+#
+def sweep_events(keys, start, end):
+    """Return (keys, times, delta) of +1 start and -1 end events sorted
+    by key and time, ends before starts at equal times"""
+    n = len(start)
+    keys = numpy.concatenate((keys, keys))
+    times = numpy.concatenate((start, end)).astype(numpy.float64)
+    delta = numpy.concatenate((numpy.ones(n, dtype=numpy.int64),
+        -numpy.ones(n, dtype=numpy.int64)))
+    order = numpy.lexsort((delta, times, keys))
+    return keys[order], times[order], delta[order]
+
+def concurrency(start, end):
+    """Return (times, level) step function of number of calls in flight,
+    level[i] holds during [times[i], times[i+1])"""
+    _, times, delta = sweep_events(numpy.zeros(len(start), dtype=int),
+        start, end)
+    return times, numpy.cumsum(delta)
+
+def group_concurrency(keys, start, end):
+    """Return (uniq, peak, avg, busy) of in-flight calls grouped by keys
+
+    peak is the maximum number of calls in flight, avg the time-weighted
+    average over the span from first start to last end, and busy the
+    fraction of that span with at least one call in flight. Since every
+    group opens and closes as many calls, a single cumsum over events
+    sorted by key gives the in-flight level of each group."""
+    keys, times, delta = sweep_events(keys, start, end)
+    level = numpy.cumsum(delta)
+    first = numpy.ones(len(keys), dtype=bool)
+    first[1:] = keys[1:] != keys[:-1]
+    idx = numpy.flatnonzero(first)
+    uniq = keys[idx]
+    if len(idx) == 0: peak = numpy.zeros(0, dtype=level.dtype)
+    else: peak = numpy.maximum.reduceat(level, idx)
+    
+    # duration of each step, the last step of a group has none
+    dt = numpy.zeros(len(times))
+    dt[:-1] = times[1:] - times[:-1]
+    dt[idx[1:] - 1] = 0.0
+    gid = numpy.cumsum(first) - 1
+    ng = len(uniq)
+    span = numpy.bincount(gid, weights=dt, minlength=ng)
+    area = numpy.bincount(gid, weights=dt * level, minlength=ng)
+    busy = numpy.bincount(gid, weights=dt * (level > 0), minlength=ng)
+    nz = span > 0
+    avg = numpy.zeros(ng)
+    avg[nz] = area[nz] / span[nz]
+    avg[~nz] = peak[~nz]
+    frac = numpy.ones(ng)
+    frac[nz] = busy[nz] / span[nz]
+    return uniq, peak, avg, frac
+
+def step_maxima(times, level, bins):
+    """Downsample a step function to the maximum level within each of
+    bins equal time windows, return (window start, maximum)"""
+    if len(times) == 0: return numpy.zeros(0), numpy.zeros(0, dtype=int)
+    lo, hi = times[0], times[-1]
+    width = max((hi - lo) / bins, 1.0e-9)
+    w = numpy.minimum(((times - lo) / width).astype(numpy.int64), bins - 1)
+    wstart = lo + numpy.arange(bins) * width
+    # level entered with each window, then maxima of steps within it
+    peak = level[numpy.searchsorted(times, wstart, side="right") - 1]
+    numpy.maximum.at(peak, w, level)
+    return wstart, peak
+
+#
+# Byte range coverage
+#
+def coverage(keys, start, end):
+    """Return (keys, lo, hi, depth) of elementary byte ranges [lo, hi)
+    and the number of intervals covering them, sorted by key and offset,
+    uncovered ranges omitted"""
+    keys, pos, delta = sweep_events(keys, start, end)
+    depth = numpy.cumsum(delta)
+    sel = (keys[1:] == keys[:-1]) & (pos[1:] > pos[:-1]) & (depth[:-1] > 0)
+    return keys[:-1][sel], pos[:-1][sel].astype(numpy.int64), \
+        pos[1:][sel].astype(numpy.int64), depth[:-1][sel]
@@ -0,0 +1,204 @@
+#############################################################################
+# ParaTrac: Scalable Tracking Tools for Parallel Applications
+# Copyright (C) 2009,2010  Nan Dun <dunnan@yl.is.s.u-tokyo.ac.jp>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#############################################################################
+
+#
+# fs/bench.py
+# End-to-end benchmark of trace import, report and plotting
+#
+# Each case runs in a forked child so that its peak resident memory is
+# measured in isolation and a failing case does not affect the others.
+#
+
+import os
+import sys
+import time
+import json
+import resource
+
+import version
+from modules.prof import rss_kb
+
+class Benchmark:
+    def __init__(self, path, repeat=1):
+        self.path = os.path.abspath(path)
+        self.dbpath = "%s/trace.sqlite" % self.path
+        self.repeat = max(repeat, 1)
+        self.cases = self._cases()
+
+    def _cases(self):
+        """Return list of (name, setup, run), setup is called in the child
+        before timing starts and its result is passed to run"""
+        dbpath = self.dbpath
+        fdir = "%s/report/figures" % self.path
+        def new_db():
+            import data
+            return data.Database(dbpath)
+        def new_report():
+            import report
+            return report.Report(dbpath)
+        def new_html_report():
+            import report
+            return report.HTMLReport(dbpath)
+        def new_text_report():
+            import report
+            return report.HTMLReport(dbpath, figures=False)
+        def new_workflow(db=None):
+            import plot
+            if db is None: db = new_db()
+            return plot.WorkflowDAG(db)
+
+        return [
+            ("import", new_db, lambda d:d.import_logs()),
+            ("section.sysc", new_report, lambda r:r.sysc_stats(False)),
+            ("section.io", new_report, lambda r:r.io_stats(False)),
+            ("section.iosize", new_report, lambda r:map(r.iosize_stats,
+                ["sysc", "file", "proc"])),
+            ("section.hotspot", new_report, lambda r:r.hotspot_stats()),
+            ("section.outlier", new_report, lambda r:r.outlier_stats()),
+            ("section.access", new_report, lambda r:r.access_stats()),
+            ("section.session", new_report, lambda r:r.session_stats()),
+            ("section.failure", new_report, lambda r:r.failure_stats()),
+            ("section.cache", new_report, lambda r:(r.cache_stats("file"),
+                r.cache_stats("block"))),
+            ("section.reuse", new_report, lambda r:r.reuse_stats()),
+            ("section.readahead", new_report, lambda r:r.readahead_stats()),
+            ("section.dataflow", new_report, lambda r:r.dataflow_stats()),
+            ("section.overwrite", new_report, lambda r:r.overwrite_stats()),
+            ("section.lifecycle", new_report, lambda r:r.lifecycle_stats()),
+            ("section.sched", new_report, lambda r:r.sched_stats()),
+            ("section.proctree", new_report, lambda r:r.proctree_stats()),
+            ("section.concurrency", new_report, 
+                lambda r:r.concurrency_stats()),
+            ("section.proc", new_report, lambda r:r.proc_stats()),
+            ("workflow.build", new_db, new_workflow),
+            ("workflow.critical_path", new_workflow, 
+                lambda g:g.critical_path()),
+            ("section.heatmap", new_report, lambda r:r.latency_heatmap()),
+            ("plot.sysc", new_report, lambda r:r.sysc_stats(True)),
+            ("plot.io", new_report, lambda r:r.io_stats(True)),
+            ("plot.workflow", new_workflow,
+                lambda g:g.draw("%s/workflow.png" % fdir)),
+            ("report", new_html_report, lambda r:r.write()),
+            ("report.nofigures", new_text_report, lambda r:r.write()),
+        ]
+
+    def names(self):
+        return map(lambda c:c[0], self.cases)
+
+    def run(self, names=None, verbose=True):
+        """Run selected cases (all if None), return results dict"""
+        results = {}
+        for name, setup, run in self.cases:
+            if names is not None and name not in names: continue
+            if verbose:
+                sys.stdout.write("%-24s " % name)
+                sys.stdout.flush()
+            best = None
+            for i in range(0, self.repeat):
+                res = self.measure(setup, run)
+                if best is None or res.has_key("error"): best = res
+                elif not best.has_key("error"):
+                    best["wall"] = min(best["wall"], res["wall"])
+                    best["cpu"] = min(best["cpu"], res["cpu"])
+                    best["peak_rss"] = max(best["peak_rss"], res["peak_rss"])
+                    best["rss_growth"] = max(best["rss_growth"],
+                        res["rss_growth"])
+                if res.has_key("error"): break
+            results[name] = best
+            if verbose:
+                if best.has_key("error"):
+                    sys.stdout.write("error: %s\n" % best["error"])
+                else:
+                    sys.stdout.write("%10.3fs wall %10.3fs cpu %10dKB rss\n"
+                        % (best["wall"], best["cpu"], best["rss_growth"]))
+        return results
+
+    def measure(self, setup, run):
+        """Run one case in a forked child, return dict of wall time,
+        cpu time, peak RSS and RSS growth (KB), or error"""
+        rfd, wfd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(rfd)
+            try:
+                arg = setup()
+                rss0 = rss_kb()
+                c0 = os.times()
+                t0 = time.time()
+                run(arg)
+                t1 = time.time()
+                c1 = os.times()
+                peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                res = {"wall":t1 - t0,
+                    "cpu":(c1[0] + c1[1]) - (c0[0] + c0[1]),
+                    "peak_rss":peak, "rss_growth":max(peak - rss0, 0)}
+            except Exception, e:
+                res = {"error":"%s: %s" % (e.__class__.__name__, e)}
+            os.write(wfd, json.dumps(res))
+            os.close(wfd)
+            os._exit(0)
+
+        os.close(wfd)
+        chunks = []
+        while True:
+            buf = os.read(rfd, 4096)
+            if buf == "": break
+            chunks.append(buf)
+        os.close(rfd)
+        _, status = os.waitpid(pid, 0)
+        if len(chunks) == 0:
+            return {"error":"child exited with status %d" % status}
+        return json.loads("".join(chunks))
+
+    def save(self, results, path, scale=None):
+        """Save results as JSON baseline"""
+        f = open(path, "w")
+        json.dump({"paratrac":version.PARATRAC_VERSION,
+            "date":time.strftime("%Y-%m-%d %H:%M:%S"),
+            "trace":self.path, "scale":scale, "results":results},
+            f, indent=1, sort_keys=True)
+        f.close()
+
+    def compare(self, results, path, tolerance=0.1):
+        """Print results against JSON baseline, return names of cases
+        slower or larger than baseline by more than tolerance"""
+        f = open(path)
+        base = json.load(f)["results"]
+        f.close()
+        regressions = []
+        sys.stdout.write("%-24s %10s %10s %7s %10s %10s %7s\n" % ("case",
+            "wall", "base", "ratio", "rss", "base", "ratio"))
+        for name in self.names():
+            if not results.has_key(name) or not base.has_key(name): continue
+            r, b = results[name], base[name]
+            if r.has_key("error") or b.has_key("error"):
+                sys.stdout.write("%-24s %s\n" % (name,
+                    r.get("error", "baseline error")))
+                continue
+            wr = r["wall"] / max(b["wall"], 1.0e-6)
+            mr = float(r["rss_growth"] + 1) / (b["rss_growth"] + 1)
+            mark = ""
+            if wr > 1 + tolerance or mr > 1 + tolerance:
+                regressions.append(name)
+                mark = " *"
+            sys.stdout.write("%-24s %10.3f %10.3f %7.2f %10d %10d %7.2f%s\n"
+                % (name, r["wall"], b["wall"], wr, r["rss_growth"],
+                b["rss_growth"], mr, mark))
+        return regressions
+
+__all__ = ["Benchmark"]
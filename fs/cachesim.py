@@ -0,0 +1,308 @@
+#############################################################################
+# ParaTrac: Scalable Tracking Tools for Parallel Applications
+# Copyright (C) 2009,2010  Nan Dun <dunnan@yl.is.s.u-tokyo.ac.jp>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#############################################################################
+
+#
+# fs/cachesim.py
+# What-if cache simulation over the system call stream
+#
+# The stream is replayed once in stamp order, every access is fed to a
+# cache of each policy and size, so memory is bounded by the caches and
+# one chunk of calls. ARC and CLOCK cost O(1) per access and LFU
+# O(log n), LRU costs O(log n) per access for all sizes together.
+#
+
+import heapq
+from itertools import imap
+from collections import OrderedDict
+
+import numpy
+
+from modules.utils import SYSCALL
+from modules import verbose
+
+class LRUCache:
+    def __init__(self, size):
+        self.size = size
+        self.keys = OrderedDict()
+
+    def access(self, key):
+        keys = self.keys
+        if key in keys:
+            del keys[key]
+            keys[key] = True
+            return True
+        if len(keys) >= self.size: keys.popitem(last=False)
+        keys[key] = True
+        return False
+
+class LFUCache:
+    """Least frequently used, ties broken by least recent, the victim is
+    found through a min-heap with lazy deletion of stale entries"""
+    def __init__(self, size):
+        self.size = size
+        self.freq = {}
+        self.heap = []
+        self.tick = 0
+
+    def access(self, key):
+        self.tick += 1
+        freq = self.freq
+        if key in freq:
+            freq[key] = (freq[key][0] + 1, self.tick)
+            heapq.heappush(self.heap, freq[key] + (key,))
+            if len(self.heap) > 4 * self.size: self._rebuild()
+            return True
+        if len(freq) >= self.size:
+            while True:
+                f, t, victim = heapq.heappop(self.heap)
+                if freq.get(victim) == (f, t): break
+            del freq[victim]
+        freq[key] = (1, self.tick)
+        heapq.heappush(self.heap, (1, self.tick, key))
+        return False
+
+    def _rebuild(self):
+        self.heap = map(lambda (k,(f,t)):(f, t, k), self.freq.items())
+        heapq.heapify(self.heap)
+
+class ARCCache:
+    """Adaptive replacement cache (Megiddo and Modha, FAST 2003)"""
+    def __init__(self, size):
+        self.size = size
+        self.p = 0
+        self.t1 = OrderedDict()
+        self.t2 = OrderedDict()
+        self.b1 = OrderedDict()
+        self.b2 = OrderedDict()
+
+    def _replace(self, in_b2):
+        if len(self.t1) > 0 and (len(self.t1) > self.p or
+            (in_b2 and len(self.t1) == self.p)):
+            key, _ = self.t1.popitem(last=False)
+            self.b1[key] = True
+        elif len(self.t2) > 0:
+            key, _ = self.t2.popitem(last=False)
+            self.b2[key] = True
+
+    def access(self, key):
+        t1, t2, b1, b2 = self.t1, self.t2, self.b1, self.b2
+        if key in t1:
+            del t1[key]
+            t2[key] = True
+            return True
+        if key in t2:
+            del t2[key]
+            t2[key] = True
+            return True
+        c = self.size
+        if key in b1:
+            self.p = min(c, self.p + max(len(b2) / max(len(b1), 1), 1))
+            self._replace(False)
+            del b1[key]
+            t2[key] = True
+            return False
+        if key in b2:
+            self.p = max(0, self.p - max(len(b1) / max(len(b2), 1), 1))
+            self._replace(True)
+            del b2[key]
+            t2[key] = True
+            return False
+        l1 = len(t1) + len(b1)
+        if l1 == c:
+            if len(t1) < c:
+                b1.popitem(last=False)
+                self._replace(False)
+            else:
+                t1.popitem(last=False)
+        elif l1 < c and l1 + len(t2) + len(b2) >= c:
+            if l1 + len(t2) + len(b2) == 2 * c: b2.popitem(last=False)
+            self._replace(False)
+        t1[key] = True
+        return False
+
+class CLOCKCache:
+    """Second chance approximation of LRU over a ring of slots"""
+    def __init__(self, size):
+        self.size = size
+        self.slots = []
+        self.ref = []
+        self.index = {}
+        self.hand = 0
+
+    def access(self, key):
+        i = self.index.get(key)
+        if i is not None:
+            self.ref[i] = True
+            return True
+        if len(self.slots) < self.size:
+            self.index[key] = len(self.slots)
+            self.slots.append(key)
+            self.ref.append(False)
+            return False
+        ref = self.ref
+        while ref[self.hand]:
+            ref[self.hand] = False
+            self.hand = (self.hand + 1) % self.size
+        del self.index[self.slots[self.hand]]
+        self.slots[self.hand] = key
+        self.index[key] = self.hand
+        self.hand = (self.hand + 1) % self.size
+        return False
+
+POLICIES = OrderedDict([("LRU", LRUCache), ("LFU", LFUCache),
+    ("ARC", ARCCache), ("CLOCK", CLOCKCache)])
+
+class CacheSim:
+    """Replay system calls through caches of several policies and sizes
+
+    At file granularity every call on a file is an access to it. At
+    block granularity read/write requests access each block they cover
+    and the latency of a call is shared evenly among its blocks.
+    """
+    def __init__(self, db, block_size=4096):
+        self.db = db
+        self.block_size = block_size
+        self.FILE_SYSCALLS = map(lambda s:SYSCALL[s], ["lstat", "fstat",
+            "access", "readlink", "open", "creat", "truncate", "utime",
+            "read", "write"])
+        self.BLOCK_SYSCALLS = [SYSCALL["read"], SYSCALL["write"]]
+
+    def sizes(self, granularity, steps=8):
+        """Return a geometric sweep of cache sizes in entries up to the
+        number of distinct files or blocks touched"""
+        if granularity == "file":
+            self.db.cur.execute("SELECT COUNT(DISTINCT fid) FROM sysc%s"
+                % self.db.sysc_where())
+            n = self.db.cur.fetchone()[0] or 0
+        else:
+            self.db.cur.execute("SELECT MAX(aux2+aux1) FROM sysc%s "
+                "GROUP BY fid" % self.db.sysc_where(["sysc IN (%s)" 
+                % ",".join(map(str, self.BLOCK_SYSCALLS))]))
+            n = sum(map(lambda r:(r[0] + self.block_size - 1)
+                / self.block_size, self.db.cur.fetchall()))
+        if n <= 1: return [1]
+        sizes = numpy.unique(numpy.logspace(0, numpy.log10(n),
+            steps).astype(int))
+        return sizes.tolist()
+
+    def _key_layout(self):
+        """Number files touched by reads and writes densely by fid and
+        shift the numbers above the bits of the largest block, so a
+        (fid, block) pair is one unique int64 key"""
+        where = self.db.sysc_where(["sysc IN (%s)" % ",".join(map(str,
+            self.BLOCK_SYSCALLS)), "aux1>0"])
+        self.db.cur.execute("SELECT DISTINCT fid FROM sysc%s" % where)
+        self.fids = numpy.array(sorted(map(lambda r:r[0],
+            self.db.cur.fetchall())), dtype=numpy.int64)
+        self.db.cur.execute("SELECT MAX(aux2+aux1) FROM sysc%s" % where)
+        last = self.db.cur.fetchone()[0] or 1
+        self.shift = max(int((last - 1) / self.block_size).bit_length(), 1)
+        if max(len(self.fids) - 1, 0).bit_length() + self.shift > 63:
+            raise ValueError("%d files of up to %d blocks exceed 64-bit "
+                "block keys" % (len(self.fids), 1 << self.shift))
+
+    def key_fids(self, keys):
+        """Return fids of block keys yielded by accesses"""
+        return self.fids[numpy.asarray(keys, dtype=numpy.int64) >>
+            self.shift]
+
+    def accesses(self, granularity):
+        """Yield (keys, latency) arrays of accesses chunk by chunk, keys
+        are fids or block keys (see key_fids)"""
+        if granularity == "file": scs = self.FILE_SYSCALLS
+        else:
+            scs = self.BLOCK_SYSCALLS
+            self._key_layout()
+        bs = self.block_size
+        for calls in self.db.sysc_chunks("sysc,fid,elapsed,aux1,aux2",
+            order="stamp"):
+            calls = calls[numpy.in1d(calls.sysc, scs)]
+            if granularity == "file":
+                yield calls.fid, calls.elapsed
+                continue
+            calls = calls[calls.aux1 > 0]
+            first = calls.aux2 / bs
+            nblk = (calls.aux2 + calls.aux1 - 1) / bs - first + 1
+            call = numpy.repeat(numpy.arange(len(calls)), nblk)
+            step = numpy.arange(len(call)) - numpy.repeat(
+                numpy.cumsum(nblk) - nblk, nblk)
+            block = (first[call] + step).astype(numpy.int64)
+            rank = numpy.searchsorted(self.fids, calls.fid[call])
+            keys = (rank.astype(numpy.int64) << self.shift) | block
+            yield keys, (calls.elapsed / nblk)[call]
+
+    def run(self, granularity="file", policies=None, sizes=None):
+        """Simulate, return dict of policy to rows of (size, accesses,
+        hits, hit ratio, saved latency)
+
+        Each cache takes a whole chunk of accesses at a time. LRU caches
+        are not simulated one by one: by stack inclusion a cache of size
+        c hits exactly the accesses of stack distance below c, so one
+        pass of reuse.StackDistance serves every size.
+        """
+        # reuse imports this module
+        import reuse
+        if policies is None: policies = POLICIES.keys()
+        if sizes is None: sizes = self.sizes(granularity)
+        sizes = numpy.asarray(sizes, dtype=numpy.int64)
+        caches = []
+        for p in policies:
+            if p == "LRU": continue
+            for size in sizes.tolist():
+                caches.append((p, size, POLICIES[p](size).access))
+        hits = numpy.zeros(len(caches), dtype=numpy.int64)
+        saved = numpy.zeros(len(caches))
+        stack = None
+        if "LRU" in policies: stack = reuse.StackDistance()
+        lru_hits = numpy.zeros(len(sizes), dtype=numpy.int64)
+        lru_saved = numpy.zeros(len(sizes))
+        total = 0
+        for keys, lat in self.accesses(granularity):
+            n = len(keys)
+            total += n
+            keys = keys.tolist()
+            for i, (_, _, access) in enumerate(caches):
+                h = numpy.fromiter(imap(access, keys), dtype=bool, count=n)
+                hits[i] += h.sum()
+                saved[i] += lat[h].sum()
+            if stack is not None:
+                d = numpy.fromiter(imap(stack.access, keys),
+                    dtype=numpy.int64, count=n)
+                warm = d >= 0
+                order = numpy.argsort(d[warm], kind="mergesort")
+                d = d[warm][order]
+                cum = numpy.append(0.0, numpy.cumsum(lat[warm][order]))
+                k = numpy.searchsorted(d, sizes)
+                lru_hits += k
+                lru_saved += cum[k]
+            verbose.advance(n)
+
+        res = OrderedDict()
+        i = 0
+        for p in policies:
+            if p == "LRU": h, sv = lru_hits, lru_saved
+            else:
+                h, sv = hits[i:i+len(sizes)], saved[i:i+len(sizes)]
+                i += len(sizes)
+            res[p] = map(lambda (size, n, l):(size, total, n,
+                float(n) / max(total, 1), l), zip(sizes.tolist(),
+                h.tolist(), sv.tolist()))
+        return res
+
+__all__ = ["CacheSim", "POLICIES", "LRUCache", "LFUCache", "ARCCache",
+    "CLOCKCache"]
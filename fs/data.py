@@ -24,10 +24,16 @@
 import os
 import sys
 
+import numpy
+
 from modules.utils import SYSCALL
 from modules import utils
 from modules import num 
+from modules import prof
+from modules import verbose
 from modules.data import Database as CommonDatabase
+import analysis
+import proctree
 
 class Database(CommonDatabase):
     def __init__(self, path):
@@ -36,9 +42,19 @@ class Database(CommonDatabase):
         # Only attributes can be accurately queried
         self.SYSC_ATTR = ["iid", "stamp", "pid", "sysc", "fid", "res",
             "elapsed", "aux1", "aux2"]
+        self.SYSC_DTYPE = {"iid":numpy.int32, "stamp":numpy.float64,
+            "pid":numpy.int64, "sysc":numpy.int32, "fid":numpy.int64,
+            "res":numpy.int64, "elapsed":numpy.float64, 
+            "aux1":numpy.int64, "aux2":numpy.int64}
+        self.FETCH_ROWS = 65536
         self.FILE_ATTR = ["iid", "fid", "path"]
         self.PROC_ATTR = ["iid", "pid", "ppid", "live", 
             "res", "cmdline", "environ"]
+        # conditions of the scope set by set_scope()
+        self.scope = (None, None, None)
+        self.SYSC_SCOPE = []
+        self.PROC_SCOPE = []
+        self.scoped_tabs = set()
 
     def _set_tabs(self):
         self.tab["runtime"] = "item TEXT, value TEXT"
@@ -53,6 +69,27 @@ class Database(CommonDatabase):
             "live INTEGER, res INTEGER, btime FLOAT, elapsed FLOAT, " \
             "utime FLOAT, stime FLOAT, cmdline TEXT, environ TEXT"
         
+        # log2 request size histograms, hist stores bucket lo and onwards
+        self.tab["sizehist"] = "sysc INTEGER, kind TEXT, id INTEGER, " \
+            "lo INTEGER, hist BLOB"
+        
+        # open-to-close sessions, sysc is the opening syscall or 0 if the
+        # file was opened before tracing, offsets are -1 without I/O
+        self.tab["session"] = "pid INTEGER, fid INTEGER, sysc INTEGER, " \
+            "start DOUBLE, duration DOUBLE, closed INTEGER, " \
+            "calls INTEGER, nread INTEGER, rbytes INTEGER, " \
+            "nwrite INTEGER, wbytes INTEGER, off_first INTEGER, " \
+            "off_last INTEGER"
+        
+        # failed calls (res < 0) grouped by errno per syscall, file and
+        # process, elapsed is the cumulative latency
+        self.tab["errstat"] = "sysc INTEGER, kind TEXT, id INTEGER, " \
+            "errno INTEGER, count INTEGER, elapsed DOUBLE"
+        
+        # Euler tour numbers of the process tree, the subtree of a process
+        # are the processes with enter in [enter, exit] of it
+        self.tab["proctree"] = "pid INTEGER, enter INTEGER, exit INTEGER"
+        
     def import_logs(self, logdir=None):
         if logdir is None:
             logdir = os.path.dirname(self.db)
@@ -62,8 +99,9 @@ class Database(CommonDatabase):
         iid = 0
         
         runtime = {}
+        prof.begin("import.runtime.log")
         f = open("%s/runtime.log" % logdir)
-        for l in f.readlines():
+        for l in verbose.metered_lines(f):
             item, val = l.strip().split(":", 1)
             self.cur.execute("INSERT INTO runtime VALUES (?,?)", (item, val))
             if val.isdigit():
@@ -71,23 +109,37 @@ class Database(CommonDatabase):
             else:
                 runtime[item] = "%s" % val
         f.close()
+        prof.end()
         
+        prof.begin("import.file.log")
         f = open("%s/file.log" % logdir)
-        for l in f.readlines():
+        for l in verbose.metered_lines(f):
             fid, path = l.strip().split(":", 1)
             self.cur.execute("INSERT INTO file VALUES (?,?,?)", 
                 (iid, fid, path))
         f.close()
+        prof.end()
         
+        prof.begin("import.sysc.log")
         f = open("%s/sysc.log" % logdir)
         btime = None
-        for l in f.readlines():
+        maxelapsed = 0.0
+        for l in verbose.metered_lines(f):
             stamp,pid,sysc,fid,res,elapsed,aux1,aux2 = l.strip().split(",")
             if not btime: btime = float(stamp)
+            maxelapsed = max(maxelapsed, float(elapsed))
             stamp = "%f" % (float(stamp) - btime)
             self.cur.execute("INSERT INTO sysc VALUES (?,?,?,?,?,?,?,?,?)",
                 (iid,stamp,pid,sysc,fid,res,elapsed,aux1,aux2))
         f.close()
+        # keep the absolute time that sysc stamps are relative to
+        if btime is not None:
+            self.cur.execute("INSERT INTO runtime VALUES (?,?)",
+                ("sysc_btime", "%f" % btime))
+        # and the longest call, which bounds scoped stamp ranges
+        self.cur.execute("INSERT INTO runtime VALUES (?,?)",
+            ("sysc_maxelapsed", "%r" % maxelapsed))
+        prof.end()
         
         # import process logs according to the accuracy of information
         procs = set()
@@ -95,8 +147,9 @@ class Database(CommonDatabase):
         SYS_BTIME = runtime['sysbtime']
         have_taskstat_log = False
         if os.path.exists("%s/taskstat.log" % logdir):
+            prof.begin("import.taskstat.log")
             f = open("%s/taskstat.log" % logdir)
-            for l in f.readlines():
+            for l in verbose.metered_lines(f):
                 pid,ppid,live,res,btime,elapsed,utime,stime,cmd \
                     = l.strip().split(",")
                 # btime (sec), elapsed (usec), utime (usec), stime (usec)
@@ -107,12 +160,14 @@ class Database(CommonDatabase):
                     "btime,elapsed,utime,stime) VALUES (?,?,?,?,?,?,?,?,?)",
                     (iid,pid,ppid,live,res,btime,elapsed,utime,stime))
             f.close()
+            prof.end()
             have_taskstat_log = True
         
         have_ptrace_log = False
         if os.path.exists("%s/ptrace.log" % logdir):
+            prof.begin("import.ptrace.log")
             f = open("%s/ptrace.log" % logdir)
-            for l in f.readlines():
+            for l in verbose.metered_lines(f):
                 pid,ppid,start,stamp,utime,stime,cmd,env \
                     = l.strip().split(",")
                 if not have_taskstat_log:
@@ -130,11 +185,13 @@ class Database(CommonDatabase):
                         "pid=%s and ppid=%s" % (pid, ppid), (cmd, env))
                 procs.add(eval(pid))
             f.close()
+            prof.end()
             have_ptrace_log = True
 
         if os.path.exists("%s/proc.log" % logdir):
+            prof.begin("import.proc.log")
             f = open("%s/proc.log" % logdir)
-            for l in f.readlines():
+            for l in verbose.metered_lines(f):
                 flag,pid,ppid,start,stamp,utime,stime,cmd,env \
                     = l.strip().split("|#|")
                 if not flag or eval(pid) in procs: # just ignore start status right now
@@ -153,9 +210,103 @@ class Database(CommonDatabase):
                     self.cur.execute("UPDATE proc SET cmdline=?,environ=? WHERE "
                         "pid=%s and ppid=%s" % (pid, ppid), (cmd, env))
                      
-        f.close()
+            f.close()
+            prof.end()
+        prof.begin("import.proctree")
+        self.proctree_build()
+        prof.end()
+        prof.begin("import.sizehist")
+        self.sizehist_build()
+        prof.end()
+        prof.begin("import.session")
+        self.session_build()
+        prof.end()
+        prof.begin("import.errstat")
+        self.errstat_build()
+        prof.end()
         self.con.commit()
         
+    # scope routines
+    def set_scope(self, start=None, end=None, pid=None):
+        """Restrict sysc and proc routines to calls starting in [start,
+        end) seconds of tracing time, to processes alive then and to
+        process pid and its descendants, None lifts a restriction
+
+        Stamps are taken when calls complete, so a call starts at stamp -
+        elapsed. Time windows are served by an index on stamp, widened at
+        the end by the longest call, and subtrees by the proctree table,
+        so a scoped query costs in proportion to the calls in scope.
+        Derived tables are rebuilt over the scope on first use.
+        """
+        sysc = []
+        proc = []
+        if start is not None or end is not None:
+            self.cur.execute("CREATE INDEX IF NOT EXISTS sysc_stamp "
+                "ON sysc (stamp)")
+            btime = self.sysc_btime()
+        if start is not None:
+            sysc.append("stamp>=%r" % float(start))
+            sysc.append("stamp-elapsed>=%r" % float(start))
+            proc.append("(elapsed IS NULL OR btime+elapsed>=%r)" 
+                % (btime + start))
+        if end is not None:
+            sysc.append("stamp<%r" % (float(end) + self.sysc_max_elapsed()))
+            sysc.append("stamp-elapsed<%r" % float(end))
+            proc.append("btime<%r" % (btime + end))
+        if pid is not None:
+            self.cur.execute("CREATE INDEX IF NOT EXISTS sysc_pid "
+                "ON sysc (pid, stamp)")
+            if "proctree" not in self._get_tabs(): self.proctree_build()
+            self.cur.execute("SELECT enter,exit FROM proctree WHERE pid=?",
+                (pid,))
+            res = self.cur.fetchone()
+            if res is None: cond = "pid=%d" % pid
+            else:
+                cond = "pid IN (SELECT pid FROM proctree WHERE " \
+                    "enter BETWEEN %d AND %d)" % res
+            sysc.append(cond)
+            proc.append(cond)
+        self.con.commit()
+        for tab in self.scoped_tabs:
+            self.cur.execute("DROP TABLE IF EXISTS temp.%s" % tab)
+        self.scoped_tabs = set()
+        self.scope = (start, end, pid)
+        self.SYSC_SCOPE = sysc
+        self.PROC_SCOPE = proc
+
+    def scoped(self):
+        return len(self.SYSC_SCOPE) > 0
+
+    def sysc_where(self, conds=[]):
+        """Return WHERE clause of sysc table joining conds with the
+        conditions of the scope"""
+        conds = conds + self.SYSC_SCOPE
+        if len(conds) == 0: return ""
+        return " WHERE %s" % " and ".join(conds)
+
+    def proc_where(self, conds=[]):
+        """Return WHERE clause of proc table joining conds with the
+        conditions of the scope"""
+        conds = conds + self.PROC_SCOPE
+        if len(conds) == 0: return ""
+        return " WHERE %s" % " and ".join(conds)
+
+    def _derived_create(self, tab):
+        """Create and empty derived table tab, a temporary table shadows
+        the stored one while a scope is set"""
+        if self.scoped():
+            self.cur.execute("CREATE TEMP TABLE IF NOT EXISTS %s (%s)"
+                % (tab, self.tab[tab]))
+            self.scoped_tabs.add(tab)
+        else:
+            self.cur.execute("CREATE TABLE IF NOT EXISTS %s (%s)"
+                % (tab, self.tab[tab]))
+        self.cur.execute("DELETE FROM %s" % tab)
+
+    def _derived_exists(self, tab):
+        if self.scoped(): return tab in self.scoped_tabs
+        return tab in self._get_tabs()
+
     # runtime table routines
     def runtime_sel(self, fields="*"):
         self.cur.execute("SELECT %s FROM runtime" % fields)
@@ -171,20 +322,39 @@ class Database(CommonDatabase):
         self.cur.execute('SELECT item,value FROM runtime')
         return self.cur.fetchall()
 
+    def sysc_btime(self):
+        """Return absolute time (sec) of stamp 0 in sysc table, databases
+        imported before it was recorded fall back to the trace start"""
+        btime = self.runtime_get_value("sysc_btime")
+        if btime is None: btime = self.runtime_get_value("start")
+        return float(btime)
+
+    def sysc_max_elapsed(self):
+        """Return latency of the longest call, cached in runtime table"""
+        value = self.runtime_get_value("sysc_maxelapsed")
+        if value is None:
+            self.cur.execute("SELECT MAX(elapsed) FROM sysc")
+            value = self.cur.fetchone()[0] or 0.0
+            self.cur.execute("INSERT INTO runtime VALUES (?,?)",
+                ("sysc_maxelapsed", "%r" % value))
+            self.con.commit()
+        return float(value)
+
     # syscall table routines
     def sysc_sel(self, sysc, fields="*"):
-        self.cur.execute("SELECT %s FROM sysc WHERE sysc=?" 
-            % fields, (sysc,))
+        self.cur.execute("SELECT %s FROM sysc%s" 
+            % (fields, self.sysc_where(["sysc=?"])), (sysc,))
         return self.cur.fetchall()
     
     def sysc_count(self, sysc):
-        self.cur.execute("SELECT COUNT(*) FROM sysc WHERE sysc=?", (sysc,))
+        self.cur.execute("SELECT COUNT(*) FROM sysc%s" 
+            % self.sysc_where(["sysc=?"]), (sysc,))
         return self.cur.fetchone()[0]
     
     def sysc_sum(self, sysc, field):
         cur = self.con.cursor()
-        cur.execute("SELECT SUM(%s) FROM sysc WHERE sysc=?"
-        "GROUP BY sysc" % field, (sysc,))
+        cur.execute("SELECT SUM(%s) FROM sysc%s "
+        "GROUP BY sysc" % (field, self.sysc_where(["sysc=?"])), (sysc,))
         res = cur.fetchone()
         if res is None: # No such system call
             return 0
@@ -194,17 +364,16 @@ class Database(CommonDatabase):
     def sysc_sum2(self, columns, **where):
         columns = columns.split(',')
         columns = ','.join(map(lambda s:"SUM(%s)"%s, columns))
-        qstr = "SELECT %s FROM sysc" % columns
-        wstr = " and ".join(map(lambda k:"%s=%s" % (k, where[k]),
-            utils.list_intersect([self.SYSC_ATTR, where.keys()])))
-        if wstr != "": qstr = "%s WHERE %s" % (qstr, wstr)
+        conds = map(lambda k:"%s=%s" % (k, where[k]),
+            utils.list_intersect([self.SYSC_ATTR, where.keys()]))
+        qstr = "SELECT %s FROM sysc%s" % (columns, self.sysc_where(conds))
         self.cur.execute(qstr)
         return self.cur.fetchall()
     
     def sysc_avg(self, sysc, field):
         cur = self.con.cursor()
-        cur.execute("SELECT AVG(%s) FROM sysc WHERE sysc=?"
-        "GROUP BY sysc" % field, (sysc,))
+        cur.execute("SELECT AVG(%s) FROM sysc%s "
+        "GROUP BY sysc" % (field, self.sysc_where(["sysc=?"])), (sysc,))
         res = cur.fetchone()
         if res is None: # No such system call
             return 0
@@ -213,14 +382,15 @@ class Database(CommonDatabase):
     
     def sysc_std(self, sysc, field):
         cur = self.con.cursor()
-        cur.execute("SELECT %s FROM sysc WHERE sysc=?" % field, (sysc,))
+        cur.execute("SELECT %s FROM sysc%s" 
+            % (field, self.sysc_where(["sysc=?"])), (sysc,))
         vlist = map(lambda x:x[0], cur.fetchall())
         return num.num_std(vlist)
     
     def sysc_cdf(self, sysc, field, numbins=None):
         """if numbins is None, use all data"""
-        self.cur.execute("SELECT %s FROM sysc WHERE sysc=?" 
-            % field, (sysc,))
+        self.cur.execute("SELECT %s FROM sysc%s" 
+            % (field, self.sysc_where(["sysc=?"])), (sysc,))
         vlist = map(lambda x:x[0], self.cur.fetchall())
         vlist.sort()
         total = sum(vlist)
@@ -234,11 +404,194 @@ class Database(CommonDatabase):
         return data
 
     def sysc_sel_procs_by_file(self, iid, sysc, fid, fields="*"):
-        self.cur.execute("SELECT %s FROM sysc WHERE "
-            "iid=? AND sysc=? AND fid=? GROUP BY pid" % fields, 
+        self.cur.execute("SELECT %s FROM sysc%s GROUP BY pid" 
+            % (fields, self.sysc_where(["iid=?", "sysc=?", "fid=?"])), 
             (iid, sysc, fid))
         return self.cur.fetchall()
 
+    def sysc_span(self):
+        """Return (first, last) stamp of system calls"""
+        self.cur.execute("SELECT MIN(stamp),MAX(stamp) FROM sysc%s"
+            % self.sysc_where())
+        first, last = self.cur.fetchone()
+        if first is None: return 0.0, 0.0
+        return first, last
+
+    def sysc_chunks(self, columns, order=None, **where):
+        """Iterate over selected columns of sysc table as numpy record
+        arrays of at most FETCH_ROWS rows each"""
+        names = map(lambda c:c.strip(), columns.split(","))
+        dtype = map(lambda c:(c, self.SYSC_DTYPE[c]), names)
+        conds = map(lambda k:"%s=%s" % (k, where[k]),
+            utils.list_intersect([self.SYSC_ATTR, where.keys()]))
+        qstr = "SELECT %s FROM sysc%s" % (",".join(names),
+            self.sysc_where(conds))
+        if order is not None: qstr = "%s ORDER BY %s" % (qstr, order)
+        cur = self.con.cursor()
+        cur.execute(qstr)
+        while True:
+            rows = cur.fetchmany(self.FETCH_ROWS)
+            if len(rows) == 0: break
+            verbose.advance(len(rows))
+            yield numpy.array(rows, dtype=dtype).view(numpy.recarray)
+
+    def sysc_arrays(self, columns, order=None, **where):
+        """Return selected columns of sysc table as a numpy record array
+        
+        Rows are fetched in chunks of FETCH_ROWS to bound the memory of
+        intermediate Python tuples on large traces.
+        """
+        chunks = list(self.sysc_chunks(columns, order, **where))
+        if len(chunks) == 0:
+            dtype = map(lambda c:(c.strip(), self.SYSC_DTYPE[c.strip()]),
+                columns.split(","))
+            return numpy.zeros(0, dtype=dtype).view(numpy.recarray)
+        return numpy.concatenate(chunks).view(numpy.recarray)
+
+    # size histogram table routines
+    def sizehist_build(self):
+        """Bin read/write request sizes into log2 buckets per syscall,
+        file and process, store non-empty bucket ranges as compact arrays"""
+        self._derived_create("sizehist")
+        for sc in [SYSCALL["read"], SYSCALL["write"]]:
+            reqs = self.sysc_arrays("pid,fid,aux1", sysc=sc)
+            if len(reqs) == 0: continue
+            bucket = analysis.size_bucket(reqs.aux1)
+            for kind, keys in [("sysc", numpy.zeros(len(reqs), dtype=int)),
+                ("file", reqs.fid), ("proc", reqs.pid)]:
+                uniq, hist = analysis.bucket_histogram(keys, bucket)
+                rows = []
+                for i in range(0, len(uniq)):
+                    nz = numpy.flatnonzero(hist[i])
+                    lo, hi = nz[0], nz[-1] + 1
+                    rows.append((sc, kind, int(uniq[i]), int(lo),
+                        buffer(hist[i][lo:hi].astype(numpy.int64).tostring())))
+                self.cur.executemany("INSERT INTO sizehist "
+                    "VALUES (?,?,?,?,?)", rows)
+        self.con.commit()
+
+    def sizehist_sel(self, sysc, kind):
+        """Return list of (id, hist) log2 size histograms of given kind,
+        kind is one of 'sysc', 'file' and 'proc'"""
+        if not self._derived_exists("sizehist"): self.sizehist_build()
+        self.cur.execute("SELECT id,lo,hist FROM sizehist "
+            "WHERE sysc=? AND kind=? ORDER BY id", (sysc, kind))
+        res = []
+        for id, lo, blob in self.cur.fetchall():
+            counts = numpy.frombuffer(str(blob), dtype=numpy.int64)
+            hist = numpy.zeros(analysis.SIZE_BUCKETS, dtype=numpy.int64)
+            hist[lo:lo+len(counts)] = counts
+            res.append((id, hist))
+        return res
+
+    # session table routines
+    def session_build(self):
+        """Pair open/creat with close per (pid, fid) in stamp order and
+        store one row per session with its duration, call counts, bytes
+        and first/last I/O offsets
+
+        Without file descriptors in the trace, concurrent opens of the
+        same file by one process are paired in stamp order.
+        """
+        self._derived_create("session")
+        SC_OPEN, SC_CREAT, SC_CLOSE = \
+            SYSCALL["open"], SYSCALL["creat"], SYSCALL["close"]
+        SC_READ, SC_WRITE = SYSCALL["read"], SYSCALL["write"]
+        scs = [SC_OPEN, SC_CREAT, SC_CLOSE, SC_READ, SC_WRITE,
+            SYSCALL["fstat"], SYSCALL["flush"], SYSCALL["fsync"]]
+        chunks = []
+        for calls in self.sysc_chunks("pid,fid,stamp,sysc,elapsed,aux1,aux2"):
+            chunks.append(calls[numpy.in1d(calls.sysc, scs)])
+        if len(chunks) == 0 or sum(map(len, chunks)) == 0:
+            self.con.commit()
+            return
+        calls = numpy.concatenate(chunks).view(numpy.recarray)
+        calls = calls[analysis.stream_order(calls.pid, calls.fid, 
+            calls.stamp)]
+        
+        is_open = (calls.sysc == SC_OPEN) | (calls.sysc == SC_CREAT)
+        is_close = calls.sysc == SC_CLOSE
+        sid = analysis.session_ids(calls.pid, calls.fid, is_open, is_close)
+        n = sid[-1] + 1
+        first = numpy.flatnonzero(numpy.diff(numpy.append(-1, sid)))
+        last = numpy.append(first[1:], len(sid)) - 1
+        # stamps are taken when calls complete
+        starts = calls.stamp[first] - calls.elapsed[first]
+        ends = numpy.maximum.reduceat(calls.stamp, first)
+        is_read = calls.sysc == SC_READ
+        is_write = calls.sysc == SC_WRITE
+        nread = numpy.bincount(sid, weights=is_read, minlength=n)
+        rbytes = numpy.bincount(sid, weights=calls.aux1 * is_read, 
+            minlength=n)
+        nwrite = numpy.bincount(sid, weights=is_write, minlength=n)
+        wbytes = numpy.bincount(sid, weights=calls.aux1 * is_write, 
+            minlength=n)
+        
+        # first and last offsets of read/write requests per session
+        off_first = -numpy.ones(n, dtype=numpy.int64)
+        off_last = -numpy.ones(n, dtype=numpy.int64)
+        io = numpy.flatnonzero(is_read | is_write)
+        if len(io) > 0:
+            ios, io_first = numpy.unique(sid[io], return_index=True)
+            io_last = numpy.append(io_first[1:], len(io)) - 1
+            off_first[ios] = calls.aux2[io[io_first]]
+            off_last[ios] = calls.aux2[io[io_last]] + calls.aux1[io[io_last]]
+        
+        opener = numpy.where(is_open[first], calls.sysc[first], 0)
+        rows = zip(calls.pid[first].tolist(), calls.fid[first].tolist(),
+            opener.tolist(), starts.tolist(),
+            (ends - starts).tolist(), is_close[last].tolist(),
+            numpy.diff(numpy.append(first, len(sid))).tolist(),
+            nread.astype(int).tolist(), rbytes.astype(int).tolist(),
+            nwrite.astype(int).tolist(), wbytes.astype(int).tolist(),
+            off_first.tolist(), off_last.tolist())
+        self.cur.executemany("INSERT INTO session VALUES "
+            "(?,?,?,?,?,?,?,?,?,?,?,?,?)", rows)
+        self.con.commit()
+
+    def session_arrays(self, columns):
+        """Return selected columns of session table as a numpy record
+        array, the table is built if missing"""
+        if not self._derived_exists("session"): self.session_build()
+        names = map(lambda c:c.strip(), columns.split(","))
+        self.cur.execute("SELECT %s FROM session" % ",".join(names))
+        rows = self.cur.fetchall()
+        return numpy.rec.fromrecords(rows, names=names) if len(rows) \
+            else numpy.rec.fromarrays([[]] * len(names), names=names)
+
+    # failed syscall table routines
+    def errstat_build(self):
+        """Group failed calls by (syscall, errno) per syscall, file and
+        process, store counts and cumulative latency"""
+        self._derived_create("errstat")
+        chunks = []
+        for calls in self.sysc_chunks("pid,fid,sysc,res,elapsed"):
+            chunks.append(calls[calls.res < 0])
+        if len(chunks) == 0 or sum(map(len, chunks)) == 0:
+            self.con.commit()
+            return
+        fails = numpy.concatenate(chunks).view(numpy.recarray)
+        errno = -fails.res
+        for kind, ids in [("sysc", numpy.zeros(len(fails), dtype=int)),
+            ("file", fails.fid), ("proc", fails.pid)]:
+            keys = numpy.rec.fromarrays([fails.sysc, ids, errno])
+            uniq, cnts = analysis.group_sum(keys)
+            _, lats = analysis.group_sum(keys, fails.elapsed)
+            rows = map(lambda (k, c, l):(int(k[0]), kind, int(k[1]), 
+                int(k[2]), int(c), float(l)), zip(uniq, cnts, lats))
+            self.cur.executemany("INSERT INTO errstat VALUES "
+                "(?,?,?,?,?,?)", rows)
+        self.con.commit()
+
+    def errstat_sel(self, kind, columns="sysc,id,errno,count,elapsed"):
+        """Return rows of errstat table of given kind ('sysc', 'file' or
+        'proc') ordered by cumulative latency, the table is built if
+        missing"""
+        if not self._derived_exists("errstat"): self.errstat_build()
+        self.cur.execute("SELECT %s FROM errstat WHERE kind=? "
+            "ORDER BY elapsed DESC" % columns, (kind,))
+        return self.cur.fetchall()
+
     # file table routines
     def file_sel(self, columns, **where):
         qstr = "SELECT %s FROM file" % columns
@@ -270,7 +623,7 @@ class Database(CommonDatabase):
     def procs(self, **attr):
         """Return a list of processes IDs that satisfy specified attributes"""
         
-        qstr = "SELECT pid FROM proc" # SQL query string
+        qstr = "SELECT pid FROM proc%s" % self.proc_where()
         
         if attr == {}:
             self.cur.execute(qstr)
@@ -278,57 +631,93 @@ class Database(CommonDatabase):
         
         procs = []
         if "sysc" in attr.keys(): attr["sysc"] = SYSCALL[attr["sysc"]]
-        # Select from syscall table
-        qstr = "SELECT pid FROM syscall"
-        wstr = " and ".join(map(lambda k:"%s=%s" % (k, attr[k]), 
-                list_intersect([self.SYSC_ATTR, attr.keys()])))
-        if wstr != "":
-            qstr = "%s WHERE %s GROUP BY pid" % (qstr, wstr)
+        # Select from sysc table
+        conds = map(lambda k:"%s=%s" % (k, attr[k]), 
+                utils.list_intersect([self.SYSC_ATTR, attr.keys()]))
+        if len(conds) > 0:
+            qstr = "SELECT pid FROM sysc%s GROUP BY pid" \
+                % self.sysc_where(conds)
             self.cur.execute(qstr)
             procs_sc =  map(lambda x:x[0], self.cur.fetchall())
             procs.extend(procs_sc)
         
         # Select from procs table
-        qstr = "SELECT pid FROM proc"
-        wstr = " and ".join(map(lambda k:"%s=%s" % (k, attr[k]),
-            list_intersect([self.PROC_ATTR, attr.keys()])))
-        if wstr != "":
-            qstr = "%s WHERE %s GROUP BY pid" % (qstr, wstr)
+        conds = map(lambda k:"%s=%s" % (k, attr[k]),
+            utils.list_intersect([self.PROC_ATTR, attr.keys()]))
+        if len(conds) > 0:
+            qstr = "SELECT pid FROM proc%s GROUP BY pid" \
+                % self.proc_where(conds)
             self.cur.execute(qstr)
             procs_pc =  map(lambda x:x[0], self.cur.fetchall())
             if len(procs) > 0:  # procs added from syscall
-                procs = list_intersect([procs, procs_pc])
+                procs = utils.list_intersect([procs, procs_pc])
             else:
                 procs.extend(procs_pc)
 
         return procs
     
     def proc_sel(self, columns, **where):
-        qstr = "SELECT %s FROM proc" % columns
-        wstr = " and ".join(map(lambda k:"%s=%s" % (k, where[k]),
-            utils.list_intersect([self.PROC_ATTR, where.keys()])))
-        if wstr != "": qstr = "%s WHERE %s" % (qstr, wstr)
+        conds = map(lambda k:"%s=%s" % (k, where[k]),
+            utils.list_intersect([self.PROC_ATTR, where.keys()]))
+        qstr = "SELECT %s FROM proc%s" % (columns, self.proc_where(conds))
         self.cur.execute(qstr)
         return self.cur.fetchall()
 
+    def proc_subtree(self, pid):
+        """Return list of pid and all its descendant processes"""
+        children = {}
+        for p, pp in self.proc_sel("pid,ppid"):
+            children.setdefault(pp, []).append(p)
+        subtree = [pid]
+        seen = set(subtree)
+        i = 0
+        while i < len(subtree):
+            for c in children.get(subtree[i], []):
+                if c in seen: continue
+                seen.add(c)
+                subtree.append(c)
+            i += 1
+        return subtree
+
+    def proctree_build(self):
+        """Number processes in depth-first order of the process tree and
+        store the enter number of each and the last enter number within
+        its subtree, processes on a parent cycle are left out"""
+        self.cur.execute("CREATE TABLE IF NOT EXISTS proctree (%s)"
+            % self.tab["proctree"])
+        self.cur.execute("DELETE FROM proctree")
+        self.cur.execute("SELECT pid,ppid FROM proc")
+        procs = self.cur.fetchall()
+        tree = proctree.ProcessTree(map(lambda p:p[0], procs),
+            map(lambda p:p[1], procs))
+        enter, exit = tree.euler()
+        sel = enter >= 0
+        rows = zip(tree.pids[sel].tolist(), enter[sel].tolist(),
+            exit[sel].tolist())
+        self.cur.executemany("INSERT INTO proctree VALUES (?,?,?)", rows)
+        self.con.commit()
+
     def proc_sum(self, field):
-        self.cur.execute("SELECT SUM(%s) FROM proc" % field)
+        self.cur.execute("SELECT SUM(%s) FROM proc%s" 
+            % (field, self.proc_where()))
         res = self.cur.fetchone()
-        if res is None: # No such system call
+        if res is None or res[0] is None: # No such system call
             return 0
         else:
             return res[0]
     
     def proc_avg(self, field):
-        self.cur.execute("SELECT AVG(%s) FROM proc" % field)
+        self.cur.execute("SELECT AVG(%s) FROM proc%s" 
+            % (field, self.proc_where()))
         res = self.cur.fetchone()
-        if res is None: # No such system call
+        if res is None or res[0] is None: # No such system call
             return 0
         else:
             return res[0]
     
     def proc_std(self, field):
-        self.cur.execute("SELECT %s FROM proc" % field)
+        self.cur.execute("SELECT %s FROM proc%s" 
+            % (field, self.proc_where()))
         vlist = map(lambda x:x[0], self.cur.fetchall())
         if len(vlist) == 0: return 0
         return num.num_std(vlist)
@@ -336,33 +725,34 @@ class Database(CommonDatabase):
     def proc_sum2(self, columns, **where):
         columns = columns.split(',')
         columns = ','.join(map(lambda s:"SUM(%s)"%s, columns))
-        qstr = "SELECT %s FROM proc" % columns
-        wstr = " and ".join(map(lambda k:"%s=%s" % (k, where[k]),
-            utils.list_intersect([self.PROC_ATTR, where.keys()])))
-        if wstr != "": qstr = "%s WHERE %s" % (qstr, wstr)
+        conds = map(lambda k:"%s=%s" % (k, where[k]),
+            utils.list_intersect([self.PROC_ATTR, where.keys()]))
+        qstr = "SELECT %s FROM proc%s" % (columns, self.proc_where(conds))
         print qstr
 
     def proc_cmdline(self, iid, pid, fullcmd=True):
-        self.cur.execute("SELECT cmdline FROM proc "
-            "WHERE iid=? and pid=?", (iid, pid))
-        res = self.cur.fetchone()[0]
-        if fullcmd: return res
-        else: return res.split(" ", 1)[0]
+        """Return command line of process pid, None if it is out of
+        scope"""
+        self.cur.execute("SELECT cmdline FROM proc%s"
+            % self.proc_where(["iid=?", "pid=?"]), (iid, pid))
+        res = self.cur.fetchone()
+        if res is None: return None
+        if fullcmd: return res[0]
+        else: return res[0].split(" ", 1)[0]
 
     def proc_io_sum_elapsed_and_bytes(self, sysc, iid, pid, fid):
         assert sysc == SYSCALL['read'] or sysc == SYSCALL['write']
-        self.cur.execute("SELECT SUM(elapsed),SUM(aux1) FROM syscall "
-            "WHERE sysc=? and iid=? and pid=? and fid=?",
+        self.cur.execute("SELECT SUM(elapsed),SUM(aux1) FROM sysc%s"
+            % self.sysc_where(["sysc=?", "iid=?", "pid=?", "fid=?"]),
             (sysc, iid, pid, fid))
         return self.cur.fetchone()
 
     def proc_stat(self, column, **attr):
         """Return (sum, avg, stddev) of column of selected processes"""
         
-        qstr = "SELECT %s FROM proc" % column
-        wstr = " and ".join(map(lambda k:"%s=%s" % (k, attr[k]),
-            list_intersect([self.PROC_ATTR, attr.keys()])))
-        if wstr != "": qstr = "%s WHERE %s" % (qstr, wstr)
+        conds = map(lambda k:"%s=%s" % (k, attr[k]),
+            utils.list_intersect([self.PROC_ATTR, attr.keys()]))
+        qstr = "SELECT %s FROM proc%s" % (column, self.proc_where(conds))
         self.cur.execute(qstr)
         values = map(lambda x:x[0], self.cur.fetchall())
         return numpy.sum(values), numpy.mean(values), numpy.std(values)
@@ -370,10 +760,9 @@ class Database(CommonDatabase):
     def proc_cdf(self, column, numbins=None, **attr):
         """Return (sum, avg, stddev) of column of selected processes"""
         
-        qstr = "SELECT %s FROM proc" % column
-        wstr = " and ".join(map(lambda k:"%s=%s" % (k, attr[k]),
-            list_intersect([self.PROC_ATTR, attr.keys()])))
-        if wstr != "": qstr = "%s WHERE %s" % (qstr, wstr)
+        conds = map(lambda k:"%s=%s" % (k, attr[k]),
+            utils.list_intersect([self.PROC_ATTR, attr.keys()]))
+        qstr = "SELECT %s FROM proc%s" % (column, self.proc_where(conds))
         self.cur.execute(qstr)
         values = map(lambda x:x[0], self.cur.fetchall())
         values.sort()
@@ -389,21 +778,19 @@ class Database(CommonDatabase):
         """Return (sum, avg, stddev) of column of selected processes"""
         
         if "sysc" in attr.keys(): attr["sysc"] = SYSCALL[attr["sysc"]]
-        qstr = "SELECT %s FROM syscall" % column
-        wstr = " and ".join(map(lambda k:"%s=%s" % (k, attr[k]),
-            list_intersect([self.SYSC_ATTR, attr.keys()])))
-        if wstr != "": qstr = "%s WHERE %s" % (qstr, wstr)
+        conds = map(lambda k:"%s=%s" % (k, attr[k]),
+            utils.list_intersect([self.SYSC_ATTR, attr.keys()]))
+        qstr = "SELECT %s FROM sysc%s" % (column, self.sysc_where(conds))
         self.cur.execute(qstr)
         values = map(lambda x:x[0], self.cur.fetchall())
         return numpy.sum(values), numpy.mean(values), numpy.std(values)
 
     def proc_throughput(self, iid, pid, fid, sysc):
+        where = self.sysc_where(["iid=?", "pid=?", "fid=?", "sysc=?"])
         if sysc == "read" or sysc == "write":
-            self.cur.execute("SELECT SUM(elapsed),SUM(aux1) FROM sysc"
-                " WHERE iid=? and pid=? and fid=? and sysc=? GROUP BY pid", 
-                (iid, pid, fid, SYSCALL[sysc]))
+            self.cur.execute("SELECT SUM(elapsed),SUM(aux1) FROM sysc%s "
+                "GROUP BY pid" % where, (iid, pid, fid, SYSCALL[sysc]))
         else:
-            self.cur.execute("SELECT SUM(elapsed),COUNT(sysc) FROM syscall"
-                " WHERE iid=? and pid=? and fid=? and sysc=? GROUP BY pid", 
-                (iid, pid, fid, SYSCALL[sysc]))
+            self.cur.execute("SELECT SUM(elapsed),COUNT(sysc) FROM sysc%s "
+                "GROUP BY pid" % where, (iid, pid, fid, SYSCALL[sysc]))
         return self.cur.fetchone()
@@ -0,0 +1,230 @@
+#############################################################################
+# ParaTrac: Scalable Tracking Tools for Parallel Applications
+# Copyright (C) 2009,2010  Nan Dun <dunnan@yl.is.s.u-tokyo.ac.jp>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#############################################################################
+
+#
+# fs/dataflow.py
+# Byte-precise producer to consumer data flow between processes
+#
+# Writes and reads are replayed in stamp order. Each file keeps a map of
+# its written byte ranges to the process that wrote them last, a read
+# is split over that map and each part is credited to the edge from its
+# writer to the reader. Bytes no traced write produced come from data
+# that existed before tracing.
+#
+
+import bisect
+
+import numpy
+
+from modules.utils import SYSCALL
+
+class IntervalMap:
+    """Disjoint byte ranges [start, end) of a file with their owner
+
+    Ranges are kept sorted in blocks of parallel lists of at most
+    2 * BLOCK ranges, with the last end of every block in an index. A
+    lookup is a binary search of the index and of one block plus the
+    ranges it overlaps. A write replaces the part of the ranges it covers
+    and is merged with adjacent ranges of the same owner, it splices one
+    block, so it costs O(log n + BLOCK) plus the ranges it removes, which
+    were each added by an earlier write.
+    """
+    BLOCK = 512
+
+    def __init__(self):
+        # blocks of [starts, ends, owners], bends the last end of each
+        self.blocks = []
+        self.bends = []
+        self.n = 0
+
+    def __len__(self):
+        return self.n
+
+    def ranges(self):
+        """Return list of (start, end, owner) of all ranges in order"""
+        res = []
+        for starts, ends, owners in self.blocks:
+            res.extend(zip(starts, ends, owners))
+        return res
+
+    def _locate(self, pos):
+        """Return (block, index) of the first range ending after pos,
+        (len(blocks), 0) if there is none"""
+        b = bisect.bisect_right(self.bends, pos)
+        if b == len(self.blocks): return b, 0
+        return b, bisect.bisect_right(self.blocks[b][1], pos)
+
+    def _range(self, b, k):
+        blk = self.blocks[b]
+        return blk[0][k], blk[1][k], blk[2][k]
+
+    def assign(self, start, end, owner):
+        """Give [start, end) to owner"""
+        blocks = self.blocks
+        nb = len(blocks)
+        b, k = self._locate(start)
+        # ranges starting before end from (b, k) on overlap, they run up
+        # to (b2, k2)
+        b2, k2 = b, k
+        while b2 < nb:
+            k2 = bisect.bisect_left(blocks[b2][0], end, k2)
+            if k2 < len(blocks[b2][0]): break
+            b2, k2 = b2 + 1, 0
+        overlap = (b, k) != (b2, k2)
+        lo, hi = (b, k), (b2, k2)
+
+        s, e = start, end
+        pieces = []
+        prev = None
+        if k > 0: prev = (b, k - 1)
+        elif b > 0: prev = (b - 1, len(blocks[b-1][0]) - 1)
+        first = overlap and self._range(b, k)
+        if overlap and first[0] < start:
+            if first[2] == owner: s = first[0]
+            else: pieces.append((first[0], start, first[2]))
+        elif prev is not None:
+            ps, pe, po = self._range(*prev)
+            if pe == start and po == owner:
+                lo = prev
+                s = ps
+        last = None
+        if overlap:
+            if k2 > 0: last = self._range(b2, k2 - 1)
+            else: last = self._range(b2 - 1, len(blocks[b2-1][0]) - 1)
+        right = None
+        if overlap and last[1] > end:
+            ls, le, lown = last
+            if lown == owner: e = le
+            else: right = (end, le, lown)
+        elif b2 < nb:
+            ns, ne, no = self._range(b2, k2)
+            if ns == end and no == owner:
+                e = ne
+                hi = (b2, k2 + 1)
+        pieces.append((s, e, owner))
+        if right is not None: pieces.append(right)
+        self._replace(lo, hi, pieces)
+
+    def _replace(self, lo, hi, pieces):
+        """Replace ranges from position lo up to hi with pieces"""
+        blocks = self.blocks
+        (b, k), (b2, k2) = lo, hi
+        if len(blocks) == 0:
+            blocks.append([[], [], []])
+            self.bends.append(None)
+        if b2 == len(blocks): b2, k2 = b2 - 1, len(blocks[-1][0])
+        if b == len(blocks): b, k = b2, k2
+        cols = map(list, zip(*pieces))
+        if b == b2:
+            removed = k2 - k
+            for lst, vals in zip(blocks[b], cols): lst[k:k2] = vals
+        else:
+            removed = len(blocks[b][0]) - k + k2 + \
+                sum(map(lambda blk:len(blk[0]), blocks[b+1:b2]))
+            for lst, vals, tail in zip(blocks[b], cols, blocks[b2]):
+                lst[k:] = vals + tail[k2:]
+            del blocks[b+1:b2+1]
+            del self.bends[b+1:b2+1]
+        self.n += len(pieces) - removed
+        self._balance(b)
+
+    def _balance(self, b):
+        """Merge block b into the next one if it is small, split it if
+        it is large and update the index"""
+        blocks = self.blocks
+        blk = blocks[b]
+        if len(blk[0]) < self.BLOCK / 2 and b + 1 < len(blocks):
+            for lst, nxt in zip(blk, blocks[b+1]): lst.extend(nxt)
+            del blocks[b+1]
+            del self.bends[b+1]
+        n = len(blk[0])
+        if n == 0 and len(blocks) > 1:
+            del blocks[b]
+            del self.bends[b]
+        elif n > 2 * self.BLOCK:
+            parts = map(lambda i:map(lambda lst:lst[i:i+self.BLOCK], blk),
+                range(0, n, self.BLOCK))
+            blocks[b:b+1] = parts
+            self.bends[b:b+1] = map(lambda p:p[1][-1], parts)
+        elif n > 0: self.bends[b] = blk[1][-1]
+
+    def lookup(self, start, end):
+        """Return list of (bytes, owner) of ranges overlapping [start,
+        end)"""
+        blocks = self.blocks
+        res = []
+        b, k = self._locate(start)
+        while b < len(blocks):
+            starts, ends, owners = blocks[b]
+            n = len(starts)
+            while k < n and starts[k] < end:
+                res.append((min(end, ends[k]) - max(start, starts[k]),
+                    owners[k]))
+                k += 1
+            if k < n: break
+            b, k = b + 1, 0
+        return res
+
+class DataFlow:
+    """Match reads to the writes that produced their bytes"""
+    def __init__(self, db):
+        self.db = db
+        self.SC_READ = SYSCALL["read"]
+        self.SC_WRITE = SYSCALL["write"]
+        # calls that discard the content of a file
+        self.SC_RESET = [SYSCALL["creat"], SYSCALL["unlink"]]
+
+    def run(self):
+        """Return (flows, external, ranges): flows maps (writer, reader,
+        fid) to bytes, external maps fid to bytes read that no traced
+        write produced, ranges is the number of written ranges left"""
+        SC_READ, SC_WRITE = self.SC_READ, self.SC_WRITE
+        scs = [SC_READ, SC_WRITE] + self.SC_RESET
+        files = {}
+        flows = {}
+        external = {}
+        for calls in self.db.sysc_chunks("sysc,pid,fid,res,aux1,aux2",
+            order="stamp"):
+            calls = calls[numpy.in1d(calls.sysc, scs) & (calls.res >= 0)]
+            # bytes actually transferred
+            moved = numpy.minimum(calls.aux1, calls.res)
+            for sc, pid, fid, length, off in zip(calls.sysc.tolist(),
+                calls.pid.tolist(), calls.fid.tolist(), moved.tolist(),
+                calls.aux2.tolist()):
+                if sc == SC_WRITE:
+                    if length <= 0: continue
+                    m = files.get(fid)
+                    if m is None:
+                        m = files[fid] = IntervalMap()
+                    m.assign(off, off + length, pid)
+                elif sc == SC_READ:
+                    if length <= 0: continue
+                    m = files.get(fid)
+                    found = 0
+                    if m is not None:
+                        for nbytes, writer in m.lookup(off, off + length):
+                            key = (writer, pid, fid)
+                            flows[key] = flows.get(key, 0) + nbytes
+                            found += nbytes
+                    if found < length:
+                        external[fid] = external.get(fid, 0) + length - found
+                elif files.has_key(fid):
+                    del files[fid]
+        return flows, external, sum(map(len, files.values()))
+
+__all__ = ["IntervalMap", "DataFlow"]
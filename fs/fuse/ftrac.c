@@ -1434,14 +1434,17 @@ static void runtime_destroy(void)
  */
 
 #if FTRAC_TRACE_SYSC_ENABLED
+/* failed calls are logged as -errno, as returned to FUSE */
+#define SYSC_RES (res == -1 ? -orig_errno : res)
 #define SYSC_LOGGING \
-	sysc_logging(_SYSC, &start, &end, ctxt->pid, res, path)
+	sysc_logging(_SYSC, &start, &end, ctxt->pid, SYSC_RES, path)
 #define SYSC_LOGGING_LINK \
-	sysc_logging_link(_SYSC, &start, &end, ctxt->pid, res, from, to)
+	sysc_logging_link(_SYSC, &start, &end, ctxt->pid, SYSC_RES, from, to)
 #define SYSC_LOGGING_OPENCLOSE \
-	sysc_logging_openclose(_SYSC, &start, &end, ctxt->pid, res, path);
+	sysc_logging_openclose(_SYSC, &start, &end, ctxt->pid, SYSC_RES, path);
 #define SYSC_LOGGING_IO \
-	sysc_logging_io(_SYSC, &start, &end, ctxt->pid, res, path, bytes, offset);
+	sysc_logging_io(_SYSC, &start, &end, ctxt->pid, SYSC_RES, path, bytes, \
+		offset);
 #else
 #define SYSC_LOGGING do {(void) ctxt;} while (0)
 #define SYSC_LOGGING_LINK do {(void) ctxt;} while (0)
@@ -1629,7 +1632,7 @@ static int ftrac_readdir(const char *path, void *buf, fuse_fill_dir_t filler,
 
 #if FTRAC_TRACE_ENABLED
 		TIMING(end);
-		SYSC_LOGGING;
+		sysc_logging(_SYSC, &start, &end, ctxt->pid, res, path);
 		PROC_LOGGING;
 #endif
 		memset(&st, 0, sizeof(struct stat));
@@ -43,8 +43,102 @@ Available plot types:
 
     def _add_default_options(self):
         CommonOptions._add_default_options(self)
+
+        self.optParser.add_option("--no-figures", action="store_false",
+            dest="figures", default=True,
+            help="generate report without figures and workflow graph, "
+                 "plotting backends are not loaded")
+
+        self.optParser.add_option("--export-timeline", action="callback",
+            type="string", dest="timeline_dir", metavar="PATH", default=None,
+            callback=self._check_path,
+            help="export system calls and process lifetimes as "
+                 "trace-event JSON for chrome://tracing or Perfetto")
+
+        self.optParser.add_option("-o", "--output", action="store",
+            type="string", dest="output", metavar="FILE", default=None,
+            help="output file of export (default: PATH/timeline.json) "
+                 "or JSON results of replay")
+
+        self.optParser.add_option("--from", action="store", type="float",
+            dest="tfrom", metavar="SEC", default=None,
+            help="only report or export calls from SEC seconds of "
+                 "tracing time")
+
+        self.optParser.add_option("--to", action="store", type="float",
+            dest="tto", metavar="SEC", default=None,
+            help="only report or export calls before SEC seconds of "
+                 "tracing time")
+
+        self.optParser.add_option("--pid-subtree", action="store",
+            type="int", dest="pid_subtree", metavar="PID", default=None,
+            help="only report or export process PID and its descendants")
+
+        self.optParser.add_option("--heatmap-groups", action="store",
+            type="choice", dest="heatmap_groups", metavar="KIND",
+            choices=["exec", "subtree"], default=None,
+            help="also report latency heatmaps per process group, by "
+                 "executable name (exec) or by subtree of each child of "
+                 "the root process (subtree)")
+
+        self.optParser.add_option("--replay", action="callback",
+            type="string", dest="replay_dir", metavar="PATH", default=None,
+            callback=self._check_path,
+            help="replay traced calls of PATH in directory TARGET given "
+                 "as argument and report throughput and latency")
+
+        self.optParser.add_option("--replay-mode", action="store",
+            type="choice", dest="replay_mode", metavar="MODE",
+            choices=["fast", "timed"], default="fast",
+            help="issue calls as fast as possible (fast) or not before "
+                 "their traced time (timed) (default: fast)")
+
+        self.optParser.add_option("--replay-workers", action="store",
+            type="int", dest="replay_workers", metavar="NUM", default=None,
+            help="number of replay threads (default: one per traced "
+                 "process up to 256)")
+
+        self.optParser.add_option("--fit-model", action="callback",
+            type="string", dest="model_dir", metavar="PATH", default=None,
+            callback=self._check_path,
+            help="fit a workload model of trace PATH and save it as JSON "
+                 "(default: PATH/model.json)")
+
+        self.optParser.add_option("--generate", action="callback",
+            type="string", dest="generate_model", metavar="MODEL",
+            default=None, callback=self._check_path,
+            help="generate trace logs from workload MODEL in directory "
+                 "TARGET given as argument")
+
+        self.optParser.add_option("--scale", action="store", type="float",
+            dest="scale", metavar="NUM", default=1.0,
+            help="multiply processes of each class by NUM when "
+                 "generating (default: 1)")
+
+        self.optParser.add_option("--seed", action="store", type="int",
+            dest="seed", metavar="NUM", default=0,
+            help="random seed of generator (default: 0)")
+
+        self.optParser.add_option("--profile", action="store",
+            type="string", dest="profile", metavar="FILE", default=None,
+            help="record time, memory and SQL activity of each stage "
+                 "to JSON FILE and print a summary")
     
     def _check_opts_and_args(self):
+        if self.opts.replay_dir:
+            if len(self.args) < 2:
+                sys.stderr.write("%s: missing replay target directory\n"
+                    % self.prog)
+                sys.exit(1)
+            self.opts.replay_target = os.path.abspath(self.args[1])
+
+        if self.opts.generate_model:
+            if len(self.args) < 2:
+                sys.stderr.write("%s: missing trace directory to generate\n"
+                    % self.prog)
+                sys.exit(1)
+            self.opts.generate_dir = os.path.abspath(self.args[1])
+
         if self.opts.plot: 
             if len(self.args) == 1:
                 sys.stdout.write("%s: missing data directory\n" 
@@ -23,23 +23,32 @@
 # Prerequisites:
 #   * NetworkX: http://networkx.lanl.gov/
 #
+# Plotting and graph backends are imported on first use, so importing
+# this module is cheap for callers that never draw.
+#
 
 import os
 import warnings
 import xml.dom.minidom as minidom
 
-import Gnuplot
-import numpy as np
-import matplotlib
-matplotlib.use("Cairo")
 warnings.simplefilter("ignore", DeprecationWarning)
-import matplotlib.pyplot as pyplot
-import networkx as nx
+
+def _matplotlib_setup():
+    import matplotlib
+    matplotlib.use("Cairo")
+
+from modules.utils import LazyModule
+Gnuplot = LazyModule("Gnuplot")
+np = LazyModule("numpy")
+pyplot = LazyModule("matplotlib.pyplot", _matplotlib_setup)
+nx = LazyModule("networkx")
 
 from modules.utils import SYSCALL
 from modules import utils
 from modules import num
+from modules import prof
 from data import Database
+import proctree
 
 class Plot:
     def __init__(self, path):
@@ -55,6 +64,7 @@ class Plot:
         self.terminal = "png"
 
     def _stacked_lines(self, path, x, yseries):
+        prof.begin("figure.%s" % os.path.basename(path))
         pyplot.clf()
         y_data = np.row_stack(yseries)
         y_data_stacked = np.cumsum(y_data, axis=0)
@@ -69,18 +79,17 @@ class Plot:
                 alpha=0.7)
             y_start = y_end
         pyplot.savefig(path)
+        prof.end()
      
     def init_proctree(self):
-        self.ptree = DiGraph()
-        for pid, ppid in self.db.proc_sel("pid,ppid"):
-            self.ptree.add_edge(ppid, pid)
-        assert nx.is_directed_acyclic_graph(self.ptree)
+        procs = self.db.proc_sel("pid,ppid")
+        self.ptree = proctree.ProcessTree(map(lambda p:p[0], procs),
+            map(lambda p:p[1], procs))
     
     def plot_procs_stats(self):
         if self.ptree is None: self.init_proctree()
         # sort process in topology order
-        procs = nx.topological_sort(self.ptree)
-        procs.remove(0)
+        procs = self.ptree.pids[self.ptree.order()].tolist()
         n_procs = len(procs)
         
         utime_sum = 0.0
@@ -171,7 +180,9 @@ class Plot:
         self.c("set terminal %s" % self.terminal)
         self.c("set output '%s.%s'" % (prefix, self.terminal))
         self.c("set data style points")
+        prof.begin("figure.%s" % os.path.basename(prefix))
         self.c.plot(data)
+        prof.end(len(data))
         return "%s.%s" % (prefix, self.terminal)
     
     def lines_chart(self, data, prefix="lines_chart", title="lines_chart",
@@ -183,7 +194,57 @@ class Plot:
         self.c("set terminal %s" % self.terminal)
         self.c("set output '%s.%s'" % (prefix, self.terminal))
         self.c("set data style linespoints")
+        prof.begin("figure.%s" % os.path.basename(prefix))
         self.c.plot(data)
+        prof.end(len(data))
+        return "%s.%s" % (prefix, self.terminal)
+
+    def series_chart(self, series, prefix="series_chart", 
+        title="series_chart", xlabel="x label", ylabel="y label",
+        style="points"):
+        """Plot several titled data series, series is a list of 
+        (title, data)"""
+        self.c.reset()
+        self.c.title(title)
+        self.c.xlabel(xlabel)
+        self.c.ylabel(ylabel)
+        self.c("set terminal %s" % self.terminal)
+        self.c("set output '%s.%s'" % (prefix, self.terminal))
+        self.c("set data style %s" % style)
+        prof.begin("figure.%s" % os.path.basename(prefix))
+        self.c.plot(*map(lambda (t,d):Gnuplot.Data(d, title=t), series))
+        prof.end(sum(map(lambda (t,d):len(d), series)))
+        return "%s.%s" % (prefix, self.terminal)
+
+    def heatmap_chart(self, counts, first, width, row_lower, scale=1.0,
+        prefix="heatmap_chart", title="heatmap_chart", xlabel="x label",
+        ylabel="y label"):
+        """Plot counts[column, row] of time columns of width from first
+        against log10 of row_lower(row) * scale, so the figure costs the
+        same whatever the number of calls counted"""
+        ncols, nrows = counts.shape
+        x = first + (np.arange(ncols) + 0.5) * width
+        # rows are drawn at their log midpoint, row 0 has no lower bound
+        # and is drawn one row below row 1
+        lower = map(lambda r:row_lower(r) * scale, range(1, nrows))
+        step = 1.0
+        if nrows > 2: step = np.log10(lower[1] / lower[0])
+        y = map(lambda l:np.log10(l) + step / 2, lower)
+        y = [y[0] - step] + y
+        data = []
+        for i in range(0, ncols):
+            for j in range(0, nrows):
+                data.append((x[i], y[j], counts[i, j]))
+        self.c.reset()
+        self.c.title(title)
+        self.c.xlabel(xlabel)
+        self.c.ylabel(ylabel)
+        self.c("set terminal %s" % self.terminal)
+        self.c("set output '%s.%s'" % (prefix, self.terminal))
+        self.c("set palette negative grey")
+        prof.begin("figure.%s" % os.path.basename(prefix))
+        self.c.plot(Gnuplot.Data(data, with_="image"))
+        prof.end(int(counts.sum()))
         return "%s.%s" % (prefix, self.terminal)
 
 class ProcTree:
@@ -319,36 +380,46 @@ class Plot2:
 
 # Wrapper for covering networkx versions
 # Debian Etch uses v0.36, Ubuntu Karmic uses 0.99c
-class DiGraph(nx.DiGraph):
-    def __init__(self, **kwargs):
-        nx.DiGraph.__init__(self)
-        # Get networkx version to decide which API to use
-        nx_version = float(nx.release.version)
-        if nx_version < 1:
-            self.add_edge = self._add_edge_99
-            self.get_edge_data = self._get_edge_data_99
-            self.edge_data = {}
-        if nx_version < 0.99:
-            self.degree_iter = self._degree_iter_36
+# The class derives from networkx and is thus defined on first use
+_DiGraph = None
+
+def DiGraph(**kwargs):
+    global _DiGraph
+    if _DiGraph is None: _DiGraph = _digraph_class()
+    return _DiGraph(**kwargs)
+
+def _digraph_class():
+    class DiGraph(nx.DiGraph):
+        def __init__(self, **kwargs):
+            nx.DiGraph.__init__(self)
+            # Get networkx version to decide which API to use
+            nx_version = float(nx.release.version)
+            if nx_version < 1:
+                self.add_edge = self._add_edge_99
+                self.get_edge_data = self._get_edge_data_99
+                self.edge_data = {}
+            if nx_version < 0.99:
+                self.degree_iter = self._degree_iter_36
     
-    # Wrapper all add_edge() in 1.0 way
-    def _add_edge_99(self, u, v, **attr):
-        nx.DiGraph.add_edge(self, u, v) 
-        if not self.edge_data.has_key((u,v)):
-            self.edge_data[(u,v)] = {}
-        if len(attr) > 0:
-            self.edge_data[(u,v)].update(attr)
-
-    def _get_edge_data_99(self, u, v):
-        return self.edge_data[(u,v)]
-
-    def _degree_iter_36(self, nbunch=None, with_labels=True):
-        return nx.DiGraph.degree_iter(self, nbunch, with_labels)
-
-    def copy(self):
-        H = self.__class__()
-        H.name = self.name
-        return H
+        # Wrapper all add_edge() in 1.0 way
+        def _add_edge_99(self, u, v, **attr):
+            nx.DiGraph.add_edge(self, u, v) 
+            if not self.edge_data.has_key((u,v)):
+                self.edge_data[(u,v)] = {}
+            if len(attr) > 0:
+                self.edge_data[(u,v)].update(attr)
+
+        def _get_edge_data_99(self, u, v):
+            return self.edge_data[(u,v)]
+
+        def _degree_iter_36(self, nbunch=None, with_labels=True):
+            return nx.DiGraph.degree_iter(self, nbunch, with_labels)
+
+        def copy(self):
+            H = self.__class__()
+            H.name = self.name
+            return H
+    return DiGraph
 
 #
 # Graph classes for plotting 
@@ -421,7 +492,9 @@ class WorkflowDAG:
         self.paras["node_color"] = 'w'
         self.paras["font_size"] = 9
 
+        prof.begin("workflow.build")
         self._load()
+        prof.end()
     
     def __del__(self):
         self.db.close()
@@ -487,8 +560,10 @@ class WorkflowDAG:
             "shell", "graphviz", "pydot"]
         assert layout_prog in ["dot", "neato", "fdp", "circo", "twopi"]
         
+        prof.begin("workflow.layout")
         if prog == "graphviz": self.draw_graphviz(path, *args, **kws)
         elif prog == "pyplot": self.draw_pyplot(path, *args, **kws)
+        prof.end(self.g.number_of_nodes())
 
     def draw_graphviz(self, path, layout_prog="dot"):
         #TODO:WAIT
@@ -785,3 +860,132 @@ ellipse:hover {stroke-width:10; stork:red}
                 if G.get_edge_data(s, d).has_key("read"):
                     G.remove_edge(s, d)
         return nx.topological_sort_recursive(G)
+
+    def critical_path(self):
+        """Compute the weighted longest path of the workflow
+
+        Process nodes weigh their elapsed time less the time they spent
+        in traced reads and writes, read/write edges weigh that I/O time
+        and file nodes weigh nothing. A fork edge lets the child start 
+        at its begin time offset from the parent instead of after the 
+        whole parent. Cycles, e.g. a process reading back its own output,
+        are broken by dropping the read edge of two-node cycles and then
+        any remaining DFS back edge.
+
+        Return (path, makespan, io_time, slack): path is the list of 
+        nodes on the critical chain, io_time the I/O time along it, and
+        slack maps every node to how much it could be delayed without
+        extending the makespan.
+        """
+        elapsed = {}
+        btime = {}
+        for pid, b, e in self.db.proc_sel("pid,btime,elapsed"):
+            btime[pid] = b
+            elapsed[pid] = e
+        eweight = {}
+        iotime = {}
+        for s, d in self.g.edges():
+            data = self.g.get_edge_data(s, d)
+            t = 0.0
+            for k in ["read", "write"]:
+                if data.has_key(k) and data[k] is not None \
+                    and data[k][0] is not None:
+                    t += data[k][0]
+            eweight[(s, d)] = t
+            if t > 0:
+                if s[0] == 'p': p = s
+                else: p = d
+                iotime[p] = iotime.get(p, 0.0) + t
+
+        nweight = {}
+        for n in self.g.nodes():
+            nweight[n] = 0.0
+            if n[0] == 'p' and elapsed.get(int(n[1:])) is not None:
+                nweight[n] = max(elapsed[int(n[1:])] - iotime.get(n, 0.0),
+                    0.0)
+        
+        # time from the start of s to the start of d
+        step = {}
+        for s, d in eweight.keys():
+            if self.g.get_edge_data(s, d).has_key("fork"):
+                b_s, b_d = btime.get(int(s[1:])), btime.get(int(d[1:]))
+                if b_s is None or b_d is None: step[(s, d)] = 0.0
+                else: step[(s, d)] = max(b_d - b_s, 0.0)
+            else:
+                step[(s, d)] = nweight[s] + eweight[(s, d)]
+        
+        edges = set(eweight.keys())
+        for s, d in list(edges):
+            if (d, s) in edges and \
+                self.g.get_edge_data(s, d).has_key("read"):
+                edges.discard((s, d))
+        succ = {}
+        for n in nweight.keys(): succ[n] = []
+        for s, d in edges: succ[s].append(d)
+        for s, d in self._back_edges(succ): succ[s].remove(d)
+
+        # longest path to the start of each node, in topological order
+        indeg = dict.fromkeys(succ.keys(), 0)
+        for n in succ:
+            for d in succ[n]: indeg[d] += 1
+        order = filter(lambda n:indeg[n] == 0, succ.keys())
+        head = dict.fromkeys(succ.keys(), 0.0)
+        best = {}
+        i = 0
+        while i < len(order):
+            n = order[i]
+            i += 1
+            for d in succ[n]:
+                h = head[n] + step[(n, d)]
+                if not best.has_key(d) or h > head[d]:
+                    head[d] = h
+                    best[d] = n
+                indeg[d] -= 1
+                if indeg[d] == 0: order.append(d)
+        if len(order) == 0: return [], 0.0, 0.0, {}
+
+        # longest path from the start of each node to the end
+        tail = {}
+        for n in reversed(order):
+            tail[n] = nweight[n]
+            for d in succ[n]:
+                tail[n] = max(tail[n], step[(n, d)] + tail[d])
+        
+        end = max(order, key=lambda n:head[n] + nweight[n])
+        makespan = head[end] + nweight[end]
+        slack = {}
+        for n in order:
+            slack[n] = max(makespan - head[n] - tail[n], 0.0)
+        
+        path = [end]
+        io_time = 0.0
+        while best.has_key(path[-1]):
+            p = best[path[-1]]
+            io_time += eweight[(p, path[-1])]
+            path.append(p)
+        path.reverse()
+        return path, makespan, io_time, slack
+
+    def _back_edges(self, succ):
+        """Return the back edges found by an iterative depth-first search,
+        removing them leaves the graph acyclic"""
+        WHITE, GREY, BLACK = 0, 1, 2
+        color = dict.fromkeys(succ.keys(), WHITE)
+        back = []
+        for root in succ.keys():
+            if color[root] != WHITE: continue
+            color[root] = GREY
+            stack = [(root, iter(succ[root]))]
+            while stack:
+                n, it = stack[-1]
+                for d in it:
+                    if color[d] == GREY:
+                        back.append((n, d))
+                    elif color[d] == WHITE:
+                        color[d] = GREY
+                        stack.append((d, iter(succ[d])))
+                        break
+                else:
+                    color[n] = BLACK
+                    stack.pop()
+        return back
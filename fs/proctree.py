@@ -0,0 +1,156 @@
+#############################################################################
+# ParaTrac: Scalable Tracking Tools for Parallel Applications
+# Copyright (C) 2009,2010  Nan Dun <dunnan@yl.is.s.u-tokyo.ac.jp>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#############################################################################
+
+#
+# fs/proctree.py
+# Array-based process tree
+#
+# Processes are numbered by rank of pid. The tree is a parent index
+# array plus the children of every node in compressed sparse rows, and
+# it is walked one level at a time, so each computation is a few numpy
+# operations per level and linear in the number of processes overall.
+# Processes whose parent was not traced are roots, processes on a parent
+# cycle (as from pid reuse) are unreachable and left out.
+#
+
+import numpy
+
+class ProcessTree:
+    def __init__(self, pid, ppid):
+        """Build tree from arrays of pid and parent pid, the first entry
+        of a duplicated pid is kept"""
+        pid = numpy.asarray(pid, dtype=numpy.int64)
+        ppid = numpy.asarray(ppid, dtype=numpy.int64)
+        self.pids, first = numpy.unique(pid, return_index=True)
+        ppid = ppid[first]
+        n = len(self.pids)
+
+        self.parent = -numpy.ones(n, dtype=numpy.int64)
+        if n > 0:
+            i = numpy.minimum(numpy.searchsorted(self.pids, ppid), n - 1)
+            known = (self.pids[i] == ppid) & (ppid != self.pids)
+            self.parent[known] = i[known]
+        self.roots = numpy.flatnonzero(self.parent < 0)
+
+        # children of node k are children[offsets[k]:offsets[k+1]],
+        # ordered by pid
+        child = numpy.flatnonzero(self.parent >= 0)
+        self.children = child[numpy.argsort(self.parent[child],
+            kind="mergesort")]
+        self.nchildren = numpy.bincount(self.parent[child], minlength=n)
+        self.offsets = numpy.zeros(n + 1, dtype=numpy.int64)
+        numpy.cumsum(self.nchildren, out=self.offsets[1:])
+        self.levels = self._levels()
+
+    def __len__(self):
+        return len(self.pids)
+
+    def index(self, pid):
+        """Return node of pid, -1 if not in tree"""
+        k = numpy.searchsorted(self.pids, pid)
+        if k < len(self.pids) and self.pids[k] == pid: return int(k)
+        return -1
+
+    def _children_of(self, nodes):
+        """Return children of nodes concatenated in order of nodes"""
+        start = self.offsets[nodes]
+        count = self.nchildren[nodes]
+        total = int(count.sum())
+        if total == 0: return numpy.zeros(0, dtype=numpy.int64)
+        base = numpy.repeat(start - (numpy.cumsum(count) - count), count)
+        return self.children[base + numpy.arange(total)]
+
+    def _levels(self):
+        levels = []
+        frontier = self.roots
+        while len(frontier) > 0:
+            levels.append(frontier)
+            frontier = self._children_of(frontier)
+        return levels
+
+    def order(self):
+        """Return nodes with every parent before its children"""
+        if len(self.levels) == 0: return numpy.zeros(0, dtype=numpy.int64)
+        return numpy.concatenate(self.levels)
+
+    def depth(self):
+        """Return depth of every node, roots are 0 and unreachable -1"""
+        depth = -numpy.ones(len(self), dtype=numpy.int64)
+        for d, nodes in enumerate(self.levels): depth[nodes] = d
+        return depth
+
+    def subtree_sum(self, values):
+        """Return sum of values over the subtree of every node"""
+        total = numpy.array(values, dtype=numpy.float64)
+        for nodes in reversed(self.levels[1:]):
+            numpy.add.at(total, self.parent[nodes], total[nodes])
+        return total
+
+    def subtree_size(self):
+        return self.subtree_sum(numpy.ones(len(self))).astype(numpy.int64)
+
+    def euler(self):
+        """Return (enter, exit) depth-first numbers, the subtree of a node
+        holds the nodes with enter in [enter, exit] of it"""
+        size = self.subtree_size()
+        enter = -numpy.ones(len(self), dtype=numpy.int64)
+        if len(self.roots) == 0: return enter, enter.copy()
+        enter[self.roots] = numpy.cumsum(size[self.roots]) - \
+            size[self.roots]
+        for nodes in self.levels[:-1]:
+            ch = self._children_of(nodes)
+            if len(ch) == 0: continue
+            # siblings follow each other, each after the subtrees of
+            # the ones before it
+            count = self.nchildren[nodes]
+            cs = numpy.cumsum(size[ch]) - size[ch]
+            first = numpy.cumsum(count) - count
+            base = numpy.repeat(cs[first[count > 0]], count[count > 0])
+            enter[ch] = enter[self.parent[ch]] + 1 + cs - base
+        exit = numpy.where(enter >= 0, enter + size - 1, -1)
+        return enter, exit
+
+    def fanout(self):
+        """Return (fanout, processes) distribution of children counts"""
+        hist = numpy.bincount(self.nchildren) if len(self) > 0 \
+            else numpy.zeros(0, dtype=numpy.int64)
+        nz = numpy.flatnonzero(hist)
+        return nz, hist[nz]
+
+    def longest_chain(self, weights):
+        """Return (weight, nodes) of the root to leaf chain of largest
+        total weight, such as the lifetimes of an exec chain"""
+        if len(self.roots) == 0: return 0.0, []
+        # best of a node is its weight plus the best of its children
+        best = numpy.array(weights, dtype=numpy.float64)
+        below = numpy.zeros(len(self))
+        for nodes in reversed(self.levels):
+            best[nodes] = best[nodes] + below[nodes]
+            has = self.parent[nodes] >= 0
+            numpy.maximum.at(below, self.parent[nodes[has]],
+                best[nodes[has]])
+        node = self.roots[numpy.argmax(best[self.roots])]
+        total = float(best[node])
+        chain = [int(node)]
+        while self.nchildren[node] > 0:
+            ch = self.children[self.offsets[node]:self.offsets[node+1]]
+            node = ch[numpy.argmax(best[ch])]
+            chain.append(int(node))
+        return total, chain
+
+__all__ = ["ProcessTree"]
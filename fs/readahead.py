@@ -0,0 +1,195 @@
+#############################################################################
+# ParaTrac: Scalable Tracking Tools for Parallel Applications
+# Copyright (C) 2009,2010  Nan Dun <dunnan@yl.is.s.u-tokyo.ac.jp>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#############################################################################
+
+#
+# fs/readahead.py
+# What-if readahead simulation over the read stream
+#
+# Reads are replayed in stamp order and split into streams by (pid,
+# fid). Each stream keeps one prefetched window of bytes ahead of the
+# last read; bytes of a read found in the window are hits, prefetched
+# bytes dropped or never read are wasted.
+#
+
+from collections import OrderedDict
+
+from modules.utils import SYSCALL, KB
+
+class Readahead:
+    """Readahead state of one stream, subclasses choose what to prefetch"""
+    def __init__(self, max_window=128*KB):
+        self.max_window = max_window
+        self.next = None        # offset a sequential read starts at
+        self.start = 0          # unconsumed prefetched bytes [start, end)
+        self.end = 0
+        self.size = 0           # size of the current window
+        self.prefetched = 0
+        self.wasted = 0
+
+    def target(self, off, length, sequential):
+        """Return offset up to which to prefetch after this read"""
+        return 0
+
+    def read(self, off, length):
+        """Account a read, return number of its bytes already prefetched"""
+        end = off + length
+        sequential = self.next is not None and off == self.next
+        hit = max(0, min(end, self.end) - max(off, self.start))
+        if hit > 0:
+            # bytes before the read are skipped for good
+            self.wasted += max(0, off - self.start)
+            self.start = end
+        elif not sequential:
+            self.drop()
+        if self.start >= self.end: self.start = self.end = end
+
+        t = self.target(off, length, sequential)
+        if t > self.end:
+            self.prefetched += t - self.end
+            self.end = t
+        self.next = end
+        return hit
+
+    def drop(self):
+        self.wasted += self.end - self.start
+        self.start = self.end
+
+    def close(self):
+        self.drop()
+
+class FixedReadahead(Readahead):
+    """Keep a constant window ahead of sequential reads"""
+    def __init__(self, window=128*KB):
+        Readahead.__init__(self, window)
+
+    def target(self, off, length, sequential):
+        if not sequential: return 0
+        return off + length + self.max_window
+
+class DoublingReadahead(Readahead):
+    """Double the window on every sequential read up to the maximum and
+    fall back to the initial window after a random read"""
+    def __init__(self, initial=16*KB, max_window=1024*KB):
+        Readahead.__init__(self, max_window)
+        self.initial = initial
+
+    def target(self, off, length, sequential):
+        if not sequential:
+            self.size = 0
+            return 0
+        if self.size == 0: self.size = self.initial
+        else: self.size = min(2 * self.size, self.max_window)
+        return off + length + self.size
+
+class LinuxReadahead(Readahead):
+    """On-demand readahead after Linux mm/readahead.c
+
+    A read at offset zero or following the previous one starts a window
+    sized from the request. Once a read enters the async part of the
+    window, the next window is issued right after the current one,
+    growing fourfold while small and twofold after.
+    """
+    def __init__(self, max_window=128*KB):
+        Readahead.__init__(self, max_window)
+        self.async_size = 0
+
+    def init_size(self, length):
+        size = 4 * KB
+        while size < length: size *= 2
+        if size <= self.max_window / 32: size *= 4
+        elif size <= self.max_window / 4: size *= 2
+        return min(size, self.max_window)
+
+    def next_size(self):
+        if self.size < self.max_window / 16:
+            return min(4 * self.size, self.max_window)
+        return min(2 * self.size, self.max_window)
+
+    def target(self, off, length, sequential):
+        if not sequential and off != 0:
+            self.size = 0
+            return 0
+        end = off + length
+        if self.size == 0 or self.end <= off:
+            # synchronous readahead on a miss
+            if self.size == 0: self.size = self.init_size(length)
+            else: self.size = self.next_size()
+            self.async_size = max(self.size - length, 0)
+            return off + self.size
+        if end > self.end - self.async_size:
+            self.size = self.next_size()
+            self.async_size = self.size
+            return self.end + self.size
+        return 0
+
+POLICIES = OrderedDict([("fixed", FixedReadahead),
+    ("doubling", DoublingReadahead), ("linux", LinuxReadahead)])
+
+class ReadaheadSim:
+    """Replay reads through readahead policies
+
+    A policy is given as (name, class, keyword arguments), by default
+    every class of POLICIES with its default window.
+    """
+    def __init__(self, db):
+        self.db = db
+
+    def run(self, policies=None):
+        """Simulate, return list of (name, reads, read bytes, prefetched
+        bytes, hit reads, hit bytes, wasted bytes, saved latency)"""
+        if policies is None:
+            policies = map(lambda (n,c):(n, c, {}), POLICIES.items())
+        n = len(policies)
+        streams = {}
+        reads = nbytes = 0
+        hits = [0] * n
+        hbytes = [0] * n
+        saved = [0.0] * n
+        for calls in self.db.sysc_chunks("pid,fid,elapsed,aux1,aux2",
+            order="stamp", sysc=SYSCALL["read"]):
+            calls = calls[calls.aux1 > 0]
+            reads += len(calls)
+            nbytes += int(calls.aux1.sum())
+            for pid, fid, elapsed, length, off in zip(calls.pid.tolist(),
+                calls.fid.tolist(), calls.elapsed.tolist(),
+                calls.aux1.tolist(), calls.aux2.tolist()):
+                s = streams.get((pid, fid))
+                if s is None:
+                    s = map(lambda (_,c,kw):c(**kw), policies)
+                    streams[(pid, fid)] = s
+                for i in xrange(n):
+                    hit = s[i].read(off, length)
+                    if hit == 0: continue
+                    hbytes[i] += hit
+                    if hit == length: hits[i] += 1
+                    # a partly prefetched read still waits for the rest
+                    saved[i] += elapsed * hit / length
+
+        res = []
+        for i, (name, _, _) in enumerate(policies):
+            prefetched = wasted = 0
+            for s in streams.values():
+                s[i].close()
+                prefetched += s[i].prefetched
+                wasted += s[i].wasted
+            res.append((name, reads, nbytes, prefetched, hits[i], hbytes[i],
+                wasted, saved[i]))
+        return res
+
+__all__ = ["ReadaheadSim", "POLICIES", "Readahead", "FixedReadahead",
+    "DoublingReadahead", "LinuxReadahead"]
@@ -0,0 +1,318 @@
+#############################################################################
+# ParaTrac: Scalable Tracking Tools for Parallel Applications
+# Copyright (C) 2009,2010  Nan Dun <dunnan@yl.is.s.u-tokyo.ac.jp>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#############################################################################
+
+#
+# fs/replay.py
+# Replay of traced system calls against a target directory
+#
+# The file tree of the trace is recreated under the target directory,
+# files read before being written in the trace are filled to the extent
+# they were read. Calls are then re-issued in stamp order by a pool of
+# worker threads; the calls of one traced process always go to the same
+# worker, so each process keeps its call order and its own descriptors.
+# Calls that failed in the trace are skipped, and only writes and creat
+# create files. A worker that fails stops the replay. In "fast" mode calls are issued as fast as possible, in "timed" mode
+# no call is issued before its traced time since the first call.
+#
+
+import os
+import sys
+import time
+import json
+import Queue
+import threading
+
+import numpy
+
+from modules.utils import SYSCALL
+from modules import sketch
+
+class ReplayWorker(threading.Thread):
+    def __init__(self, replayer):
+        threading.Thread.__init__(self)
+        self.r = replayer
+        self.queue = Queue.Queue(maxsize=replayer.QUEUE_SIZE)
+        self.fds = {}
+        self.latency = {}
+        self.counts = {}
+        self.errors = {}
+        self.nread = 0
+        self.nwritten = 0
+        self.zeros = ""
+        self.failure = None
+
+    def run(self):
+        pending = {}
+        try:
+            while True:
+                batch = self.queue.get()
+                if batch is None: break
+                for call in batch:
+                    sc, lat = self.issue(call)
+                    if sc is None: continue
+                    pending.setdefault(sc, []).append(lat)
+                # latencies are counted in batches to keep numpy calls few
+                for sc, lats in pending.items():
+                    if len(lats) < 4096: continue
+                    self.count(sc, lats)
+                    del pending[sc]
+        except Exception, e:
+            # the replayer stops feeding a worker that has exited
+            self.failure = "%s: %s" % (e.__class__.__name__, e)
+        for sc, lats in pending.items(): self.count(sc, lats)
+        for fd in self.fds.values():
+            try: os.close(fd)
+            except OSError: pass
+
+    def count(self, sc, lats):
+        if not self.latency.has_key(sc):
+            self.latency[sc] = sketch.LogHistogram()
+        self.latency[sc].update(lats)
+        self.counts[sc] = self.counts.get(sc, 0) + len(lats)
+
+    def fd(self, pid, fid, flags=os.O_RDWR):
+        """Return descriptor of fid in process pid, opened with flags if
+        the process has none, only writes and creat create files"""
+        fd = self.fds.get((pid, fid))
+        if fd is None:
+            fd = os.open(self.r.paths[fid], flags, 0644)
+            self.fds[(pid, fid)] = fd
+        return fd
+
+    def issue(self, call):
+        """Issue one call, return (syscall, latency) or (None, None) if it
+        is not replayed"""
+        stamp, pid, sc, fid, length, off = call
+        if self.r.mode == "timed":
+            delay = self.r.t0 + (stamp - self.r.s0) - time.time()
+            if delay > 0: time.sleep(delay)
+        if not self.r.paths.has_key(fid): return None, None
+        path = self.r.paths[fid]
+        S = self.r.SC
+        t0 = time.time()
+        try:
+            if sc == S["read"]:
+                fd = self.fd(pid, fid)
+                os.lseek(fd, off, 0)
+                self.nread += len(os.read(fd, length))
+            elif sc == S["write"]:
+                if len(self.zeros) < length: self.zeros = "\0" * length
+                fd = self.fd(pid, fid, os.O_RDWR|os.O_CREAT)
+                os.lseek(fd, off, 0)
+                self.nwritten += os.write(fd, buffer(self.zeros, 0, length))
+            elif sc == S["open"]:
+                self.close(pid, fid)
+                self.fd(pid, fid)
+            elif sc == S["creat"]:
+                self.close(pid, fid)
+                self.fd(pid, fid, os.O_RDWR|os.O_CREAT|os.O_TRUNC)
+            elif sc == S["close"]:
+                self.close(pid, fid)
+            elif sc == S["lstat"]: os.lstat(path)
+            elif sc == S["fstat"]: os.fstat(self.fd(pid, fid))
+            elif sc == S["access"]: os.access(path, os.F_OK)
+            elif sc == S["unlink"]:
+                self.close(pid, fid)
+                os.unlink(path)
+            else: return None, None
+        except OSError:
+            self.errors[sc] = self.errors.get(sc, 0) + 1
+        return sc, time.time() - t0
+
+    def close(self, pid, fid):
+        fd = self.fds.pop((pid, fid), None)
+        if fd is not None: os.close(fd)
+
+class Replayer:
+    def __init__(self, db, target, mode="fast", workers=None):
+        """Replay into target directory, workers defaults to one per
+        traced process up to MAX_WORKERS"""
+        assert mode in ["fast", "timed"]
+        self.db = db
+        self.target = os.path.abspath(target)
+        self.mode = mode
+        self.MAX_WORKERS = 256
+        if workers is None:
+            self.db.cur.execute("SELECT COUNT(DISTINCT pid) FROM sysc%s"
+                % self.db.sysc_where())
+            workers = min(self.db.cur.fetchone()[0] or 1, self.MAX_WORKERS)
+        self.workers = max(workers, 1)
+        self.QUEUE_SIZE = 16
+        self.BATCH_SIZE = 256
+        self.SC = {}
+        for name in ["read", "write", "open", "creat", "close", "lstat",
+            "fstat", "access", "unlink"]:
+            self.SC[name] = SYSCALL[name]
+
+    def target_path(self, path, mountpoint):
+        """Map a traced path to a path below the target directory"""
+        if mountpoint and path.startswith(mountpoint.rstrip("/") + "/"):
+            path = path[len(mountpoint.rstrip("/")):]
+        path = os.path.normpath("/" + path).lstrip("/")
+        return os.path.join(self.target, path)
+
+    def prepare(self):
+        """Recreate directories and pre-existing file contents, return
+        number of files created"""
+        mountpoint = self.db.runtime_get_value("mountpoint")
+        self.paths = {}
+        for fid, path in self.db.file_sel("fid,path"):
+            self.paths[fid] = self.target_path(path, mountpoint)
+
+        # extent read of files that existed before being written
+        extent = {}
+        created = set()
+        S = self.SC
+        for calls in self.db.sysc_chunks("sysc,fid,res,aux1,aux2",
+            order="stamp"):
+            calls = calls[calls.res >= 0]
+            for sc, fid, length, off in zip(calls.sysc.tolist(),
+                calls.fid.tolist(), calls.aux1.tolist(), calls.aux2.tolist()):
+                if fid in created: continue
+                if sc in (S["creat"], S["write"]): created.add(fid)
+                elif sc == S["read"]:
+                    extent[fid] = max(extent.get(fid, 0), off + length)
+                elif sc in (S["open"], S["lstat"], S["fstat"], S["access"]):
+                    extent.setdefault(fid, 0)
+
+        n = 0
+        for fid, path in self.paths.items():
+            d = os.path.dirname(path)
+            if not os.path.exists(d): os.makedirs(d)
+            if not extent.has_key(fid) or os.path.exists(path): continue
+            f = open(path, "w")
+            f.truncate(extent[fid])
+            f.close()
+            n += 1
+        return n
+
+    def run(self):
+        """Replay all calls, return dict of results"""
+        self.prepare()
+        pool = map(lambda i:ReplayWorker(self), range(0, self.workers))
+        assign = {}
+        batches = map(lambda w:[], pool)
+        self.s0 = None
+        for w in pool: w.start()
+        self.t0 = time.time()
+        calls = 0
+        failed = 0
+        feeding = True
+        try:
+            for chunk in self.db.sysc_chunks(
+                "stamp,pid,sysc,fid,res,aux1,aux2", order="stamp"):
+                if self.s0 is None and len(chunk) > 0:
+                    self.s0 = chunk.stamp[0]
+                calls += len(chunk)
+                # calls that failed in the trace are not replayed
+                ok = chunk.res >= 0
+                failed += int((~ok).sum())
+                chunk = chunk[ok]
+                for call in zip(chunk.stamp.tolist(), chunk.pid.tolist(),
+                    chunk.sysc.tolist(), chunk.fid.tolist(),
+                    chunk.aux1.tolist(), chunk.aux2.tolist()):
+                    pid = call[1]
+                    i = assign.get(pid)
+                    if i is None:
+                        i = assign[pid] = len(assign) % self.workers
+                    batches[i].append(call)
+                    if len(batches[i]) >= self.BATCH_SIZE:
+                        feeding = self._put(pool[i], batches[i])
+                        batches[i] = []
+                        if not feeding: break
+                if not feeding: break
+        finally:
+            for i, w in enumerate(pool):
+                if feeding and len(batches[i]) > 0:
+                    self._put(w, batches[i])
+                self._put(w, None)
+            for w in pool: w.join()
+        elapsed = time.time() - self.t0
+        return self._results(pool, calls, failed, elapsed, len(assign))
+
+    def _put(self, worker, batch):
+        """Queue batch to worker, return False if the worker has exited"""
+        while worker.is_alive():
+            try:
+                worker.queue.put(batch, timeout=0.1)
+                return True
+            except Queue.Full: pass
+        return False
+
+    def _results(self, pool, calls, failed, elapsed, procs):
+        hists = {}
+        counts = {}
+        errors = {}
+        for w in pool:
+            for sc, h in w.latency.items():
+                if not hists.has_key(sc): hists[sc] = sketch.LogHistogram()
+                hists[sc].counts += h.counts
+                hists[sc].total += h.total
+            for sc, c in w.counts.items(): counts[sc] = counts.get(sc, 0) + c
+            for sc, c in w.errors.items(): errors[sc] = errors.get(sc, 0) + c
+        nread = sum(map(lambda w:w.nread, pool))
+        nwritten = sum(map(lambda w:w.nwritten, pool))
+
+        traced = {}
+        for sc in counts.keys():
+            traced[sc] = (self.db.sysc_avg(sc, "elapsed") or 0.0)
+        sysc = []
+        for sc in sorted(counts.keys()):
+            h = hists[sc]
+            nz = numpy.flatnonzero(h.counts)
+            sysc.append({"sysc":SYSCALL[sc], "calls":counts[sc],
+                "errors":errors.get(sc, 0), "traced_avg":traced[sc],
+                "p50":h.quantile(0.5), "p90":h.quantile(0.9),
+                "p99":h.quantile(0.99), "max":h.value(nz[-1]),
+                "histogram":zip(map(h.value, nz.tolist()),
+                    h.counts[nz].tolist())})
+        return {"mode":self.mode, "target":self.target, "workers":len(pool),
+            "procs":procs, "calls":calls, "failed":failed,
+            "replayed":sum(counts.values()), "worker_failures":filter(None,
+            map(lambda w:w.failure, pool)),
+            "elapsed":elapsed, "calls_per_sec":sum(counts.values()) /
+            max(elapsed, 1.0e-9), "read_bytes":nread,
+            "written_bytes":nwritten, "read_bytes_per_sec":nread /
+            max(elapsed, 1.0e-9), "written_bytes_per_sec":nwritten /
+            max(elapsed, 1.0e-9), "sysc":sysc}
+
+def summary(res, out=sys.stdout):
+    """Write replay results as text"""
+    out.write("replayed %d of %d calls of %d processes in %.3f seconds "
+        "(%s mode, %d workers), %d calls failed in the trace\n"
+        % (res["replayed"], res["calls"], res["procs"], res["elapsed"],
+        res["mode"], res["workers"], res["failed"]))
+    for failure in res["worker_failures"]:
+        out.write("replay stopped, worker failed: %s\n" % failure)
+    out.write("%.1f calls/s, read %.2f MB/s, write %.2f MB/s\n" % (
+        res["calls_per_sec"], res["read_bytes_per_sec"] / 1.0e06,
+        res["written_bytes_per_sec"] / 1.0e06))
+    out.write("%-10s %10s %8s %12s %12s %12s %12s %12s\n" % ("syscall",
+        "calls", "errors", "traced_avg", "p50", "p90", "p99", "max"))
+    for s in res["sysc"]:
+        out.write("%-10s %10d %8d %10.3fus %10.3fus %10.3fus %10.3fus "
+            "%10.3fus\n" % (s["sysc"], s["calls"], s["errors"],
+            s["traced_avg"] * 1.0e06, s["p50"] * 1.0e06, s["p90"] * 1.0e06,
+            s["p99"] * 1.0e06, s["max"] * 1.0e06))
+
+def save(res, path):
+    f = open(path, "w")
+    json.dump(res, f, indent=1, sort_keys=True)
+    f.close()
+
+__all__ = ["Replayer", "ReplayWorker", "summary", "save"]
@@ -24,12 +24,23 @@
 import sys
 import os
 import time
+import errno
+
+import numpy
 
 import version
 import modules.utils as utils
 import modules.DHTML as DHTML
+import modules.sketch as sketch
+import modules.prof as prof
 import data
-import plot
+import analysis
+import cachesim
+import reuse
+import readahead
+import dataflow
+import schedsim
+import proctree
 
 FUSETRAC_SYSCALL = ["lstat", "fstat", "access", "readlink", "opendir", 
     "readdir", "closedir", "mknod", "mkdir", "symlink", "unlink", "rmdir", 
@@ -37,10 +48,23 @@ FUSETRAC_SYSCALL = ["lstat", "fstat", "access", "readlink", "opendir",
     "open", "statfs", "flush", "close", "fsync", "read", "write"]
 
 class Report():
-    def __init__(self, dbpath):
+    def __init__(self, dbpath, figures=True, start=None, end=None, 
+        pid=None, groups=None):
+        """Report on calls in [start, end) seconds of tracing time of
+        process pid and its descendants, None for no restriction, with
+        latency heatmaps per process group if groups is "exec" or
+        "subtree" (see pid_groups)"""
         self.datadir = os.path.dirname(dbpath)
+        self.groups = groups
         self.db = data.Database(dbpath)
-        self.plot = plot.Plot(self.datadir)
+        self.scope = (start, end, pid)
+        self.db.set_scope(start, end, pid)
+        # plotting backends are only loaded if figures are wanted
+        self.figures = figures
+        self.plot = None
+        if figures:
+            import plot
+            self.plot = plot.Plot(self.datadir)
         
         # report root dir
         self.rdir = os.path.abspath("%s/report" % self.datadir)
@@ -83,6 +107,10 @@ class Report():
         
         cdff = "N/A"
         distf = "N/A"
+        heatmaps = {}
+        if plot:
+            names, first, width, counts = self.latency_heatmap()
+            heatmaps = dict(zip(names, counts))
         for sc in syscalls:
             sc_num = utils.SYSCALL[sc]
             cnt = self.db.sysc_count(sc_num)
@@ -94,14 +122,13 @@ class Report():
             total_cnt += cnt
             total_elapsed += elapsed_sum
             
-            if plot:
-                distf = self.plot.points_chart(
-                    data=map(lambda (x,y):(x,y*unit_scale), 
-                        self.db.sysc_sel(sc_num, "stamp,elapsed")),
+            if plot and heatmaps.has_key(sc):
+                distf = self.plot.heatmap_chart(heatmaps[sc], first, width,
+                    analysis.latency_row_lower, unit_scale,
                     prefix="%s/dist-%s" % (self.fdir, sc),
                     title="Distribution of Latency of %s" % sc,
                     xlabel="Tracing Time (seconds)",
-                    ylabel="Latency (%s)" % unit_str)
+                    ylabel="Latency (log10 %s)" % unit_str)
 
             if plot:
                 cdff = self.plot.lines_chart(
@@ -117,6 +144,111 @@ class Report():
 
         return stats, total_cnt, total_elapsed
 
+    def latency_heatmap(self, columns=200, groups=None):
+        """Count calls by time column and log latency row (see
+        analysis.latency_row) in one pass over the trace
+
+        Return (names, first, width, counts) where counts[i] is the
+        heatmap of names[i] with columns of width seconds from stamp
+        first. Names are syscalls, or (syscall, group) if groups maps pids
+        to group names, calls of other pids are then left out. Empty
+        heatmaps are omitted. Non-empty cells are saved to
+        data/latency_heatmap.dat, or data/latency_heatmap_groups.dat.
+        """
+        first, last = self.db.sysc_span()
+        width = max(last - first, 1.0e-6) / columns
+        scs = numpy.array(sorted(filter(lambda k:isinstance(k, int),
+            utils.SYSCALL.keys())))
+        gnames = [None]
+        if groups is not None:
+            gnames = sorted(set(groups.values()))
+            gpids = numpy.array(sorted(groups.keys()), dtype=numpy.int64)
+            gindex = dict(map(lambda (i, g):(g, i), enumerate(gnames)))
+            gids = numpy.array(map(lambda p:gindex[groups[p]],
+                gpids.tolist()), dtype=numpy.int64)
+        nkeys = len(scs) * len(gnames)
+        counts = numpy.zeros((nkeys, columns, analysis.HEATMAP_ROWS),
+            dtype=numpy.int64)
+        for calls in self.db.sysc_chunks("stamp,pid,sysc,elapsed"):
+            keys = numpy.searchsorted(scs, calls.sysc)
+            if groups is not None:
+                if len(gpids) == 0: break
+                i = numpy.minimum(numpy.searchsorted(gpids, calls.pid),
+                    len(gpids) - 1)
+                member = gpids[i] == calls.pid
+                calls, keys = calls[member], keys[member]
+                keys = keys * len(gnames) + gids[i[member]]
+            col = numpy.minimum(((calls.stamp - first) / width)
+                .astype(numpy.int64), columns - 1)
+            counts += analysis.heatmap(keys, col,
+                analysis.latency_row(calls.elapsed), nkeys, columns)
+
+        sel = numpy.flatnonzero(counts.sum(axis=2).sum(axis=1))
+        names = []
+        for k in sel.tolist():
+            sc = utils.SYSCALL[int(scs[k / len(gnames)])]
+            if groups is None: names.append(sc)
+            else: names.append((sc, gnames[k % len(gnames)]))
+        counts = counts[sel]
+
+        dat = "latency_heatmap"
+        if groups is not None: dat = "latency_heatmap_groups"
+        f = open("%s/%s.dat" % (self.ddir, dat), "w")
+        f.write("# name time latency count (%d columns of %f seconds, "
+            "latency is the lower bound of the row)\n" % (columns, width))
+        for name, c in zip(names, counts):
+            if groups is not None: name = "%s:%s" % name
+            for col, row in zip(*numpy.nonzero(c)):
+                f.write("%s %f %.9f %d\n" % (name, first + col * width,
+                    analysis.latency_row_lower(row), c[col, row]))
+        f.close()
+        return names, first, width, counts
+
+    def pid_groups(self, kind):
+        """Map pids in scope to group names: kind "exec" groups by
+        executable name, kind "subtree" by the subtree of each child of a
+        root process, with every root a group of its own"""
+        procs = self.db.proc_sel("pid,ppid,cmdline")
+        cmds = {}
+        for pid, _, cmd in procs:
+            cmds.setdefault(pid, os.path.basename(("%s" % (cmd or ""))
+                .split(" ")[0]) or "unknown")
+        if kind == "exec": return cmds
+        assert kind == "subtree"
+        tree = proctree.ProcessTree(map(lambda p:p[0], procs),
+            map(lambda p:p[1], procs))
+        head = numpy.arange(len(tree))
+        for nodes in tree.levels[2:]:
+            head[nodes] = head[tree.parent[nodes]]
+        groups = {}
+        for nodes in tree.levels:
+            for k in nodes.tolist():
+                h = int(tree.pids[head[k]])
+                groups[int(tree.pids[k])] = "%d-%s" % (h, cmds[h])
+        return groups
+
+    def group_heatmap_stats(self, kind, plot=False):
+        """Count calls of each process group (see pid_groups) in
+        latency heatmaps, return rows of (group, syscall, calls, figure)
+        ordered by group"""
+        names, first, width, counts = self.latency_heatmap(
+            groups=self.pid_groups(kind))
+        unit_str, unit_scale = self.unit["latency"]
+        stats = []
+        for (sc, group), c in sorted(zip(names, counts),
+            key=lambda (n, c):(n[1], n[0])):
+            fig = "N/A"
+            if plot:
+                fig = self.plot.heatmap_chart(c, first, width,
+                    analysis.latency_row_lower, unit_scale,
+                    prefix="%s/dist-%s-%s" % (self.fdir, sc, group),
+                    title="Distribution of Latency of %s in %s"
+                        % (sc, group),
+                    xlabel="Tracing Time (seconds)",
+                    ylabel="Latency (log10 %s)" % unit_str)
+            stats.append((group, sc, int(c.sum()), fig))
+        return stats
+
     def io_stats(self, plot=False):
         syscalls = ["read", "write"]
         stats = []
@@ -186,6 +318,483 @@ class Report():
 
         return stats, total_bytes
 
+    def access_stats(self):
+        """Classify read/write requests of each (pid, fid) stream by 
+        access pattern, return summary, per-file and per-process rows"""
+        stats = []
+        files = []
+        procs = []
+        for sc in ["read", "write"]:
+            reqs = self.db.sysc_arrays("pid,fid,stamp,aux1,aux2",
+                sysc=utils.SYSCALL[sc])
+            if len(reqs) == 0: continue
+            order, cls, start = analysis.access_pattern(reqs.pid, reqs.fid,
+                reqs.stamp, reqs.aux2, reqs.aux1)
+            length = reqs.aux1[order]
+            for row in analysis.access_summary(cls, start, length):
+                stats.append((sc,) + row)
+            
+            fids, counts, nbytes = analysis.group_classes(reqs.fid[order],
+                cls, length)
+            for i in range(0, len(fids)):
+                files.append((sc, fids[i], counts[i], nbytes[i]))
+            
+            pids, counts, nbytes = analysis.group_classes(reqs.pid[order],
+                cls, length)
+            for i in range(0, len(pids)):
+                procs.append((sc, pids[i], counts[i], nbytes[i]))
+
+        return stats, files, procs
+
+    def iosize_stats(self, kind="sysc"):
+        """Return list of (syscall, id, hist) of log2 request size 
+        histograms, kind is one of 'sysc', 'file' and 'proc'"""
+        stats = []
+        for sc in ["read", "write"]:
+            for id, hist in self.db.sizehist_sel(utils.SYSCALL[sc], kind):
+                stats.append((sc, id, hist))
+        return stats
+
+    def hotspot_stats(self, capacity=4096):
+        """Rank files and processes by bytes, call count and cumulative
+        latency in one streaming pass over system calls
+
+        Return a dict of sketch.TopK keyed by (kind, metric), kind is
+        'file' or 'proc', metric is 'bytes', 'calls' or 'latency'. Each
+        chunk is pre-aggregated before being fed to the counters.
+        """
+        rw = [utils.SYSCALL["read"], utils.SYSCALL["write"]]
+        tops = {}
+        for kind in ["file", "proc"]:
+            for metric in ["bytes", "calls", "latency"]:
+                tops[(kind, metric)] = sketch.TopK(capacity)
+        
+        for calls in self.db.sysc_chunks("pid,fid,sysc,elapsed,aux1"):
+            io = numpy.in1d(calls.sysc, rw)
+            for kind, keys in [("file", calls.fid), ("proc", calls.pid)]:
+                for metric, (uniq, sums) in [
+                    ("calls", analysis.group_sum(keys)),
+                    ("latency", analysis.group_sum(keys, calls.elapsed)),
+                    ("bytes", analysis.group_sum(keys[io], calls.aux1[io]))]:
+                    top = tops[(kind, metric)]
+                    for key, val in zip(uniq.tolist(), sums.tolist()):
+                        top.update(key, val)
+        return tops
+
+    def outlier_stats(self, nmad=6.0, quantile=None, windows=50):
+        """Flag system calls whose latency is beyond a robust threshold
+        of its syscall, in three streaming passes
+
+        The threshold is median + nmad * 1.4826 * MAD, and if quantile is
+        given no lower than that quantile, which caps the flagged calls
+        at 1 - quantile of each syscall. All are estimated by log
+        histogram sketches so memory is bounded. Flagged calls are
+        attributed to one of the given number of equal time windows.
+
+        Return (stats, outliers, width, wcounts): per-syscall rows of
+        (syscall, count, median, MAD, threshold, outliers), flagged calls
+        sorted by elapsed/threshold, window width in seconds and outlier
+        count per window.
+        """
+        hists = {}
+        for calls in self.db.sysc_chunks("sysc,elapsed"):
+            for sc in numpy.unique(calls.sysc):
+                if sc not in hists: hists[sc] = sketch.LogHistogram()
+                hists[sc].update(calls.elapsed[calls.sysc == sc])
+        median = {}
+        for sc, h in hists.items(): median[sc] = h.quantile(0.5)
+
+        devs = {}
+        for calls in self.db.sysc_chunks("sysc,elapsed"):
+            for sc in numpy.unique(calls.sysc):
+                if sc not in devs: devs[sc] = sketch.LogHistogram()
+                devs[sc].update(numpy.abs(
+                    calls.elapsed[calls.sysc == sc] - median[sc]))
+        
+        scs = numpy.array(sorted(hists.keys()))
+        thresh = numpy.zeros(len(scs))
+        stats = []
+        for i, sc in enumerate(scs):
+            mad = devs[sc].quantile(0.5)
+            thresh[i] = median[sc] + nmad * 1.4826 * mad
+            if quantile is not None:
+                thresh[i] = max(thresh[i], hists[sc].quantile(quantile))
+            stats.append([utils.SYSCALL[int(sc)], hists[sc].total, 
+                median[sc], mad, thresh[i], 0])
+        
+        first, last = self.db.sysc_span()
+        width = max(last - first, 1.0e-6) / windows
+        fields = "stamp,window,pid,sysc,fid,elapsed,excess"
+        chunks = []
+        for calls in self.db.sysc_chunks("stamp,pid,sysc,fid,elapsed"):
+            thr = thresh[numpy.searchsorted(scs, calls.sysc)]
+            mask = calls.elapsed > thr
+            flagged = calls[mask]
+            window = numpy.minimum(((flagged.stamp - first) / width)
+                .astype(int), windows - 1)
+            chunks.append(numpy.rec.fromarrays([flagged.stamp, window,
+                flagged.pid, flagged.sysc, flagged.fid, flagged.elapsed,
+                flagged.elapsed / thr[mask]], names=fields))
+        if len(chunks) > 0: 
+            outliers = numpy.concatenate(chunks)
+        else:
+            outliers = numpy.rec.fromarrays([[]] * 7, names=fields)
+        outliers = outliers[numpy.argsort(-outliers["excess"], 
+            kind="mergesort")].view(numpy.recarray)
+        
+        counts = numpy.bincount(numpy.searchsorted(scs, outliers.sysc),
+            minlength=len(scs))
+        for i in range(0, len(scs)): stats[i][5] = int(counts[i])
+        wcounts = numpy.bincount(outliers.window.astype(int), 
+            minlength=windows)
+        return map(tuple, stats), outliers, width, wcounts
+
+    def concurrency_stats(self, windows=200):
+        """Compute number of system calls in flight by a sweep line over
+        call start and end events
+
+        Return (total, sysc, files, profile): rows of (key, calls, peak,
+        avg, busy) for all calls (key None), per syscall and per file,
+        and (time, peak) of the overall in-flight level downsampled to
+        the given number of windows.
+        """
+        calls = self.db.sysc_arrays("stamp,elapsed,sysc,fid")
+        if len(calls) == 0: return None, [], [], ([], [])
+        # stamps are taken when calls complete
+        start = calls.stamp - calls.elapsed
+        end = calls.stamp
+        
+        rows = {}
+        for kind, keys in [("all", numpy.zeros(len(calls), dtype=int)),
+            ("sysc", calls.sysc), ("file", calls.fid)]:
+            uniq, cnts = analysis.group_sum(keys)
+            _, peak, avg, busy = analysis.group_concurrency(keys, start, end)
+            rows[kind] = zip(uniq.tolist(), cnts.astype(int).tolist(), 
+                peak.tolist(), avg.tolist(), busy.tolist())
+        total = (None,) + rows["all"][0][1:]
+        sysc = map(lambda r:(utils.SYSCALL[r[0]],) + r[1:], rows["sysc"])
+        
+        times, level = analysis.concurrency(start, end)
+        wstart, wpeak = analysis.step_maxima(times, level, windows)
+        return total, sysc, rows["file"], (wstart, wpeak)
+
+    def session_stats(self):
+        """Summarize open-to-close sessions
+
+        Return (stats, hists, files): rows of (opener, sessions, closed,
+        duration avg, median, max, calls avg, read bytes avg, write bytes
+        avg) for all sessions (opener None) and per opening syscall,
+        (opener, bytes hist, duration hist) of log2 histograms of bytes
+        moved and duration in usec, and per-file rows of (fid, sessions,
+        duration avg, max, bytes avg).
+        """
+        ss = self.db.session_arrays("fid,sysc,duration,closed,calls,"
+            "rbytes,wbytes")
+        if len(ss) == 0: return [], [], []
+        nbytes = ss.rbytes + ss.wbytes
+        usec = (ss.duration * 1.0e06).astype(numpy.int64)
+        
+        stats = []
+        hists = []
+        for opener in [None] + sorted(numpy.unique(ss.sysc).tolist()):
+            if opener is None: sel = numpy.ones(len(ss), dtype=bool)
+            else: sel = ss.sysc == opener
+            dur = ss.duration[sel]
+            stats.append((opener, int(sel.sum()), int(ss.closed[sel].sum()),
+                dur.mean(), numpy.median(dur), dur.max(), 
+                ss.calls[sel].mean(), ss.rbytes[sel].mean(),
+                ss.wbytes[sel].mean()))
+            hists.append((opener, 
+                numpy.bincount(analysis.size_bucket(nbytes[sel]),
+                    minlength=analysis.SIZE_BUCKETS),
+                numpy.bincount(analysis.size_bucket(usec[sel]),
+                    minlength=analysis.SIZE_BUCKETS)))
+        
+        fids, cnts = analysis.group_sum(ss.fid)
+        _, dsum = analysis.group_sum(ss.fid, ss.duration)
+        _, bsum = analysis.group_sum(ss.fid, nbytes)
+        order = numpy.lexsort((ss.duration, ss.fid))
+        last = numpy.append(numpy.flatnonzero(numpy.diff(ss.fid[order])),
+            len(order) - 1)
+        dmax = ss.duration[order][last]
+        files = zip(fids.tolist(), cnts.astype(int).tolist(), 
+            (dsum / cnts).tolist(), dmax.tolist(), (bsum / cnts).tolist())
+        return stats, hists, files
+
+    def failure_stats(self):
+        """Compare latency of successful and failed calls per syscall in
+        one streaming pass, failed calls are those with res < 0
+
+        Return rows of (syscall, calls, failed, ok avg, ok median, ok p99,
+        failed avg, failed median, failed p99) of syscalls with failures.
+        """
+        # syscalls that ever fail are known from errstat up front, so
+        # their successful calls are counted from the first chunk
+        hists = {}
+        sums = {}
+        for sc in set(map(lambda r:r[0], self.db.errstat_sel("sysc",
+            "sysc"))):
+            for f in [True, False]:
+                hists[(sc, f)] = sketch.LogHistogram()
+                sums[(sc, f)] = 0.0
+        if len(hists) == 0: return []
+        for calls in self.db.sysc_chunks("sysc,res,elapsed"):
+            failed = calls.res < 0
+            for sc, f in hists.keys():
+                sel = (calls.sysc == sc) & (failed == f)
+                hists[(sc, f)].update(calls.elapsed[sel])
+                sums[(sc, f)] += calls.elapsed[sel].sum()
+        
+        stats = []
+        for sc in sorted(set(map(lambda k:k[0], hists.keys()))):
+            row = [utils.SYSCALL[int(sc)], 
+                hists[(sc, False)].total + hists[(sc, True)].total,
+                hists[(sc, True)].total]
+            for f in [False, True]:
+                h = hists[(sc, f)]
+                row.extend([sums[(sc, f)] / max(h.total, 1), h.quantile(0.5),
+                    h.quantile(0.99)])
+            stats.append(tuple(row))
+        return stats
+
+    def cache_stats(self, granularity="file", block_size=65536, steps=6):
+        """Simulate LRU, LFU, ARC and CLOCK caches over a geometric sweep
+        of sizes, return (block size, dict of policy to rows of (size,
+        accesses, hits, hit ratio, saved latency))"""
+        sim = cachesim.CacheSim(self.db, block_size)
+        return block_size, sim.run(granularity, 
+            sizes=sim.sizes(granularity, steps))
+
+    def reuse_stats(self, block_size=65536):
+        """Compute LRU stack distances of block accesses, return (block
+        size, global histogram, dict of fid to file histogram)"""
+        hist, fhists = reuse.ReuseAnalysis(self.db, block_size).run()
+        return block_size, hist, fhists
+
+    def readahead_stats(self):
+        """Simulate fixed, doubling and Linux readahead over per-process
+        read streams, return rows of (policy, reads, read bytes, 
+        prefetched, hit reads, hit bytes, wasted bytes, saved latency)"""
+        return readahead.ReadaheadSim(self.db).run()
+
+    def dataflow_stats(self):
+        """Match reads to the writes that produced their bytes, return
+        (flows, external, ranges) of dataflow.DataFlow.run()"""
+        return dataflow.DataFlow(self.db).run()
+
+    def overwrite_stats(self, top=20):
+        """Merge written byte ranges of each file
+
+        Return (total, files, regions): total is (files, writes, logical
+        bytes, unique bytes, write-once files, write-once bytes), files
+        rows of (fid, writes, logical, unique, max writes of a byte) and
+        regions the top rewritten regions as (fid, offset, length,
+        rewritten bytes, max writes), None if nothing was written.
+        """
+        w = self.db.sysc_arrays("fid,res,aux1,aux2",
+            sysc=utils.SYSCALL["write"])
+        length = numpy.minimum(w.aux1, w.res)
+        sel = length > 0
+        w, length = w[sel], length[sel]
+        if len(w) == 0: return None
+        
+        fids, writes = analysis.group_sum(w.fid)
+        _, logical = analysis.group_sum(w.fid, length)
+        keys, lo, hi, depth = analysis.coverage(w.fid, w.aux2, 
+            w.aux2 + length)
+        seglen = hi - lo
+        # every written file has covered ranges, so groups line up
+        _, unique = analysis.group_sum(keys, seglen)
+        maxdepth = numpy.zeros(len(fids), dtype=numpy.int64)
+        numpy.maximum.at(maxdepth, numpy.searchsorted(fids, keys), depth)
+        logical = logical.astype(numpy.int64)
+        unique = unique.astype(numpy.int64)
+        once = logical == unique
+        total = (len(fids), len(w), int(logical.sum()), int(unique.sum()),
+            int(once.sum()), int(logical[once].sum()))
+        files = zip(fids.tolist(), writes.astype(int).tolist(), 
+            logical.tolist(), unique.tolist(), maxdepth.tolist())
+        
+        # contiguous ranges written more than once form a region
+        idx = numpy.flatnonzero(depth > 1)
+        regions = []
+        if len(idx) > 0:
+            first = numpy.ones(len(idx), dtype=bool)
+            first[1:] = (keys[idx][1:] != keys[idx][:-1]) | \
+                (lo[idx][1:] != hi[idx][:-1])
+            region = numpy.cumsum(first) - 1
+            rbytes = numpy.bincount(region, 
+                weights=seglen[idx] * (depth[idx] - 1)).astype(numpy.int64)
+            rdepth = numpy.zeros(len(rbytes), dtype=numpy.int64)
+            numpy.maximum.at(rdepth, region, depth[idx])
+            starts = idx[first]
+            ends = idx[numpy.append(first[1:], True)]
+            for r in numpy.argsort(-rbytes, kind="mergesort")[:top]:
+                regions.append((int(keys[starts[r]]), int(lo[starts[r]]),
+                    int(hi[ends[r]] - lo[starts[r]]), int(rbytes[r]),
+                    int(rdepth[r])))
+        return total, files, regions
+
+    def lifecycle_stats(self, windows=200):
+        """Find intermediate files, written, then read and then unlinked
+        within the trace
+
+        Return (files, profile, written): rows of (fid, size, written
+        bytes, read bytes, writers, readers, first write, first read,
+        unlink) of each intermediate file, where size is the highest
+        offset written, (time, peak) of their total size alive between
+        first write and unlink downsampled to windows, and the bytes
+        written to all files.
+        """
+        SC_READ = utils.SYSCALL["read"]
+        SC_WRITE = utils.SYSCALL["write"]
+        SC_UNLINK = utils.SYSCALL["unlink"]
+        calls = self.db.sysc_arrays("stamp,pid,sysc,fid,res,aux1,aux2")
+        calls = calls[numpy.in1d(calls.sysc, [SC_READ, SC_WRITE, 
+            SC_UNLINK]) & (calls.res >= 0)]
+        if len(calls) == 0: return [], ([], []), 0
+        length = numpy.minimum(calls.aux1, calls.res)
+        fids, inv = numpy.unique(calls.fid, return_inverse=True)
+        n = len(fids)
+        is_write = calls.sysc == SC_WRITE
+        is_read = calls.sysc == SC_READ
+        
+        # first write, then first read after it, then first unlink after
+        def first(sel):
+            t = numpy.empty(n)
+            t.fill(numpy.inf)
+            numpy.minimum.at(t, inv[sel], calls.stamp[sel])
+            return t
+        fw = first(is_write & (length > 0))
+        fr = first(is_read & (length > 0) & (calls.stamp > fw[inv]))
+        ul = first((calls.sysc == SC_UNLINK) & (calls.stamp > fr[inv]))
+        inter = numpy.isfinite(ul)
+        
+        # written and read volume within the lifetime
+        alive = (calls.stamp >= fw[inv]) & (calls.stamp < ul[inv])
+        wsel = is_write & alive
+        size = numpy.zeros(n, dtype=numpy.int64)
+        numpy.maximum.at(size, inv[wsel], calls.aux2[wsel] + length[wsel])
+        written = numpy.bincount(inv[wsel], weights=length[wsel], 
+            minlength=n).astype(numpy.int64)
+        rsel = is_read & alive
+        nread = numpy.bincount(inv[rsel], weights=length[rsel],
+            minlength=n).astype(numpy.int64)
+        def procs(sel):
+            uniq = numpy.unique(inv[sel] * (calls.pid.max() + 1) + 
+                calls.pid[sel]) / (calls.pid.max() + 1)
+            return numpy.bincount(uniq, minlength=n)
+        writers = procs(wsel)
+        readers = procs(rsel)
+        
+        idx = numpy.flatnonzero(inter)
+        files = zip(fids[idx].tolist(), size[idx].tolist(), 
+            written[idx].tolist(), nread[idx].tolist(), 
+            writers[idx].tolist(), readers[idx].tolist(), fw[idx].tolist(),
+            fr[idx].tolist(), ul[idx].tolist())
+        
+        profile = ([], [])
+        if len(idx) > 0:
+            times = numpy.concatenate((fw[idx], ul[idx]))
+            delta = numpy.concatenate((size[idx], -size[idx]))
+            # removals before creations at equal times
+            order = numpy.lexsort((delta, times))
+            profile = analysis.step_maxima(times[order], 
+                numpy.cumsum(delta[order]), windows)
+        return files, profile, int(length[is_write].sum())
+
+    def sched_stats(self):
+        """Simulate the workflow on core counts, scheduling policies and
+        speedups of compute and storage
+
+        Return (measured, peak, cores, speedups): measured makespan, peak
+        number of processes alive in the trace, rows of (cores, makespan
+        per policy, utilization of "critical") for doubling core counts
+        and unlimited cores (None), and rows of (cpu scale, io scale,
+        makespan on peak, twice peak and unlimited cores).
+        """
+        sim = schedsim.WorkflowSim(self.db, self.dataflow_stats()[0])
+        if len(sim.tasks) == 0: return None
+        procs = self.db.proc_sel("btime,elapsed")
+        start = numpy.array(map(lambda p:p[0], procs), dtype=numpy.float64)
+        end = start + numpy.array(map(lambda p:p[1] or 0.0, procs))
+        peak = int(analysis.concurrency(start, end)[1].max())
+        
+        policies = ["fifo", "longest", "critical"]
+        cores = []
+        n = 1
+        while True:
+            c = n
+            if n >= len(sim.tasks): c = None
+            res = map(lambda p:sim.run(c, p), policies)
+            cores.append((c,) + tuple(map(lambda r:r[0], res)) + 
+                (res[-1][1],))
+            if c is None: break
+            n *= 2
+        speedups = []
+        for cpu, io in [(1.0, 0.5), (1.0, 1.0), (1.0, 2.0), (1.0, 4.0),
+            (2.0, 1.0), (2.0, 2.0)]:
+            speedups.append((cpu, io) + tuple(map(lambda c:sim.run(c,
+                cpu_scale=cpu, io_scale=io)[0], [peak, 2 * peak, None])))
+        return sim.measured(), peak, cores, speedups
+
+    def proctree_stats(self, top=50):
+        """Analyse the process tree on arrays
+
+        Return None without processes, else (summary, fanout, subtrees,
+        chain): summary is (processes, roots, depth, leaves, maximum and
+        average fanout of parents), fanout rows of (children, processes),
+        subtrees the top rows of (pid, cmdline, depth, children, size,
+        cpu, io) by CPU plus I/O time aggregated over the subtree, and
+        chain (lifetime, rows of (pid, cmdline, elapsed)) the root to leaf
+        chain of longest total lifetime.
+        """
+        procs = self.db.proc_sel("pid,ppid,elapsed,utime,stime,cmdline")
+        if len(procs) == 0: return None
+        tree = proctree.ProcessTree(map(lambda p:p[0], procs),
+            map(lambda p:p[1], procs))
+        info = {}
+        for pid, _, elapsed, utime, stime, cmd in procs:
+            info.setdefault(pid, (elapsed or 0.0, (utime or 0.0) + 
+                (stime or 0.0), "%s" % (cmd or "")))
+        pids = tree.pids.tolist()
+        elapsed = numpy.array(map(lambda p:info[p][0], pids))
+        cpu = numpy.array(map(lambda p:info[p][1], pids))
+        io = numpy.zeros(len(tree))
+        calls = self.db.sysc_arrays("pid,sysc,elapsed")
+        calls = calls[numpy.in1d(calls.sysc, [utils.SYSCALL["read"],
+            utils.SYSCALL["write"]])]
+        if len(calls) > 0:
+            upids, iot = analysis.group_sum(calls.pid, calls.elapsed)
+            k = numpy.minimum(numpy.searchsorted(tree.pids, upids), 
+                len(tree) - 1)
+            known = tree.pids[k] == upids
+            io[k[known]] = iot[known]
+
+        depth = tree.depth()
+        nchildren = tree.nchildren
+        parents = nchildren[nchildren > 0]
+        avg = 0.0
+        if len(parents) > 0: avg = float(parents.mean())
+        summary = (len(tree), len(tree.roots), int(depth.max()), 
+            int((nchildren == 0).sum()), int(nchildren.max()), avg)
+        fan, cnt = tree.fanout()
+        fanout = zip(fan.tolist(), cnt.tolist())
+
+        size = tree.subtree_size()
+        scpu = tree.subtree_sum(cpu)
+        sio = tree.subtree_sum(io)
+        subtrees = []
+        for k in numpy.argsort(-(scpu + sio), kind="mergesort")[:top]:
+            subtrees.append((pids[k], info[pids[k]][2], int(depth[k]),
+                int(nchildren[k]), int(size[k]), float(scpu[k]), 
+                float(sio[k])))
+        
+        life, nodes = tree.longest_chain(elapsed)
+        chain = map(lambda k:(pids[k], info[pids[k]][2], 
+            float(elapsed[k])), nodes)
+        return summary, fanout, subtrees, (life, chain)
+
     def proc_stats(self):
         stats = []
         stats.append((
@@ -200,8 +809,9 @@ class Report():
         return stats
 
 class HTMLReport(Report):
-    def __init__(self, dbpath):
-        Report.__init__(self, dbpath)
+    def __init__(self, dbpath, figures=True, start=None, end=None, 
+        pid=None, groups=None):
+        Report.__init__(self, dbpath, figures, start, end, pid, groups)
         
         # html constants
         self.INDEX_FILE = "index.html"
@@ -237,6 +847,7 @@ class HTMLReport(Report):
         body.appendChild(doc.H(self.TITLE_SIZE, value=self.TITLE))
         
         # runtime summary
+        prof.begin("report.runtime")
         body.appendChild(doc.H(self.SECTION_SIZE, "Runtime Summary"))
         runtime = self.runtime_stats()
         rows = []
@@ -251,21 +862,28 @@ class HTMLReport(Report):
                time.localtime(eval(runtime["end"])))),
               (eval(runtime["end"]) - eval(runtime["start"])))])
         rows.append(["User","%s (%s)" % (runtime["user"], runtime["uid"])])
+        start, end, pid = self.scope
+        if self.db.scoped():
+            scope = []
+            if start is not None or end is not None:
+                scope.append("calls starting in [%s, %s) seconds"
+                    % (start or 0.0, end or "end"))
+            if pid is not None:
+                scope.append("process %d and its descendants" % pid)
+            rows.append(["Scope", ", ".join(scope)])
         rows.append(["Command", "%s" % runtime["cmdline"]])
         rows.append(["Data", doc.HREF("trace.sqlite", "../trace.sqlite")])
         body.appendChild(doc.table([], rows))
+        prof.end()
         
         # system call statistics
+        prof.begin("report.sysc")
         body.appendChild(doc.H(self.SECTION_SIZE, "System Call Statistics"))
         rows = []
-        stats, total_cnt, total_elapsed = self.sysc_stats(True)
+        stats, total_cnt, total_elapsed = self.sysc_stats(self.figures)
         for sc, cnt, e_sum, e_avg, e_stddev, distf, cdff in stats:
-            base = os.path.basename(distf)
-            distfref = doc.HREF(doc.IMG("figures/%s" % base, 
-                attrs={"class":"thumbnail"}), "figures/%s" % base)
-            base = os.path.basename(cdff)
-            cdffref = doc.HREF(doc.IMG("figures/%s" % base, 
-                attrs={"class":"thumbnail"}), "figures/%s" % base)
+            distfref = self.thumbnail(doc, distf)
+            cdffref = self.thumbnail(doc, cdff)
             rows.append([sc, cnt, round(float(cnt)/total_cnt, 5),
                 round(e_sum, 5), round(e_sum/total_elapsed, 5), 
                 round(e_avg, 5), round(e_stddev, 5), 
@@ -277,29 +895,33 @@ class HTMLReport(Report):
         notes = doc.tag("p", value="*System calls not invoked are ignored.",
             attrs={"class":"notes"})
         body.appendChild(notes)
+        prof.end()
+
+        if self.groups is not None:
+            prof.begin("report.heatmap_groups")
+            body.appendChild(doc.H(self.SUBSECTION_SIZE,
+                "Latency by Process Group"))
+            rows = []
+            for group, sc, cnt, fig in self.group_heatmap_stats(
+                self.groups, self.figures):
+                rows.append([group, sc, cnt, self.thumbnail(doc, fig)])
+            body.appendChild(doc.table([("Group", "Syscall", "Count",
+                "Dist")], rows))
+            prof.end()
        
         # io statistics
+        prof.begin("report.io")
         body.appendChild(doc.H(self.SECTION_SIZE, "I/O Statistics"))
         rows = []
-        stats, total_bytes = self.io_stats(True)
+        stats, total_bytes = self.io_stats(self.figures)
         for sc, byts, len_avg, len_std, off_avg, off_std, \
             sz_cum_fig, len_dist_fig, len_cdf_fig, \
             off_dist_fig, off_cdf_fig in stats:
-            base = os.path.basename(sz_cum_fig)
-            sz_cum_fig = doc.HREF(doc.IMG("figures/%s" % base, 
-                attrs={"class":"thumbnail"}), "figures/%s" % base)
-            base = os.path.basename(len_dist_fig)
-            len_dist_fig = doc.HREF(doc.IMG("figures/%s" % base, 
-                attrs={"class":"thumbnail"}), "figures/%s" % base)
-            base = os.path.basename(len_cdf_fig)
-            len_cdf_fig = doc.HREF(doc.IMG("figures/%s" % base, 
-                attrs={"class":"thumbnail"}), "figures/%s" % base)
-            base = os.path.basename(off_dist_fig)
-            off_dist_fig = doc.HREF(doc.IMG("figures/%s" % base, 
-                attrs={"class":"thumbnail"}), "figures/%s" % base)
-            base = os.path.basename(off_cdf_fig)
-            off_cdf_fig = doc.HREF(doc.IMG("figures/%s" % base, 
-                attrs={"class":"thumbnail"}), "figures/%s" % base)
+            sz_cum_fig = self.thumbnail(doc, sz_cum_fig)
+            len_dist_fig = self.thumbnail(doc, len_dist_fig)
+            len_cdf_fig = self.thumbnail(doc, len_cdf_fig)
+            off_dist_fig = self.thumbnail(doc, off_dist_fig)
+            off_cdf_fig = self.thumbnail(doc, off_cdf_fig)
             rows.append([sc, byts, round(float(byts)/total_bytes, 5),
                 sz_cum_fig, round(len_avg, 5), round(len_std, 5), len_dist_fig,
                 len_cdf_fig, round(off_avg, 5), round(off_std, 5), 
@@ -307,8 +929,70 @@ class HTMLReport(Report):
         body.appendChild(doc.table([("Syscall", "Bytes:Sum", "Ratio", "CUM",
             "Length:Avg", "Std", "Dist", "CDF", 
             "Offset:Avg", "StdDev", "Dist", "CDF")], rows))
+        prof.end()
+
+        # request size statistics
+        body.appendChild(doc.H(self.SECTION_SIZE, "Request Size Statistics"))
+        prof.begin("report.iosize")
+        for n in self.html_iosize_stat(doc): body.appendChild(n)
+        prof.end()
+
+        # hot files and processes
+        body.appendChild(doc.H(self.SECTION_SIZE, "Hot Files and Processes"))
+        prof.begin("report.hotspot")
+        for n in self.html_hotspot_stat(doc): body.appendChild(n)
+        prof.end()
+
+        # latency outliers
+        body.appendChild(doc.H(self.SECTION_SIZE, "Latency Outliers"))
+        prof.begin("report.outlier")
+        for n in self.html_outlier_stat(doc): body.appendChild(n)
+        prof.end()
+
+        # failed system calls
+        prof.begin("report.failure")
+        body.appendChild(doc.H(self.SECTION_SIZE, "Failed System Calls"))
+        for n in self.html_failure_stat(doc): body.appendChild(n)
+        prof.end()
+
+        # sessions
+        prof.begin("report.session")
+        body.appendChild(doc.H(self.SECTION_SIZE, "File Sessions"))
+        for n in self.html_session_stat(doc): body.appendChild(n)
+        prof.end()
+
+        # cache simulation
+        prof.begin("report.cache")
+        body.appendChild(doc.H(self.SECTION_SIZE, "Cache Simulation"))
+        for n in self.html_cache_stat(doc): body.appendChild(n)
+        prof.end()
+
+        # reuse distance
+        prof.begin("report.reuse")
+        body.appendChild(doc.H(self.SECTION_SIZE, "Reuse Distance"))
+        for n in self.html_reuse_stat(doc): body.appendChild(n)
+        prof.end()
+
+        # readahead simulation
+        prof.begin("report.readahead")
+        body.appendChild(doc.H(self.SECTION_SIZE, "Readahead Simulation"))
+        for n in self.html_readahead_stat(doc): body.appendChild(n)
+        prof.end()
+
+        # concurrency
+        prof.begin("report.concurrency")
+        body.appendChild(doc.H(self.SECTION_SIZE, "Concurrency"))
+        for n in self.html_concurrency_stat(doc): body.appendChild(n)
+        prof.end()
+
+        # access pattern statistics
+        body.appendChild(doc.H(self.SECTION_SIZE, "Access Pattern Statistics"))
+        prof.begin("report.access")
+        for n in self.html_access_stat(doc): body.appendChild(n)
+        prof.end()
 
         # process statistics
+        prof.begin("report.proc")
         body.appendChild(doc.H(self.SECTION_SIZE, "Process Statistics"))
         rows = []
         for e_sum, e_avg, e_std, ut_sum, ut_avg, ut_std, \
@@ -320,21 +1004,65 @@ class HTMLReport(Report):
         body.appendChild(doc.table([("Proc", "Elapsed:Sum", "Avg", "Std",
             "utime:Sum", "Avg", "Std", "stime:Sum", "Avg", "Std")],
             rows))
+        prof.end()
         
+        # process tree
+        prof.begin("report.proctree")
+        body.appendChild(doc.H(self.SECTION_SIZE, "Process Tree"))
+        for n in self.html_proctree_stat(doc): body.appendChild(n)
+        prof.end()
+
+        # data flow
+        prof.begin("report.dataflow")
+        body.appendChild(doc.H(self.SECTION_SIZE, "Data Flow"))
+        for n in self.html_dataflow_stat(doc): body.appendChild(n)
+        prof.end()
+
+        # overwrite analysis
+        prof.begin("report.overwrite")
+        body.appendChild(doc.H(self.SECTION_SIZE, "Overwrite Analysis"))
+        for n in self.html_overwrite_stat(doc): body.appendChild(n)
+        prof.end()
+
+        # intermediate files
+        prof.begin("report.lifecycle")
+        body.appendChild(doc.H(self.SECTION_SIZE, "Intermediate Files"))
+        for n in self.html_lifecycle_stat(doc): body.appendChild(n)
+        prof.end()
+
+        # scheduling simulation
+        prof.begin("report.sched")
+        body.appendChild(doc.H(self.SECTION_SIZE, "Scheduling Simulation"))
+        for n in self.html_sched_stat(doc): body.appendChild(n)
+        prof.end()
+
         # workflow
+        prof.begin("report.workflow")
         body.appendChild(doc.H(self.SECTION_SIZE, "Workflow Statistics"))
-        rows = []
-        g = self.plot.workflow("%s/%s" % (self.fdir, "workflow.%s" % "png"))
-        n_files, n_procs = g.nodes_count()
-        d_avg, d_Cd_avg, d_Cb_avg, d_Cc_avg = g.degree_stat()
-        figref = doc.HREF(doc.IMG("figures/workflow.png", 
-            attrs={"class":"thumbnail"}), "figures/workflow.png")
-        rows.append([n_files+n_procs, n_procs, n_files, figref,
-            round(d_avg, 5), 
-            round(d_Cd_avg, 5), round(d_Cb_avg, 5), round(d_Cc_avg, 5)])
-        body.appendChild(doc.table([("Total", "Procs", "Files", "DAG",
-            "Degree:Avg", "Centrality", "Betweeness", "Closeness")],
-            rows))
+        g = None
+        if self.figures:
+            rows = []
+            g = self.plot.workflow("%s/workflow.png" % self.fdir)
+            n_files, n_procs = g.nodes_count()
+            d_avg, d_Cd_avg, d_Cb_avg, d_Cc_avg = g.degree_stat()
+            figref = self.thumbnail(doc, "workflow.png")
+            rows.append([n_files+n_procs, n_procs, n_files, figref,
+                round(d_avg, 5), 
+                round(d_Cd_avg, 5), round(d_Cb_avg, 5), round(d_Cc_avg, 5)])
+            body.appendChild(doc.table([("Total", "Procs", "Files", "DAG",
+                "Degree:Avg", "Centrality", "Betweeness", "Closeness")],
+                rows))
+        else:
+            body.appendChild(doc.tag("p", value="*Workflow graph is not "
+                "built when figures are disabled.", attrs={"class":"notes"}))
+        prof.end()
+        
+        # critical path
+        if g is not None:
+            prof.begin("report.critpath")
+            body.appendChild(doc.H(self.SUBSECTION_SIZE, "Critical Path"))
+            for n in self.html_critpath_stat(doc, g): body.appendChild(n)
+            prof.end()
         
         # footnote
         self.end = utils.timer2()
@@ -352,6 +1080,889 @@ class HTMLReport(Report):
         doc.write(htmlFile)
         htmlFile.close()
     
+    def html_access_stat(self, doc):
+        """Produce access pattern summary table and per-file/per-process
+        breakdown tables"""
+        html_contents = []
+        stats, files, procs = self.access_stats()
+        if len(stats) == 0: return html_contents
+        
+        total = {}
+        for sc, cls, cnt, byts, runs, avg_run, max_run in stats:
+            total[sc] = total.get(sc, 0) + cnt
+        rows = []
+        for sc, cls, cnt, byts, runs, avg_run, max_run in stats:
+            if cnt == 0: continue
+            rows.append([sc, cls, cnt, round(float(cnt)/total[sc], 5),
+                byts, runs, round(avg_run, 5), max_run])
+        html_contents.append(doc.table([("Syscall", "Pattern", "Count",
+            "Ratio", "Bytes", "Runs", "Run:Avg", "Max")], rows))
+        
+        head = ["Syscall", "ID", "Name"]
+        for cls in analysis.ACCESS_CLASSES: 
+            head.extend(["%s:Count" % cls.capitalize(), "Bytes"])
+        
+        paths = dict(self.db.file_sel("fid,path"))
+        rows = []
+        for sc, fid, counts, nbytes in files:
+            row = [sc, fid, paths.get(fid, "")]
+            for i in range(0, len(analysis.ACCESS_CLASSES)):
+                row.extend([counts[i], int(nbytes[i])])
+            rows.append(row)
+        ftab = self.table_page("access-files.html",
+            "Access Pattern per File", [tuple(head)], rows)
+        
+        cmds = dict(self.db.proc_sel("pid,cmdline"))
+        rows = []
+        for sc, pid, counts, nbytes in procs:
+            row = [sc, pid, utils.smart_cmdline("%s" % cmds.get(pid, ""))]
+            for i in range(0, len(analysis.ACCESS_CLASSES)):
+                row.extend([counts[i], int(nbytes[i])])
+            rows.append(row)
+        ptab = self.table_page("access-procs.html",
+            "Access Pattern per Process", [tuple(head)], rows)
+
+        notes = doc.tag("p", attrs={"class":"notes"})
+        notes.appendChild(doc.TEXT("*Breakdown per "))
+        notes.appendChild(doc.HREF("file", ftab))
+        notes.appendChild(doc.TEXT(" and per "))
+        notes.appendChild(doc.HREF("process", ptab))
+        notes.appendChild(doc.TEXT("."))
+        html_contents.append(notes)
+        return html_contents
+
+    def html_iosize_stat(self, doc):
+        """Produce log2 request size heat tables per syscall, and 
+        per-file/per-process heat table pages"""
+        html_contents = []
+        stats = self.iosize_stats("sysc")
+        if len(stats) == 0: return html_contents
+        
+        head, rows, heat = self.iosize_heat(
+            map(lambda (sc,_,hist):([sc], hist), stats), ["Syscall"])
+        html_contents.append(doc.heattable(head, rows, heat))
+        
+        paths = dict(self.db.file_sel("fid,path"))
+        head, rows, heat = self.iosize_heat(
+            map(lambda (sc,fid,hist):([sc, fid, paths.get(fid, "")], hist),
+            self.iosize_stats("file")), ["Syscall", "ID", "Name"])
+        ftab = self.table_page("iosize-files.html",
+            "Request Size per File", head, rows, heat)
+        
+        cmds = dict(self.db.proc_sel("pid,cmdline"))
+        head, rows, heat = self.iosize_heat(
+            map(lambda (sc,pid,hist):([sc, pid, 
+                utils.smart_cmdline("%s" % cmds.get(pid, ""))], hist),
+            self.iosize_stats("proc")), ["Syscall", "ID", "Name"])
+        ptab = self.table_page("iosize-procs.html",
+            "Request Size per Process", head, rows, heat)
+        
+        notes = doc.tag("p", attrs={"class":"notes"})
+        notes.appendChild(doc.TEXT("*Columns are log2 buckets labeled by "
+            "their lower bound, breakdown per "))
+        notes.appendChild(doc.HREF("file", ftab))
+        notes.appendChild(doc.TEXT(" and per "))
+        notes.appendChild(doc.HREF("process", ptab))
+        notes.appendChild(doc.TEXT("."))
+        html_contents.append(notes)
+        return html_contents
+
+    def html_hotspot_stat(self, doc, k=10):
+        """Produce top-k tables of files and processes ranked by bytes,
+        calls and latency"""
+        html_contents = []
+        tops = self.hotspot_stats()
+        if tops[("file", "calls")].total == 0: return html_contents
+
+        paths = dict(self.db.file_sel("fid,path"))
+        cmds = dict(self.db.proc_sel("pid,cmdline"))
+        names = {"file":lambda fid:paths.get(fid, fid),
+            "proc":lambda pid:"%s (%s)" % (utils.smart_cmdline(
+                "%s" % cmds.get(pid, "")), pid)}
+        unit_str, unit_scale = self.unit["latency"]
+        exact = True
+        max_err = 0.0
+        for kind, title, titles in [("file", "File", "Files"), 
+            ("proc", "Process", "Processes")]:
+            ranks = []
+            for metric in ["bytes", "calls", "latency"]:
+                top = tops[(kind, metric)]
+                exact = exact and top.exact()
+                ranks.append((metric, top, top.top(k)))
+            rows = []
+            for i in range(0, max(map(lambda r:len(r[2]), ranks))):
+                row = [i + 1]
+                for metric, top, ranked in ranks:
+                    if i >= len(ranked):
+                        row.extend(["", "", ""])
+                        continue
+                    key, val, err = ranked[i]
+                    ratio = 0.0
+                    if top.total > 0:
+                        ratio = float(val) / top.total
+                        max_err = max(max_err, float(err) / top.total)
+                    if metric == "latency": val = round(val * unit_scale, 5)
+                    else: val = int(val)
+                    row.extend([names[kind](key), val, round(ratio, 5)])
+                rows.append(row)
+            html_contents.append(doc.H(self.SUBSECTION_SIZE, 
+                "Top %d %s" % (k, titles)))
+            html_contents.append(doc.table([("Rank", title, "Bytes", "Ratio",
+                title, "Calls", "Ratio", title, "Latency (%s)" % unit_str,
+                "Ratio")], rows))
+        
+        if exact: msg = "*Rankings are exact."
+        else: msg = "*Rankings are approximate, counts overestimate by at " \
+            "most %.5f of total." % max_err
+        html_contents.append(doc.tag("p", value=msg, attrs={"class":"notes"}))
+        return html_contents
+
+    def html_concurrency_stat(self, doc):
+        """Produce in-flight system call table per syscall, per-file table
+        page and concurrency timeline figure"""
+        html_contents = []
+        total, sysc, files, (wstart, wpeak) = self.concurrency_stats()
+        if total is None: return html_contents
+        
+        head = [("Syscall", "Calls", "In-flight:Peak", "Avg", "Busy")]
+        rows = []
+        for key, cnt, peak, avg, busy in [total] + sysc:
+            if key is None: key = "All"
+            rows.append([key, cnt, peak, round(avg, 5), round(busy, 5)])
+        html_contents.append(doc.table(head, rows))
+        
+        paths = dict(self.db.file_sel("fid,path"))
+        rows = []
+        for fid, cnt, peak, avg, busy in sorted(files, 
+            key=lambda r:(-r[2], -r[3])):
+            rows.append([fid, paths.get(fid, ""), cnt, peak, round(avg, 5),
+                round(busy, 5)])
+        ftab = self.table_page("concurrency-files.html",
+            "In-flight System Calls per File", [("ID", "Name", "Calls",
+            "In-flight:Peak", "Avg", "Busy")], rows)
+        
+        notes = doc.tag("p", attrs={"class":"notes"})
+        notes.appendChild(doc.TEXT("*Avg is time-weighted over the span from "
+            "first call to last return, Busy is the fraction of that span "
+            "with any call in flight. "))
+        if self.figures:
+            tlf = self.plot.lines_chart(zip(wstart, wpeak),
+                prefix="%s/concurrency" % self.fdir,
+                title="Peak System Calls in Flight",
+                xlabel="Tracing Time (seconds)",
+                ylabel="Calls in Flight")
+            notes.appendChild(doc.TEXT("Timeline "))
+            notes.appendChild(self.thumbnail(doc, tlf))
+            notes.appendChild(doc.TEXT(", per "))
+        else:
+            notes.appendChild(doc.TEXT("Per "))
+        notes.appendChild(doc.HREF("file", ftab))
+        notes.appendChild(doc.TEXT("."))
+        html_contents.append(notes)
+        return html_contents
+
+    def html_session_stat(self, doc):
+        """Produce open-to-close session summary, bytes and duration heat
+        tables and per-file table page"""
+        html_contents = []
+        stats, hists, files = self.session_stats()
+        if len(stats) == 0: return html_contents
+        unit_str, unit_scale = self.unit["latency"]
+        
+        def opener_name(sc):
+            if sc is None: return "All"
+            if sc == 0: return "(unopened)"
+            return utils.SYSCALL[sc]
+        
+        rows = []
+        for opener, cnt, closed, d_avg, d_med, d_max, c_avg, r_avg, w_avg \
+            in stats:
+            rows.append([opener_name(opener), cnt, 
+                round(float(closed) / cnt, 5), round(d_avg * unit_scale, 5),
+                round(d_med * unit_scale, 5), round(d_max * unit_scale, 5),
+                round(c_avg, 5), int(r_avg), int(w_avg)])
+        html_contents.append(doc.table([("Opened by", "Sessions", 
+            "Closed", "Duration:Avg (%s)" % unit_str, "Median", "Max",
+            "Calls:Avg", "Read:Avg", "Write:Avg")], rows))
+        
+        html_contents.append(doc.H(self.SUBSECTION_SIZE, 
+            "Bytes per Session"))
+        head, rows, heat = self.iosize_heat(map(lambda (o,b,_):
+            ([opener_name(o)], b), hists), ["Opened by"])
+        html_contents.append(doc.heattable(head, rows, heat))
+        
+        html_contents.append(doc.H(self.SUBSECTION_SIZE, 
+            "Duration per Session"))
+        head, rows, heat = self.iosize_heat(map(lambda (o,_,d):
+            ([opener_name(o)], d), hists), ["Opened by"], 
+            label=lambda k:"%d%s" % utils.smart_usec(analysis.bucket_lower(k)),
+            small=None)
+        html_contents.append(doc.heattable(head, rows, heat))
+        
+        paths = dict(self.db.file_sel("fid,path"))
+        rows = []
+        for fid, cnt, d_avg, d_max, b_avg in sorted(files, 
+            key=lambda r:-r[1]):
+            rows.append([fid, paths.get(fid, ""), cnt, 
+                round(d_avg * unit_scale, 5), round(d_max * unit_scale, 5),
+                int(b_avg)])
+        ftab = self.table_page("sessions-files.html", "Sessions per File",
+            [("ID", "Name", "Sessions", "Duration:Avg (%s)" % unit_str,
+            "Max", "Bytes:Avg")], rows)
+        
+        notes = doc.tag("p", attrs={"class":"notes"})
+        notes.appendChild(doc.TEXT("*A session pairs open/creat with the "
+            "next close of the same process and file, (unopened) sessions "
+            "use files opened before tracing. Columns of heat tables are "
+            "log2 buckets labeled by their lower bound, breakdown per "))
+        notes.appendChild(doc.HREF("file", ftab))
+        notes.appendChild(doc.TEXT("."))
+        html_contents.append(notes)
+        return html_contents
+
+    def html_failure_stat(self, doc, top=20):
+        """Produce failed syscall latency comparison, errno breakdown and
+        ranking of the most expensive failing paths"""
+        html_contents = []
+        stats = self.failure_stats()
+        if len(stats) == 0:
+            html_contents.append(doc.tag("p", value="*No failed system "
+                "calls.", attrs={"class":"notes"}))
+            return html_contents
+        unit_str, unit_scale = self.unit["latency"]
+        
+        rows = []
+        for sc, cnt, n_fail, o_avg, o_med, o_p99, f_avg, f_med, f_p99 \
+            in stats:
+            rows.append([sc, cnt, n_fail, round(float(n_fail) / cnt, 5)] +
+                map(lambda x:round(x * unit_scale, 5), [o_avg, o_med, o_p99,
+                f_avg, f_med, f_p99]))
+        html_contents.append(doc.table([("Syscall", "Calls", "Failed", 
+            "Ratio", "OK:Avg (%s)" % unit_str, "Median", "P99", 
+            "Failed:Avg", "Median", "P99")], rows))
+        
+        rows = []
+        for sc, _, err, cnt, lat in self.db.errstat_sel("sysc"):
+            rows.append([utils.SYSCALL[sc], errno.errorcode.get(err, err),
+                cnt, round(lat * unit_scale, 5), 
+                round(lat / cnt * unit_scale, 5)])
+        html_contents.append(doc.table([("Syscall", "Errno", "Count",
+            "Latency:Sum (%s)" % unit_str, "Avg")], rows))
+        
+        paths = dict(self.db.file_sel("fid,path"))
+        rows = []
+        for i, (sc, fid, err, cnt, lat) in \
+            enumerate(self.db.errstat_sel("file")):
+            rows.append([i + 1, paths.get(fid, fid), utils.SYSCALL[sc], 
+                errno.errorcode.get(err, err), cnt, 
+                round(lat * unit_scale, 5), round(lat / cnt * unit_scale, 5)])
+        head = [("Rank", "Path", "Syscall", "Errno", "Count", 
+            "Latency:Sum (%s)" % unit_str, "Avg")]
+        html_contents.append(doc.H(self.SUBSECTION_SIZE,
+            "Most Expensive Failing Paths"))
+        html_contents.append(doc.table(head, rows[:top]))
+        ftab = self.table_page("failures-files.html", 
+            "Failed System Calls per Path", head, rows)
+        
+        cmds = dict(self.db.proc_sel("pid,cmdline"))
+        rows = []
+        for sc, pid, err, cnt, lat in self.db.errstat_sel("proc"):
+            rows.append([pid, utils.smart_cmdline("%s" % cmds.get(pid, "")),
+                utils.SYSCALL[sc], errno.errorcode.get(err, err), cnt,
+                round(lat * unit_scale, 5), round(lat / cnt * unit_scale, 5)])
+        ptab = self.table_page("failures-procs.html", 
+            "Failed System Calls per Process", [("Pid", "Command", 
+            "Syscall", "Errno", "Count", "Latency:Sum (%s)" % unit_str, 
+            "Avg")], rows)
+
+        notes = doc.tag("p", attrs={"class":"notes"})
+        notes.appendChild(doc.TEXT("*Calls with negative result are "
+            "failures, paths are ranked by cumulative latency, all "))
+        notes.appendChild(doc.HREF("paths", ftab))
+        notes.appendChild(doc.TEXT(" and per "))
+        notes.appendChild(doc.HREF("process", ptab))
+        notes.appendChild(doc.TEXT("."))
+        html_contents.append(notes)
+        return html_contents
+
+    def html_cache_stat(self, doc):
+        """Produce hit ratio and saved latency tables and curves of
+        simulated caches at file and block granularity"""
+        html_contents = []
+        unit_str, unit_scale = self.unit["latency"]
+        for granularity, title in [("file", "File Cache"),
+            ("block", "Block Cache")]:
+            block_size, res = self.cache_stats(granularity)
+            if len(res) == 0 or res.values()[0][0][1] == 0: continue
+            policies = res.keys()
+            
+            head = ["Size (entries)"]
+            if granularity == "block": head.append("Bytes")
+            for p in policies: head.extend(["%s:Hit" % p, "Saved"])
+            rows = []
+            for i in range(0, len(res[policies[0]])):
+                size = res[policies[0]][i][0]
+                row = [size]
+                if granularity == "block":
+                    row.append("%d%s" % utils.smart_datasize(size * 
+                        block_size))
+                for p in policies:
+                    _, _, _, ratio, saved = res[p][i]
+                    row.extend([round(ratio, 5), 
+                        round(saved * unit_scale, 5)])
+                rows.append(row)
+            html_contents.append(doc.H(self.SUBSECTION_SIZE, title))
+            html_contents.append(doc.table([tuple(head)], rows))
+            
+            if self.figures:
+                fig = self.plot.series_chart(map(lambda p:(p, 
+                    map(lambda r:(r[0], r[3]), res[p])), policies),
+                    prefix="%s/cache-%s" % (self.fdir, granularity),
+                    title="Hit Ratio of Simulated %s" % title,
+                    xlabel="Cache Size (entries)", ylabel="Hit Ratio",
+                    style="linespoints")
+                notes = doc.tag("p", attrs={"class":"notes"})
+                notes.appendChild(doc.TEXT("*Hit ratio curves "))
+                notes.appendChild(self.thumbnail(doc, fig))
+                html_contents.append(notes)
+        
+        msg = "*Saved is the latency (%s) of calls served by the cache, " \
+            "block caches use %d%s blocks and share the latency of a " \
+            "call among its blocks." % ((unit_str,) + 
+            utils.smart_datasize(block_size))
+        html_contents.append(doc.tag("p", value=msg, attrs={"class":"notes"}))
+        return html_contents
+
+    def html_reuse_stat(self, doc, top=5):
+        """Produce miss ratio curve of LRU block caches of all sizes,
+        globally and per file, from one pass of stack distances"""
+        html_contents = []
+        block_size, hist, fhists = self.reuse_stats()
+        if hist.total == 0: return html_contents
+        bsize = "%d%s" % utils.smart_datasize(block_size)
+        
+        # full curve for reuse by other tools
+        datfile = "%s/mrc.dat" % self.ddir
+        f = open(datfile, "w")
+        f.write("# blocks bytes miss_ratio (%s blocks, %d accesses)\n"
+            % (bsize, hist.total))
+        s, m = hist.miss_ratio()
+        for size, ratio in zip(s.tolist(), m.tolist()):
+            f.write("%d %d %f\n" % (size, size * block_size, ratio))
+        f.close()
+        
+        points = [1]
+        if len(hist.counts) > 1:
+            points = numpy.unique(numpy.logspace(0, 
+                numpy.log10(len(hist.counts)), 8).astype(int)).tolist()
+        _, ratios = hist.miss_ratio(points)
+        rows = []
+        for size, ratio in zip(points, ratios.tolist()):
+            rows.append((size, "%d%s" % utils.smart_datasize(size * 
+                block_size), round(ratio, 5), round(1 - ratio, 5)))
+        html_contents.append(doc.table([("Size (blocks)", "Bytes",
+            "Miss Ratio", "Hit Ratio")], rows))
+        
+        paths = {}
+        for fid, path in self.db.file_sel("fid,path"): paths[fid] = path
+        frows = []
+        for fid, h in fhists.items():
+            _, r = h.miss_ratio([1, 16, 256])
+            ws = h.working_set()
+            frows.append((fid, paths.get(fid, ""), h.total, h.cold,
+                round(float(h.cold) / h.total, 5), round(r[0], 5), 
+                round(r[1], 5), round(r[2], 5), ws,
+                "%d%s" % utils.smart_datasize(ws * block_size)))
+        frows.sort(key=lambda r:r[2], reverse=True)
+        ftab = self.table_page("reuse_file.html", 
+            "Reuse Distance per File", [("fid", "Path", "Accesses", 
+            "Blocks", "Min Miss", "Miss@1", "Miss@16", "Miss@256", 
+            "WS90 (blocks)", "WS90")], frows)
+        
+        notes = doc.tag("p", attrs={"class":"notes"})
+        notes.appendChild(doc.TEXT("*Miss ratios of LRU caches of %s "
+            "blocks over read and write requests, complete curve in " 
+            % bsize))
+        notes.appendChild(doc.HREF("mrc.dat", "data/mrc.dat"))
+        notes.appendChild(doc.TEXT(", curves per "))
+        notes.appendChild(doc.HREF("file", ftab))
+        notes.appendChild(doc.TEXT(" where WS90 is the cache size reaching "
+            "90% of the hits of an unbounded cache."))
+        if self.figures:
+            s, m = hist.miss_ratio()
+            series = [("all", zip(s.tolist(), m.tolist()))]
+            for r in frows[:top]:
+                s, m = fhists[r[0]].miss_ratio()
+                series.append((os.path.basename(r[1]) or str(r[0]),
+                    zip(s.tolist(), m.tolist())))
+            fig = self.plot.series_chart(series, prefix="%s/mrc" % self.fdir,
+                title="Miss Ratio Curves", xlabel="Cache Size (blocks)",
+                ylabel="Miss Ratio", style="lines")
+            notes.appendChild(doc.TEXT(" "))
+            notes.appendChild(self.thumbnail(doc, fig))
+        html_contents.append(notes)
+        return html_contents
+
+    def html_readahead_stat(self, doc):
+        """Produce prefetch volume, hits, waste and saved read latency of
+        simulated readahead policies"""
+        html_contents = []
+        stats = self.readahead_stats()
+        if len(stats) == 0 or stats[0][1] == 0: return html_contents
+        unit_str, unit_scale = self.unit["latency"]
+        total = self.db.sysc_sum(utils.SYSCALL["read"], "elapsed") or 0.0
+        rows = []
+        for name, reads, nbytes, pref, hits, hbytes, wasted, saved in stats:
+            rows.append((name, reads, "%d%s" % utils.smart_datasize(nbytes),
+                "%d%s" % utils.smart_datasize(pref), hits,
+                "%d%s" % utils.smart_datasize(hbytes),
+                "%d%s" % utils.smart_datasize(wasted),
+                round(float(hbytes) / max(pref, 1), 5),
+                round(saved * unit_scale, 5),
+                round(saved / max(total, 1.0e-9), 5)))
+        html_contents.append(doc.table([("Policy", "Reads", "Read",
+            "Prefetched", "Hit Reads", "Hit Bytes", "Wasted", "Accuracy",
+            "Saved (%s)" % unit_str, "Saved Ratio")], rows))
+        msg = "*Reads are replayed per (pid, fid) stream. Fixed keeps " \
+            "a 128KB window ahead of sequential reads, doubling grows " \
+            "from 16KB to 1MB, linux follows the kernel on-demand " \
+            "readahead with 128KB maximum. Accuracy is hit bytes over " \
+            "prefetched bytes, saved latency counts the prefetched share " \
+            "of each read."
+        html_contents.append(doc.tag("p", value=msg, attrs={"class":"notes"}))
+        return html_contents
+
+    def html_dataflow_stat(self, doc, top=20):
+        """Produce producer to consumer byte volumes between processes and
+        an edge list of (writer, reader, file, bytes)"""
+        html_contents = []
+        flows, external, ranges = self.dataflow_stats()
+        if len(flows) == 0 and len(external) == 0: return html_contents
+        
+        datfile = "%s/dataflow.dat" % self.ddir
+        f = open(datfile, "w")
+        f.write("# writer reader fid bytes\n")
+        for (w, r, fid), nbytes in sorted(flows.items()):
+            f.write("%d %d %d %d\n" % (w, r, fid, nbytes))
+        f.close()
+        
+        selfb = crossb = 0
+        edges = {}
+        for (w, r, fid), nbytes in flows.items():
+            if w == r:
+                selfb += nbytes
+                continue
+            crossb += nbytes
+            files, b = edges.get((w, r), (0, 0))
+            edges[(w, r)] = (files + 1, b + nbytes)
+        extb = sum(external.values())
+        total = max(selfb + crossb + extb, 1)
+        html_contents.append(doc.table([("Read", "Cross-Process", "Ratio",
+            "Own Writes", "Ratio", "Pre-existing", "Ratio", "Edges",
+            "Ranges")], [("%d%s" % utils.smart_datasize(total),
+            "%d%s" % utils.smart_datasize(crossb), 
+            round(float(crossb) / total, 5),
+            "%d%s" % utils.smart_datasize(selfb),
+            round(float(selfb) / total, 5),
+            "%d%s" % utils.smart_datasize(extb),
+            round(float(extb) / total, 5), len(edges), ranges)]))
+        
+        cmds = dict(self.db.proc_sel("pid,cmdline"))
+        paths = dict(self.db.file_sel("fid,path"))
+        cmd = lambda pid:utils.smart_cmdline("%s" % cmds.get(pid, ""))
+        rows = []
+        for (w, r), (files, nbytes) in sorted(edges.items(),
+            key=lambda e:e[1][1], reverse=True)[:top]:
+            rows.append((w, cmd(w), r, cmd(r), files,
+                "%d%s" % utils.smart_datasize(nbytes)))
+        if len(rows) > 0:
+            html_contents.append(doc.table([("Producer", "Command", 
+                "Consumer", "Command", "Files", "Bytes")], rows))
+        
+        rows = []
+        for (w, r, fid), nbytes in sorted(flows.items(), 
+            key=lambda e:e[1], reverse=True):
+            rows.append((w, r, fid, paths.get(fid, ""), nbytes))
+        ftab = self.table_page("dataflow.html", "Data Flow per File",
+            [("Producer", "Consumer", "fid", "Path", "Bytes")], rows)
+        notes = doc.tag("p", attrs={"class":"notes"})
+        notes.appendChild(doc.TEXT("*Read bytes are credited to the "
+            "process that last wrote them before the read, pre-existing "
+            "bytes were not written during tracing. Top %d edges shown, " 
+            "all edges per " % top))
+        notes.appendChild(doc.HREF("file", ftab))
+        notes.appendChild(doc.TEXT(" and as "))
+        notes.appendChild(doc.HREF("dataflow.dat", "data/dataflow.dat"))
+        notes.appendChild(doc.TEXT("."))
+        html_contents.append(notes)
+        return html_contents
+
+    def html_overwrite_stat(self, doc):
+        """Produce write amplification summary, top rewritten regions and
+        a per-file table page"""
+        html_contents = []
+        res = self.overwrite_stats()
+        if res is None: return html_contents
+        total, files, regions = res
+        nfiles, writes, logical, unique, once, once_bytes = total
+        size = lambda b:"%d%s" % utils.smart_datasize(b)
+        html_contents.append(doc.table([("Files", "Writes", "Logical",
+            "Unique", "Amplification", "Overwritten", "Write-once Files",
+            "Bytes")], [(nfiles, writes, size(logical), size(unique),
+            round(float(logical) / max(unique, 1), 5),
+            round(float(logical - unique) / max(logical, 1), 5), once,
+            size(once_bytes))]))
+        
+        paths = dict(self.db.file_sel("fid,path"))
+        if len(regions) > 0:
+            rows = []
+            for fid, off, length, rbytes, depth in regions:
+                rows.append((fid, utils.smart_filename(paths.get(fid, "")),
+                    off, size(length), size(rbytes), depth))
+            html_contents.append(doc.H(self.SUBSECTION_SIZE, 
+                "Hot Rewritten Regions"))
+            html_contents.append(doc.table([("fid", "File", "Offset", 
+                "Length", "Rewritten", "Max Writes")], rows))
+        
+        rows = []
+        for fid, nw, lg, uq, depth in sorted(files, 
+            key=lambda f:f[2] - f[3], reverse=True):
+            rows.append((fid, paths.get(fid, ""), nw, lg, uq, 
+                round(float(lg - uq) / lg, 5), depth, 
+                ["no", "yes"][lg == uq]))
+        ftab = self.table_page("overwrite_file.html", 
+            "Overwrite per File", [("fid", "Path", "Writes", "Logical", 
+            "Unique", "Overwritten", "Max Writes", "Write-once")], rows)
+        notes = doc.tag("p", attrs={"class":"notes"})
+        notes.appendChild(doc.TEXT("*Logical bytes are bytes written, "
+            "unique bytes the size of their union per file, amplification "
+            "their ratio. Write-once files never had a byte written twice. "
+            "Details per "))
+        notes.appendChild(doc.HREF("file", ftab))
+        notes.appendChild(doc.TEXT("."))
+        html_contents.append(notes)
+        return html_contents
+
+    def html_lifecycle_stat(self, doc):
+        """Produce summary of write-read-unlink intermediate files, their
+        footprint over time and a per-file table page"""
+        html_contents = []
+        files, (wstart, wpeak), total = self.lifecycle_stats()
+        if len(files) == 0:
+            html_contents.append(doc.tag("p", value="*No file was written, "
+                "read and unlinked within the trace.", 
+                attrs={"class":"notes"}))
+            return html_contents
+        size = lambda b:"%d%s" % utils.smart_datasize(b)
+        written = sum(map(lambda f:f[2], files))
+        life = map(lambda f:f[8] - f[6], files)
+        peak = max(wpeak)
+        at = wstart[numpy.argmax(wpeak)]
+        html_contents.append(doc.table([("Files", "Size", "Written", 
+            "Ratio", "Read", "Peak Footprint", "At (seconds)", 
+            "Lifetime:Avg", "Max")], [(len(files), 
+            size(sum(map(lambda f:f[1], files))), size(written),
+            round(float(written) / max(total, 1), 5),
+            size(sum(map(lambda f:f[3], files))), size(peak), 
+            round(at, 5), round(numpy.mean(life), 5), 
+            round(max(life), 5))]))
+        
+        paths = dict(self.db.file_sel("fid,path"))
+        rows = []
+        for fid, fsize, nw, nr, writers, readers, fw, fr, ul in \
+            sorted(files, key=lambda f:f[1], reverse=True):
+            rows.append((fid, paths.get(fid, ""), fsize, nw, nr, writers,
+                readers, round(fw, 5), round(fr, 5), round(ul, 5),
+                round(ul - fw, 5)))
+        ftab = self.table_page("lifecycle_file.html", "Intermediate Files",
+            [("fid", "Path", "Size", "Written", "Read", "Writers", 
+            "Readers", "First Write", "First Read", "Unlink", 
+            "Lifetime")], rows)
+        
+        notes = doc.tag("p", attrs={"class":"notes"})
+        notes.appendChild(doc.TEXT("*Intermediate files are written, read "
+            "after their first write and unlinked after that read. Ratio "
+            "is their share of all bytes written, footprint the total "
+            "size of intermediates alive at a time. "))
+        if self.figures:
+            fig = self.plot.lines_chart(zip(wstart, wpeak),
+                prefix="%s/lifecycle" % self.fdir,
+                title="Footprint of Intermediate Files",
+                xlabel="Tracing Time (seconds)", ylabel="Bytes")
+            notes.appendChild(doc.TEXT("Footprint "))
+            notes.appendChild(self.thumbnail(doc, fig))
+            notes.appendChild(doc.TEXT(", per "))
+        else:
+            notes.appendChild(doc.TEXT("Per "))
+        notes.appendChild(doc.HREF("file", ftab))
+        notes.appendChild(doc.TEXT("."))
+        html_contents.append(notes)
+        return html_contents
+
+    def html_proctree_stat(self, doc):
+        """Produce process tree shape, fanout distribution, subtrees by
+        aggregate CPU and I/O time and the longest lifetime chain"""
+        html_contents = []
+        res = self.proctree_stats()
+        if res is None: return html_contents
+        (n, roots, depth, leaves, maxfan, avgfan), fanout, subtrees, \
+            (life, chain) = res
+        html_contents.append(doc.table([("Processes", "Roots", "Depth",
+            "Leaves", "Fanout:Max", "Avg")], [(n, roots, depth, leaves,
+            maxfan, round(avgfan, 5))]))
+        html_contents.append(doc.table([("Children", "Processes")],
+            fanout))
+        
+        rows = []
+        for pid, cmd, d, nch, size, cpu, io in subtrees:
+            rows.append((pid, utils.smart_cmdline(cmd), d, nch, size, 
+                round(cpu, 5), round(io, 5)))
+        tab = self.table_page("proctree.html", "Process Subtrees", 
+            [("pid", "Command", "Depth", "Children", "Subtree:Size", 
+            "CPU (sec)", "I/O (sec)")], rows)
+        
+        notes = doc.tag("p", attrs={"class":"notes"})
+        notes.appendChild(doc.TEXT("*Depth counts from traced processes "
+            "whose parent was not traced. CPU and I/O time of "))
+        notes.appendChild(doc.HREF("subtrees", tab))
+        notes.appendChild(doc.TEXT(" sum user and system time and read "
+            "and write latency over each process and its descendants. "
+            "Longest lifetime chain (%.5f seconds): %s." % (life,
+            " > ".join(map(lambda (p,c,e):"%d %s (%.5f)" % (p, 
+            utils.smart_cmdline(c), e), chain)))))
+        html_contents.append(notes)
+        return html_contents
+
+    def html_sched_stat(self, doc):
+        """Produce predicted makespans of the workflow by number of cores,
+        scheduling policy and compute and storage speedups"""
+        html_contents = []
+        res = self.sched_stats()
+        if res is None: return html_contents
+        measured, peak, cores, speedups = res
+        
+        rows = []
+        for c, fifo, longest, critical, util in cores:
+            if c is None: c, util = "unlimited", "N/A"
+            else: util = round(util, 5)
+            rows.append((c, round(fifo, 5), round(longest, 5), 
+                round(critical, 5), round(measured / max(critical, 1.0e-9),
+                5), util))
+        html_contents.append(doc.table([("Cores", "Makespan:FIFO", 
+            "Longest", "Critical", "Speedup", "Utilization")], rows))
+        
+        rows = []
+        for cpu, io, m_peak, m_twice, m_inf in speedups:
+            rows.append(("x%g" % cpu, "x%g" % io, round(m_peak, 5),
+                round(m_twice, 5), round(m_inf, 5)))
+        html_contents.append(doc.table([("Compute", "Storage", 
+            "Makespan:%d Cores" % peak, "%d Cores" % (2 * peak), 
+            "Unlimited")], rows))
+        msg = "*Makespans in seconds, measured %.5f with at most %d " \
+            "processes alive. Processes hold a core for their user, system " \
+            "and traced I/O time and start after their parent and the " \
+            "writers of the data they read have run as far as in the " \
+            "trace. Speedup is against the measured makespan using the " \
+            "critical policy, which picks the task with the longest " \
+            "remaining path, longest picks the longest task." % (measured,
+            peak)
+        html_contents.append(doc.tag("p", value=msg, attrs={"class":"notes"}))
+        return html_contents
+
+    def html_outlier_stat(self, doc, top=20, nmad=6.0, quantile=None):
+        """Produce latency outlier summary, top outliers table, timeline
+        figure and attribution table pages"""
+        html_contents = []
+        stats, outliers, width, wcounts = self.outlier_stats(nmad, quantile)
+        if len(stats) == 0: return html_contents
+        unit_str, unit_scale = self.unit["latency"]
+
+        rows = []
+        for sc, cnt, med, mad, thr, n_out in stats:
+            rows.append([sc, cnt, round(med * unit_scale, 5), 
+                round(mad * unit_scale, 5), round(thr * unit_scale, 5),
+                n_out, round(float(n_out) / cnt, 5)])
+        html_contents.append(doc.table([("Syscall", "Count", 
+            "Latency:Median", "MAD", "Threshold", "Outliers", "Ratio")],
+            rows))
+        notes = doc.tag("p", attrs={"class":"notes"})
+        text = "*Threshold is median + %s x 1.4826 x MAD of the latency " \
+            "of each syscall" % nmad
+        if quantile is not None:
+            text += ", but no lower than its %s quantile" % quantile
+        notes.appendChild(doc.TEXT(text + "."))
+        html_contents.append(notes)
+        if len(outliers) == 0: return html_contents
+        
+        paths = dict(self.db.file_sel("fid,path"))
+        cmds = dict(self.db.proc_sel("pid,cmdline"))
+        rows = []
+        for o in outliers:
+            rows.append([round(o["stamp"], 5), int(o["window"]), 
+                utils.SYSCALL[int(o["sysc"])], int(o["pid"]),
+                utils.smart_cmdline("%s" % cmds.get(int(o["pid"]), "")), 
+                paths.get(int(o["fid"]), ""),
+                round(o["elapsed"] * unit_scale, 5), round(o["excess"], 2)])
+        head = [("Stamp", "Window", "Syscall", "Pid", "Command", "File", 
+            "Latency (%s)" % unit_str, "xThreshold")]
+        html_contents.append(doc.table(head, rows[:top]))
+        otab = self.table_page("outliers.html", "Latency Outliers", 
+            head, rows)
+
+        rows = []
+        pids, cnts = analysis.group_sum(outliers.pid)
+        _, lats = analysis.group_sum(outliers.pid, outliers.elapsed)
+        for i in numpy.argsort(-cnts, kind="mergesort"):
+            rows.append([int(pids[i]), utils.smart_cmdline(
+                "%s" % cmds.get(int(pids[i]), "")), int(cnts[i]),
+                round(lats[i] * unit_scale, 5)])
+        ptab = self.table_page("outliers-procs.html", 
+            "Latency Outliers per Process", [("Pid", "Command", "Outliers",
+            "Latency:Sum (%s)" % unit_str)], rows)
+
+        rows = []
+        fids, cnts = analysis.group_sum(outliers.fid)
+        _, lats = analysis.group_sum(outliers.fid, outliers.elapsed)
+        for i in numpy.argsort(-cnts, kind="mergesort"):
+            rows.append([int(fids[i]), paths.get(int(fids[i]), ""), 
+                int(cnts[i]), round(lats[i] * unit_scale, 5)])
+        ftab = self.table_page("outliers-files.html", 
+            "Latency Outliers per File", [("ID", "Path", "Outliers",
+            "Latency:Sum (%s)" % unit_str)], rows)
+        
+        first, _ = self.db.sysc_span()
+        rows = []
+        for w in numpy.flatnonzero(wcounts):
+            rows.append([int(w), round(first + w * width, 5), 
+                round(first + (w + 1) * width, 5), int(wcounts[w])])
+        wtab = self.table_page("outliers-windows.html",
+            "Latency Outliers per Time Window", [("Window", "Begin", "End",
+            "Outliers")], rows)
+
+        series = []
+        for sc in numpy.unique(outliers.sysc):
+            sel = outliers[outliers.sysc == sc]
+            series.append((utils.SYSCALL[int(sc)], 
+                zip(sel.stamp, sel.elapsed * unit_scale)))
+        notes = doc.tag("p", attrs={"class":"notes"})
+        if self.figures:
+            tlf = self.plot.series_chart(series, 
+                prefix="%s/outliers-timeline" % self.fdir,
+                title="Latency Outliers over Time",
+                xlabel="Tracing Time (seconds)",
+                ylabel="Latency (%s)" % unit_str)
+            notes.appendChild(doc.TEXT("*Timeline "))
+            notes.appendChild(self.thumbnail(doc, tlf))
+            notes.appendChild(doc.TEXT(", all "))
+        else:
+            notes.appendChild(doc.TEXT("*All "))
+        notes.appendChild(doc.HREF("outliers", otab))
+        notes.appendChild(doc.TEXT(", per "))
+        notes.appendChild(doc.HREF("process", ptab))
+        notes.appendChild(doc.TEXT(", per "))
+        notes.appendChild(doc.HREF("file", ftab))
+        notes.appendChild(doc.TEXT(" and per "))
+        notes.appendChild(doc.HREF("time window", wtab))
+        notes.appendChild(doc.TEXT(" of %.5f seconds." % width))
+        html_contents.append(notes)
+        return html_contents
+
+    def html_critpath_stat(self, doc, g):
+        """Produce critical path summary, the critical chain and a slack
+        table page of all workflow nodes"""
+        html_contents = []
+        path, makespan, io_time, slack = g.critical_path()
+        if len(path) == 0: return html_contents
+        
+        paths = dict(self.db.file_sel("fid,path"))
+        cmds = dict(self.db.proc_sel("pid,cmdline"))
+        def describe(n):
+            id = int(n[1:])
+            if n[0] == 'f': return "file", id, paths.get(id, "")
+            return "proc", id, utils.smart_cmdline("%s" % cmds.get(id, ""))
+
+        rows = []
+        for n in sorted(slack.keys(), key=lambda n:slack[n]):
+            rows.append(list(describe(n)) + [round(slack[n], 5)])
+        stab = self.table_page("critical-slack.html", "Workflow Node Slack",
+            [("Type", "ID", "Name", "Slack (seconds)")], rows)
+        
+        ratio = 0.0
+        if makespan > 0: ratio = io_time / makespan
+        body = [round(makespan, 5), len(path), round(io_time, 5), 
+            round(ratio, 5), doc.HREF("%d" % len(slack), stab)]
+        html_contents.append(doc.table([("Makespan (seconds)", "Length", 
+            "I/O Time", "Ratio", "Slack")], [body]))
+
+        rows = []
+        for i, n in enumerate(path):
+            rows.append([i + 1] + list(describe(n)))
+        html_contents.append(doc.table([("Step", "Type", "ID", "Name")], 
+            rows))
+        notes = doc.tag("p", value="*Process time excludes traced read "
+            "and write time, which is counted on file edges.", 
+            attrs={"class":"notes"})
+        html_contents.append(notes)
+        return html_contents
+
+    def iosize_heat(self, entries, prefix_head, label=None, 
+        small=4 * utils.KB):
+        """Return (head, rows, heat) of a heat table from a list of 
+        (prefix cells, hist), shaded by row maximum, empty buckets of all
+        rows are omitted. Columns are labeled by label(bucket), sizes by
+        default, and preceded by the ratio below small unless None"""
+        if label is None: 
+            label = lambda k:"%d%s" % utils.smart_datasize(
+                analysis.bucket_lower(k))
+        used = numpy.zeros(analysis.SIZE_BUCKETS, dtype=bool)
+        for _, hist in entries: used |= hist > 0
+        cols = numpy.flatnonzero(used)
+        
+        head = prefix_head + ["Count"]
+        if small is not None:
+            head.append("<%d%s" % utils.smart_datasize(small))
+            small = analysis.size_bucket([small])[0]
+        head.extend(map(label, cols))
+        rows = []
+        heat = []
+        for cells, hist in entries:
+            total = hist.sum()
+            rowmax = float(hist.max())
+            row = cells + [total]
+            if small is not None:
+                row.append(round(float(hist[:small].sum()) / total, 5))
+            rows.append(row + map(lambda k:hist[k], cols))
+            heat.append([None] * (len(row)) +
+                map(lambda k:hist[k] / rowmax, cols))
+        return [tuple(head)], rows, heat
+
+    def thumbnail(self, doc, fig):
+        """Return a thumbnail link to figure file fig, or N/A if the
+        figure was not plotted"""
+        if fig is None or fig == "N/A": return "N/A"
+        base = os.path.basename(fig)
+        return doc.HREF(doc.IMG("figures/%s" % base, 
+            attrs={"class":"thumbnail"}), "figures/%s" % base)
+
+    def table_page(self, filename, title, head, rows, heat=None):
+        """Write a standalone table page to tables directory, return its
+        relative link, shade cells if heat is given"""
+        doc = DHTML.HTMLDocument()
+        head_node = doc.makeHead(title=title)
+        head_node.appendChild(doc.tag("link", attrs={"rel":"stylesheet", 
+            "type":"text/css", "href":"../%s" % self.CSS_FILE}))
+        doc.add(head_node)
+        body = doc.tag("body")
+        doc.add(body)
+        body.appendChild(doc.H(self.SECTION_SIZE, title))
+        if heat is None: body.appendChild(doc.table(head, rows))
+        else: body.appendChild(doc.heattable(head, rows, heat))
+        
+        tabFile = open("%s/%s" % (self.tdir, filename), "w")
+        doc.write(tabFile)
+        tabFile.close()
+        return "tables/%s" % filename
+
     def css_file(self):
         cssFile = open("%s/%s" % (self.rdir, self.CSS_FILE), "w")
         cssFile.write(PARATRAC_DEFAULT_CSS_STYLE_STRING)
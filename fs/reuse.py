@@ -0,0 +1,159 @@
+#############################################################################
+# ParaTrac: Scalable Tracking Tools for Parallel Applications
+# Copyright (C) 2009,2010  Nan Dun <dunnan@yl.is.s.u-tokyo.ac.jp>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#############################################################################
+
+#
+# fs/reuse.py
+# Reuse (LRU stack) distance analysis and miss ratio curves
+#
+# The stack distance of an access is the number of distinct keys
+# accessed since the previous access to the same key. An LRU cache of
+# size c hits exactly the accesses of distance below c, so a histogram
+# of distances gives the miss ratio for every cache size at once.
+#
+
+import numpy
+
+import cachesim
+from modules import verbose
+
+class StackDistance:
+    """One-pass stack distance computation
+
+    Each key is marked at the position of its last access in a Fenwick
+    tree, the distance is the number of marks after the previous
+    position of the key, O(log n) per access. Positions are renumbered
+    when the tree is full, so its size stays within twice the number of
+    distinct keys, and the tree starts small as there may be one per
+    file.
+    """
+    MIN_CAPACITY = 16
+
+    def __init__(self, capacity=MIN_CAPACITY):
+        self.last = {}
+        self.cap = capacity
+        self.tree = [0] * (capacity + 1)
+        self.pos = 1
+
+    def _add(self, i, v):
+        tree = self.tree
+        n = self.cap
+        while i <= n:
+            tree[i] += v
+            i += i & -i
+
+    def _prefix(self, i):
+        tree = self.tree
+        s = 0
+        while i > 0:
+            s += tree[i]
+            i -= i & -i
+        return s
+
+    def _compact(self):
+        keys = sorted(self.last.keys(), key=self.last.get)
+        m = len(keys)
+        self.cap = max(2 * m, self.MIN_CAPACITY)
+        for i, key in enumerate(keys): self.last[key] = i + 1
+        # all of positions 1..m are marked
+        self.tree = [0] + map(lambda i:max(0, min(i, m) - (i - (i & -i))),
+            range(1, self.cap + 1))
+        self.pos = m + 1
+
+    def access(self, key):
+        """Return stack distance of key, or -1 on its first access"""
+        if self.pos > self.cap: self._compact()
+        p = self.last.get(key)
+        if p is None:
+            d = -1
+        else:
+            d = len(self.last) - self._prefix(p)
+            self._add(p, -1)
+        self._add(self.pos, 1)
+        self.last[key] = self.pos
+        self.pos += 1
+        return d
+
+class DistanceHistogram:
+    """Counts of stack distances plus first (cold) accesses"""
+    def __init__(self):
+        self.counts = numpy.zeros(0, dtype=numpy.int64)
+        self.cold = 0
+        self.total = 0
+
+    def update(self, dists):
+        dists = numpy.asarray(dists, dtype=numpy.int64)
+        cold = dists < 0
+        self.cold += int(cold.sum())
+        self.total += len(dists)
+        if cold.all(): return
+        c = numpy.bincount(dists[~cold])
+        if len(c) > len(self.counts):
+            c[:len(self.counts)] += self.counts
+            self.counts = c
+        else:
+            self.counts[:len(c)] += c
+
+    def miss_ratio(self, sizes=None):
+        """Return (sizes, miss ratios) of LRU caches, all sizes from 1 to
+        the largest useful one if sizes is None"""
+        if sizes is None: sizes = numpy.arange(1, len(self.counts) + 1)
+        sizes = numpy.asarray(sizes, dtype=numpy.int64)
+        # hits of size c are accesses with distance below c
+        hits = numpy.append(0, numpy.cumsum(self.counts))
+        hits = hits[numpy.minimum(sizes, len(self.counts))]
+        return sizes, 1.0 - hits / float(max(self.total, 1))
+
+    def working_set(self, fraction=0.9):
+        """Return the smallest LRU size reaching fraction of the hits
+        attainable by an infinite cache"""
+        if len(self.counts) == 0: return 0
+        cum = numpy.cumsum(self.counts)
+        return int(numpy.searchsorted(cum, fraction * cum[-1])) + 1
+
+class ReuseAnalysis:
+    """Stack distances of block accesses, globally and per file"""
+    def __init__(self, db, block_size=4096):
+        self.db = db
+        self.block_size = block_size
+
+    def run(self):
+        """Return (global histogram, dict of fid to file histogram)"""
+        sim = cachesim.CacheSim(self.db, self.block_size)
+        whole = StackDistance()
+        hist = DistanceHistogram()
+        files = {}
+        fhists = {}
+        for keys, _ in sim.accesses("block"):
+            keys = numpy.asarray(keys, dtype=numpy.int64)
+            hist.update(map(whole.access, keys.tolist()))
+            # group accesses by file, stable sort keeps their order
+            fkeys = keys[numpy.argsort(keys >> sim.shift, kind="mergesort")]
+            ranks, first = numpy.unique(fkeys >> sim.shift,
+                return_index=True)
+            last = numpy.append(first[1:], len(fkeys))
+            for fid, i, j in zip(sim.fids[ranks].tolist(), first.tolist(),
+                last.tolist()):
+                if fid not in files:
+                    files[fid] = StackDistance()
+                    fhists[fid] = DistanceHistogram()
+                fhists[fid].update(map(files[fid].access,
+                    fkeys[i:j].tolist()))
+            verbose.advance(len(keys))
+        return hist, fhists
+
+__all__ = ["StackDistance", "DistanceHistogram", "ReuseAnalysis"]
@@ -0,0 +1,182 @@
+#############################################################################
+# ParaTrac: Scalable Tracking Tools for Parallel Applications
+# Copyright (C) 2009,2010  Nan Dun <dunnan@yl.is.s.u-tokyo.ac.jp>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#############################################################################
+
+#
+# fs/schedsim.py
+# Discrete-event simulation of the workflow on a given number of cores
+#
+# Every process is a task holding one core for its compute time (user
+# plus system time) and its traced read and write time, both scaled by
+# what-if speedups; the rest of its lifetime was spent waiting and needs
+# no core. A task depends on its parent and on the processes whose
+# written bytes it read. As in the trace a dependent may start part way
+# through its predecessor: it is released once the predecessor has run
+# the fraction of its lifetime after which the dependent began in the
+# trace. Edges against the order of process begin times are dropped,
+# which keeps the graph acyclic.
+#
+
+import heapq
+from collections import OrderedDict
+
+import numpy
+
+from modules.utils import SYSCALL
+import dataflow
+
+class Task:
+    def __init__(self, pid, btime, elapsed, cpu, io):
+        self.pid = pid
+        self.btime = btime
+        self.elapsed = elapsed
+        # without cpu accounting all time outside I/O counts as compute
+        if cpu is None: cpu = max(elapsed - io, 0.0)
+        self.compute = cpu
+        self.io = io
+        self.succ = []          # list of (task, release fraction)
+        self.npred = 0
+
+class WorkflowSim:
+    def __init__(self, db, flows=None):
+        """Build tasks from processes, flows of dataflow.DataFlow.run()
+        are computed unless given"""
+        self.db = db
+        if flows is None: flows = dataflow.DataFlow(db).run()[0]
+        self._build(flows)
+
+    def _build(self, flows):
+        iotime = {}
+        calls = self.db.sysc_arrays("pid,sysc,elapsed")
+        calls = calls[numpy.in1d(calls.sysc, [SYSCALL["read"],
+            SYSCALL["write"]])]
+        if len(calls) > 0:
+            pids, inv = numpy.unique(calls.pid, return_inverse=True)
+            io = numpy.bincount(inv, weights=calls.elapsed)
+            iotime = dict(zip(pids.tolist(), io.tolist()))
+
+        self.tasks = OrderedDict()
+        edges = set()
+        for pid, ppid, btime, elapsed, utime, stime in \
+            sorted(self.db.proc_sel("pid,ppid,btime,elapsed,utime,stime"),
+            key=lambda p:(p[2], p[0])):
+            if elapsed is None: continue
+            cpu = None
+            if utime is not None and stime is not None: cpu = utime + stime
+            self.tasks[pid] = Task(pid, btime, elapsed, cpu, 
+                iotime.get(pid, 0.0))
+            edges.add((ppid, pid))
+        for w, r, _ in flows.keys():
+            if w != r: edges.add((w, r))
+
+        self.start = 0.0
+        if len(self.tasks) > 0:
+            self.start = min(map(lambda t:t.btime, self.tasks.values()))
+        order = dict(map(lambda (i,p):(p, i), enumerate(self.tasks.keys())))
+        for u, v in edges:
+            if not order.has_key(u) or not order.has_key(v): continue
+            if order[u] >= order[v]: continue
+            tu, tv = self.tasks[u], self.tasks[v]
+            frac = 1.0
+            if tu.elapsed > 0:
+                frac = min(max((tv.btime - tu.btime) / tu.elapsed, 0.0), 1.0)
+            tu.succ.append((tv, frac))
+            tv.npred += 1
+
+    def measured(self):
+        """Return makespan of the traced run"""
+        if len(self.tasks) == 0: return 0.0
+        return max(map(lambda t:t.btime + t.elapsed,
+            self.tasks.values())) - self.start
+
+    def _durations(self, cpu_scale, io_scale):
+        dur = {}
+        for pid, t in self.tasks.items():
+            dur[pid] = t.compute / cpu_scale + t.io / io_scale
+        return dur
+
+    def _bottom_levels(self, dur):
+        """Longest time from the start of each task to the end of the
+        workflow"""
+        level = {}
+        for t in reversed(self.tasks.values()):
+            d = dur[t.pid]
+            b = d
+            for s, frac in t.succ:
+                b = max(b, frac * d + level[s.pid])
+            level[t.pid] = b
+        return level
+
+    def run(self, cores=None, policy="critical", cpu_scale=1.0,
+        io_scale=1.0):
+        """Simulate on cores (unlimited if None) with compute and I/O
+        sped up by the scales, ready tasks are picked by policy: "fifo"
+        earliest ready, "longest" longest task or "critical" longest
+        remaining path first. Return (makespan, core utilization or None
+        if unlimited, average wait of ready tasks)"""
+        if len(self.tasks) == 0: return 0.0, 0.0, 0.0
+        dur = self._durations(cpu_scale, io_scale)
+        if policy == "critical": level = self._bottom_levels(dur)
+        elif policy == "longest": level = dur
+        elif policy == "fifo": level = None
+        else: raise ValueError("unknown policy %s" % policy)
+
+        ready = []
+        def push(task, t):
+            if level is None: key = (t, task.btime, task.pid)
+            else: key = (-level[task.pid], task.btime, task.pid)
+            heapq.heappush(ready, key + (t, task))
+
+        pending = {}
+        events = []     # (time, kind, pid, task), kind 0 finish, 1 release
+        for t in self.tasks.values():
+            pending[t.pid] = t.npred
+            # roots start when they were launched in the trace
+            if t.npred == 0:
+                heapq.heappush(events, (t.btime - self.start, 1, t.pid, None))
+
+        free = cores
+        now = makespan = busy = waited = 0.0
+        while len(events) > 0 or len(ready) > 0:
+            if len(events) > 0 and (len(ready) == 0 or free == 0):
+                now = events[0][0]
+            while len(events) > 0 and events[0][0] <= now:
+                _, kind, pid, task = heapq.heappop(events)
+                if kind == 0:
+                    if free is not None: free += 1
+                    continue
+                if task is not None:
+                    pending[pid] -= 1
+                    if pending[pid] > 0: continue
+                push(self.tasks[pid], now)
+            while len(ready) > 0 and (free is None or free > 0):
+                entry = heapq.heappop(ready)
+                rtime, task = entry[-2], entry[-1]
+                d = dur[task.pid]
+                waited += now - rtime
+                busy += d
+                makespan = max(makespan, now + d)
+                if free is not None: free -= 1
+                heapq.heappush(events, (now + d, 0, task.pid, None))
+                for s, frac in task.succ:
+                    heapq.heappush(events, (now + frac * d, 1, s.pid, task))
+
+        util = None
+        if cores is not None: util = busy / max(makespan * cores, 1.0e-9)
+        return makespan, util, waited / len(self.tasks)
+
+__all__ = ["WorkflowSim"]
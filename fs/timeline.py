@@ -0,0 +1,112 @@
+#############################################################################
+# ParaTrac: Scalable Tracking Tools for Parallel Applications
+# Copyright (C) 2009,2010  Nan Dun <dunnan@yl.is.s.u-tokyo.ac.jp>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#############################################################################
+
+#
+# fs/timeline.py
+# Export of system calls and process lifetimes as trace-event JSON
+#
+# The output follows the Chrome trace-event format and can be loaded by
+# chrome://tracing and Perfetto. Each process is shown as a trace process
+# with a "lifetime" track and a "syscalls" track. Events are written
+# chunk by chunk, so memory use does not depend on the trace size.
+#
+
+import json
+
+from modules.utils import SYSCALL
+from modules import prof
+
+class TimelineExport:
+    def __init__(self, db):
+        self.db = db
+        self.LIFETIME_TID = 0
+
+    def write(self, path):
+        """Write trace-event JSON of the calls and processes in the scope
+        of the database (see Database.set_scope) to path, return number of
+        events written"""
+        btime = self.db.sysc_btime()
+        start = self.db.scope[0]
+        procs = []
+        for p, ppid, pbtime, elapsed, cmd in \
+            self.db.proc_sel("pid,ppid,btime,elapsed,cmdline"):
+            procs.append((p, ppid, float(pbtime) - btime, elapsed, cmd))
+
+        # origin keeps timestamps non-negative for the viewers
+        origin = 0.0
+        if start is not None: origin = start
+        elif len(procs) > 0:
+            origin = min(0.0, min(map(lambda p:p[2], procs)))
+
+        f = open(path, "w")
+        f.write('{"displayTimeUnit":"ms","otherData":%s,"traceEvents":[\n'
+            % json.dumps({"btime":btime + origin}))
+        self.count = 0
+        prof.begin("export.proc")
+        self._write_procs(f, procs, origin)
+        prof.end(len(procs))
+        prof.begin("export.sysc")
+        self._write_sysc(f, origin)
+        prof.end()
+        f.write("\n]}\n")
+        f.close()
+        return self.count
+
+    def _emit(self, f, events):
+        if len(events) == 0: return
+        if self.count > 0: f.write(",\n")
+        f.write(",\n".join(events))
+        self.count += len(events)
+
+    def _write_procs(self, f, procs, origin):
+        events = []
+        for pid, ppid, pstart, elapsed, cmd in procs:
+            name = json.dumps(cmd or "pid %d" % pid)
+            events.append('{"ph":"M","pid":%d,"tid":%d,"name":"process_name",'
+                '"args":{"name":%s}}' % (pid, pid, name))
+            events.append('{"ph":"M","pid":%d,"tid":%d,"name":"thread_name",'
+                '"args":{"name":"lifetime"}}' % (pid, self.LIFETIME_TID))
+            events.append('{"ph":"M","pid":%d,"tid":%d,"name":"thread_name",'
+                '"args":{"name":"syscalls"}}' % (pid, pid))
+            events.append('{"ph":"X","pid":%d,"tid":%d,"name":%s,'
+                '"ts":%.3f,"dur":%.3f,"args":{"ppid":%d}}' % (pid,
+                self.LIFETIME_TID, name, (pstart - origin) * 1.0e06,
+                float(elapsed) * 1.0e06, ppid))
+        self._emit(f, events)
+
+    def _write_sysc(self, f, origin):
+        paths = {}
+        for fid, path in self.db.file_sel("fid,path"):
+            paths[fid] = json.dumps(path)
+        for chunk in self.db.sysc_chunks("stamp,pid,sysc,fid,res,elapsed,"
+            "aux1,aux2"):
+            # stamps are taken when calls complete
+            ts = (chunk.stamp - chunk.elapsed - origin) * 1.0e06
+            dur = chunk.elapsed * 1.0e06
+            events = []
+            for i in range(0, len(chunk)):
+                fid = int(chunk.fid[i])
+                events.append('{"ph":"X","pid":%d,"tid":%d,"name":"%s",'
+                    '"ts":%.3f,"dur":%.3f,"args":{"fid":%d,"path":%s,'
+                    '"res":%d,"aux1":%d,"aux2":%d}}' % (chunk.pid[i],
+                    chunk.pid[i], SYSCALL.get(int(chunk.sysc[i]), "unknown"),
+                    ts[i], dur[i], fid, paths.get(fid, "null"), chunk.res[i],
+                    chunk.aux1[i], chunk.aux2[i]))
+            self._emit(f, events)
+
+__all__ = ["TimelineExport"]
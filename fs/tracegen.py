@@ -0,0 +1,234 @@
+#############################################################################
+# ParaTrac: Scalable Tracking Tools for Parallel Applications
+# Copyright (C) 2009,2010  Nan Dun <dunnan@yl.is.s.u-tokyo.ac.jp>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#############################################################################
+
+#
+# fs/tracegen.py
+# Synthetic trace generator
+#
+# Writes a trace directory in the same format as ftrac (runtime.log,
+# file.log, sysc.log, taskstat.log and proc.log), modelling a pipeline
+# where every process reads the outputs of its parent and of shared
+# input files and writes its own outputs, some of which are deleted
+# again by the last of its children.
+#
+
+import os
+import errno
+import heapq
+import random
+
+from modules.utils import SYSCALL
+
+class TraceGenerator:
+    def __init__(self, procs=16, files=64, calls=10000, fanout=4,
+        duration=60.0, seed=0):
+        self.procs = max(procs, 1)
+        self.files = max(files, 1)
+        self.calls = max(calls, self.procs)
+        self.fanout = max(fanout, 1)
+        self.duration = duration
+        self.seed = seed
+
+        self.mountpoint = "/tmp/paratrac-gen"
+        self.btime = 1262304000.0   # 2010-01-01
+        self.clktck = 100
+        # request sizes and their weights
+        self.SIZES = [512, 4096, 65536, 1048576]
+        self.SIZE_WEIGHTS = [0.2, 0.5, 0.2, 0.1]
+        self.RANDOM_RATIO = 0.1
+        # ratio of lookups failing with ENOENT
+        self.ENOENT_RATIO = 0.05
+        # ratio of outputs deleted once the last child of their writer
+        # is done with them
+        self.UNLINK_RATIO = 0.5
+
+    def write(self, path):
+        """Generate trace logs into directory path"""
+        if not os.path.exists(path): os.makedirs(path)
+        self.rand = random.Random(self.seed)
+        self._layout()
+        self._write_runtime(path)
+        self._write_files(path)
+        self._write_procs(path)
+        self._write_sysc(path)
+
+    def _layout(self):
+        """Decide process tree, lifetimes and file ownership"""
+        self.ppid = {}
+        self.life = {}
+        self.outputs = {}
+        self.inputs = {}
+        pids = range(2, self.procs + 2)
+        for i, pid in enumerate(pids):
+            if i == 0: self.ppid[pid] = 1
+            else: self.ppid[pid] = pids[(i - 1) / self.fanout]
+            # children start within their parent's lifetime
+            if i == 0: start = 0.0
+            else:
+                pstart, pend = self.life[self.ppid[pid]]
+                start = pstart + self.rand.random() * (pend - pstart) * 0.5
+            end = start + (self.duration - start) * \
+                (0.3 + 0.7 * self.rand.random())
+            self.life[pid] = (start, end)
+            self.outputs[pid] = []
+            self.inputs[pid] = []
+
+        # shared inputs come first, then outputs round robin over procs
+        n_shared = max(self.files / 4, 1)
+        fids = range(1, self.files + 1)
+        for i, fid in enumerate(fids[n_shared:]):
+            self.outputs[pids[i % len(pids)]].append(fid)
+        for pid in pids:
+            self.inputs[pid].append(fids[self.rand.randrange(n_shared)])
+            ppid = self.ppid[pid]
+            if self.outputs.has_key(ppid):
+                self.inputs[pid].extend(self.outputs[ppid])
+        self.pids = pids
+        
+        # the child of a writer ending last removes intermediate outputs
+        self.unlinks = {}
+        for pid in pids: self.unlinks[pid] = []
+        for pid in pids:
+            children = filter(lambda c:self.ppid[c] == pid, pids)
+            if len(children) == 0: continue
+            last = max(children, key=lambda c:self.life[c][1])
+            for fid in self.outputs[pid]:
+                if self.rand.random() < self.UNLINK_RATIO:
+                    self.unlinks[last].append(fid)
+
+    def _write_runtime(self, path):
+        f = open("%s/runtime.log" % path, "w")
+        for item, val in [("version", "0.4"), ("hostname", "localhost"),
+            ("platform", "Linux"), ("mountpoint", self.mountpoint),
+            ("user", "paratrac"), ("uid", "1000"), ("iid", "0"),
+            ("pid", "1"), ("cmdline", "tracegen"),
+            ("start", "%d" % self.btime),
+            ("end", "%d" % (self.btime + self.duration)),
+            ("clktck", "%d" % self.clktck),
+            ("sysbtime", "%d" % (self.btime - 3600))]:
+            f.write("%s:%s\n" % (item, val))
+        f.close()
+
+    def _write_files(self, path):
+        f = open("%s/file.log" % path, "w")
+        for fid in range(1, self.files + 1):
+            f.write("%d:%s/data/file-%06d\n" % (fid, self.mountpoint, fid))
+        f.close()
+
+    def _write_procs(self, path):
+        ftask = open("%s/taskstat.log" % path, "w")
+        fproc = open("%s/proc.log" % path, "w")
+        for pid in [1] + self.pids:
+            if pid == 1:
+                ppid, start, end = 0, 0.0, self.duration
+                cmd = "/sbin/init"
+            else:
+                ppid = self.ppid[pid]
+                start, end = self.life[pid]
+                cmd = self._cmdline(pid)
+            elapsed = (end - start) * 1000000.0
+            ucpu, scpu = self._cpu_ratio(pid)
+            utime = elapsed * ucpu
+            stime = elapsed * scpu
+            ftask.write("%d,%d,0,0,%d,%d,%d,%d,%s\n" % (pid, ppid,
+                self.btime + start, elapsed, utime, stime,
+                cmd.split(" ")[0]))
+            fproc.write("1|#|%d|#|%d|#|0|#|0|#|0|#|0|#|%s|#|PATH=/bin\n"
+                % (pid, ppid, cmd))
+        ftask.close()
+        fproc.close()
+
+    def _cmdline(self, pid):
+        return "/usr/bin/stage%d --id %d" % (pid % 8, pid)
+
+    def _cpu_ratio(self, pid):
+        """Return user and system time of process pid as fractions of
+        its lifetime"""
+        return 0.6, 0.1
+
+    def _call_counts(self):
+        """Return number of system calls of each process of self.pids,
+        self.calls split evenly by default"""
+        per_proc = self.calls / len(self.pids)
+        counts = []
+        for i, pid in enumerate(self.pids):
+            ncalls = per_proc
+            if i < self.calls % len(self.pids): ncalls += 1
+            counts.append(ncalls)
+        return counts
+
+    def _proc_calls(self, pid, ncalls):
+        """Yield (stamp, line) of system calls of process pid in time
+        order"""
+        rand = random.Random("%s-%d" % (self.seed, pid))
+        start, end = self.life[pid]
+        step = (end - start) / (ncalls + 1)
+        t = self.btime + start
+        files = map(lambda f:(f, SYSCALL["read"]), self.inputs[pid]) + \
+            map(lambda f:(f, SYSCALL["write"]), self.outputs[pid])
+        if len(files) == 0: files = [(1, SYSCALL["read"])]
+        unlinks = self.unlinks[pid][:ncalls]
+        ncalls -= len(unlinks)
+        n = 0
+        while n < ncalls:
+            fid, op = files[rand.randrange(len(files))]
+            size = self._choose_size(rand)
+            nio = max(min(ncalls - n - 3, rand.randint(1, 32)), 0)
+            if op == SYSCALL["write"]: first = SYSCALL["creat"]
+            else: first = SYSCALL["open"]
+            session = [(SYSCALL["lstat"], 0, 0, 0), (first, 0, 0, 0)]
+            if rand.random() < self.ENOENT_RATIO:
+                session.insert(0, (SYSCALL["lstat"], -errno.ENOENT, 0, 0))
+            off = 0
+            for i in range(0, nio):
+                if rand.random() < self.RANDOM_RATIO:
+                    off = rand.randrange(64) * size
+                session.append((op, size, size, off))
+                off += size
+            session.append((SYSCALL["close"], 0, 0, 0))
+            for sc, res, aux1, aux2 in session[:ncalls - n]:
+                t += step * (0.5 + rand.random())
+                if aux1 > 0:
+                    elapsed = 2.0e-05 + aux1 / 2.0e08 * rand.expovariate(1)
+                else:
+                    elapsed = rand.expovariate(1.0 / 5.0e-05)
+                yield (t, "%f,%d,%d,%d,%d,%f,%d,%d\n" % (t, pid, sc, fid,
+                    res, elapsed, aux1, aux2))
+                n += 1
+        for fid in unlinks:
+            t += step * (0.5 + rand.random())
+            yield (t, "%f,%d,%d,%d,0,%f,0,0\n" % (t, pid, SYSCALL["unlink"],
+                fid, rand.expovariate(1.0 / 5.0e-05)))
+
+    def _choose_size(self, rand):
+        r = rand.random()
+        for size, w in zip(self.SIZES, self.SIZE_WEIGHTS):
+            if r < w: return size
+            r -= w
+        return self.SIZES[-1]
+
+    def _write_sysc(self, path):
+        f = open("%s/sysc.log" % path, "w")
+        gens = []
+        for pid, ncalls in zip(self.pids, self._call_counts()):
+            gens.append(self._proc_calls(pid, ncalls))
+        for _, line in heapq.merge(*gens):
+            f.write(line)
+        f.close()
+
+__all__ = ["TraceGenerator"]
@@ -0,0 +1,346 @@
+#############################################################################
+# ParaTrac: Scalable Tracking Tools for Parallel Applications
+# Copyright (C) 2009,2010  Nan Dun <dunnan@yl.is.s.u-tokyo.ac.jp>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#############################################################################
+
+#
+# fs/workload.py
+# Workload model fitted from a trace and a generator scaling it
+#
+# Processes are grouped into classes by executable name. Each class is
+# described by empirical distributions, kept as quantiles, of start time,
+# lifetime, calls and files per process, inter-arrival time of calls,
+# call latency and file extent, by the request sizes and offset pattern
+# of reads and writes, and by a Markov chain of its system calls. The
+# model is a small JSON document; ModelGenerator draws any number of
+# processes from it and writes them as trace logs.
+#
+
+import os
+import json
+import errno
+import random
+
+import numpy
+
+from modules.utils import SYSCALL
+import analysis
+import tracegen
+
+# quantiles kept of each distribution
+QUANTILES = numpy.linspace(0, 100, 21)
+# most frequent request sizes kept
+TOP_SIZES = 32
+PATTERNS = ["sequential", "strided", "backward", "random"]
+
+def quantiles(values):
+    """Return list of QUANTILES of values, None if values is empty"""
+    if len(values) == 0: return None
+    return map(float, numpy.percentile(values, QUANTILES))
+
+def sample(q, rand):
+    """Draw a value from quantiles q by inverse transform sampling"""
+    if q is None: return 0.0
+    u = rand.random() * (len(q) - 1)
+    i = int(u)
+    if i >= len(q) - 1: return q[-1]
+    return q[i] + (q[i+1] - q[i]) * (u - i)
+
+def choice(items, weights, rand):
+    r = rand.random() * sum(weights)
+    for item, w in zip(items, weights):
+        if r < w: return item
+        r -= w
+    return items[-1]
+
+class WorkloadModel:
+    def __init__(self, model=None):
+        self.model = model
+
+    def fit(self, db):
+        """Fit model from database db, return model dict"""
+        procs = db.proc_sel("pid,ppid,btime,elapsed,utime,stime,cmdline")
+        klass = {}
+        for pid, _, _, _, _, _, cmd in procs:
+            name = "%s" % (cmd or "")
+            klass[pid] = os.path.basename(name.split(" ")[0]) or "unknown"
+        calls = db.sysc_arrays("stamp,pid,sysc,fid,res,elapsed,aux1,aux2")
+        span = 0.0
+        if len(calls) > 0:
+            span = float(calls.stamp.max() - calls.stamp.min())
+        btime = db.sysc_btime()
+        t0 = 0.0
+        if len(calls) > 0: t0 = float(calls.stamp.min())
+
+        # files touched by more than one process
+        pairs = numpy.unique(calls.fid.astype(numpy.int64) * (1 << 32) +
+            calls.pid)
+        fids, nprocs = analysis.group_sum(pairs >> 32)
+        shared = set(fids[nprocs > 1].tolist())
+
+        # per-process sequences: sort by pid, then time
+        order = numpy.lexsort((calls.stamp, calls.pid))
+        calls = calls[order]
+        same = numpy.zeros(len(calls), dtype=bool)
+        if len(calls) > 1: same[1:] = calls.pid[1:] == calls.pid[:-1]
+
+        # processes and calls grouped by class in one pass each, a
+        # stable sort keeps the calls of a class in per-process order
+        names = sorted(set(klass.values()) | set(["unknown"]))
+        index = dict(map(lambda (i, n):(n, i), enumerate(names)))
+        members = map(lambda n:set(), names)
+        info = map(lambda n:[], names)
+        for pid, name in klass.items(): members[index[name]].add(pid)
+        for p in procs: info[index[klass[p[0]]]].append(p)
+        unknown = index["unknown"]
+        cls_of = numpy.array(map(lambda p:index[klass[p]]
+            if p in klass else unknown, calls.pid.tolist()),
+            dtype=numpy.int64)
+        order = numpy.argsort(cls_of, kind="mergesort")
+        bounds = numpy.searchsorted(cls_of[order], numpy.arange(len(names)
+            + 1))
+
+        classes = {}
+        for i, name in enumerate(names):
+            sel = order[bounds[i]:bounds[i+1]]
+            if len(sel) == 0 and len(members[i]) == 0: continue
+            classes[name] = self._fit_class(name, members[i], info[i],
+                klass, calls[sel], same[sel], shared, btime + t0, span)
+
+        self.model = {"version":1, "duration":span,
+            "files":len(fids), "shared_files":len(shared),
+            "classes":classes}
+        return self.model
+
+    def _fit_class(self, name, members, info, klass, calls, same, shared,
+        start, span):
+        """Fit class name of the set of pids members, info are their rows
+        of the proc table and calls their calls in per-process order"""
+        c = {}
+        c["procs"] = len(members)
+        parents = {}
+        for pid, ppid, _, _, _, _, _ in info:
+            k = klass.get(ppid, "")
+            parents[k] = parents.get(k, 0) + 1
+        c["parents"] = parents
+        c["start"] = quantiles(map(lambda p:min(max((p[2] - start) /
+            max(span, 1.0e-9), 0.0), 1.0), info))
+        c["lifetime"] = quantiles(map(lambda p:p[3] or 0.0, info))
+        life = max(sum(map(lambda p:p[3] or 0.0, info)), 1.0e-9)
+        c["cpu"] = [sum(map(lambda p:p[4] or 0.0, info)) / life,
+            sum(map(lambda p:p[5] or 0.0, info)) / life]
+
+        pids, ncalls = analysis.group_sum(calls.pid)
+        ncalls = numpy.append(ncalls, numpy.zeros(max(len(members) -
+            len(pids), 0)))
+        c["calls"] = quantiles(ncalls)
+        pairs = numpy.unique(calls.pid.astype(numpy.int64) * (1 << 32) +
+            calls.fid)
+        _, nfiles = analysis.group_sum(pairs >> 32)
+        c["files"] = quantiles(nfiles)
+        fids = pairs & ((1 << 32) - 1)
+        c["shared"] = 0.0
+        if len(fids) > 0:
+            c["shared"] = float(numpy.in1d(fids, list(shared)).sum()) / \
+                len(fids)
+        c["interarrival"] = quantiles(numpy.diff(calls.stamp)[same[1:]])
+
+        # Markov chain of system calls
+        states = sorted(set(calls.sysc.tolist()))
+        index = numpy.searchsorted(states, calls.sysc)
+        n = len(states)
+        first = index[~same]
+        initial = numpy.bincount(first, minlength=n).astype(float)
+        pair = index[:-1][same[1:]] * n + index[1:][same[1:]]
+        trans = numpy.bincount(pair, minlength=n * n).reshape(n, n)
+        c["sysc"] = map(lambda s:SYSCALL[s], states)
+        c["initial"] = (initial / max(initial.sum(), 1)).tolist()
+        rows = numpy.maximum(trans.sum(axis=1), 1)[:, numpy.newaxis]
+        c["transition"] = numpy.round(trans / rows.astype(float), 6).tolist()
+
+        c["latency"] = {}
+        c["errors"] = {}
+        for s in states:
+            sel = calls.sysc == s
+            c["latency"][SYSCALL[s]] = quantiles(calls.elapsed[sel])
+            failed = calls.res[sel] < 0
+            if failed.any():
+                codes, counts = analysis.group_sum(-calls.res[sel][failed])
+                c["errors"][SYSCALL[s]] = [float(failed.mean()),
+                    errno.errorcode.get(int(codes[numpy.argmax(counts)]),
+                    "EIO")]
+
+        c["size"] = {}
+        c["pattern"] = {}
+        strides = []
+        for op in ["read", "write"]:
+            sel = (calls.sysc == SYSCALL[op]) & (calls.aux1 > 0)
+            io = calls[sel]
+            if len(io) == 0: continue
+            sizes, counts = analysis.group_sum(io.aux1)
+            top = numpy.argsort(-counts, kind="mergesort")[:TOP_SIZES]
+            c["size"][op] = map(lambda i:[int(sizes[i]),
+                float(counts[i]) / counts[top].sum()], top)
+            order, cls, _ = analysis.access_pattern(io.pid, io.fid,
+                io.stamp, io.aux2, io.aux1)
+            pattern = numpy.bincount(cls, minlength=len(PATTERNS))
+            c["pattern"][op] = (pattern / float(pattern.sum())).tolist()
+            off = io.aux2[order].astype(numpy.int64)
+            length = io.aux1[order].astype(numpy.int64)
+            stride = cls[1:] == analysis.ACCESS_STRIDED
+            strides.append((off[1:] - off[:-1] - length[:-1])[stride])
+        strides = numpy.concatenate(strides + [numpy.zeros(0)])
+        c["stride"] = quantiles(strides)
+        io = calls[numpy.in1d(calls.sysc, [SYSCALL["read"],
+            SYSCALL["write"]])]
+        extent = []
+        if len(io) > 0:
+            fids, inv = numpy.unique(io.fid, return_inverse=True)
+            extent = numpy.zeros(len(fids), dtype=numpy.int64)
+            numpy.maximum.at(extent, inv, io.aux2 + io.aux1)
+        c["extent"] = quantiles(extent)
+        return c
+
+    def save(self, path):
+        f = open(path, "w")
+        json.dump(self.model, f, indent=1, sort_keys=True)
+        f.close()
+
+    def load(self, path):
+        f = open(path)
+        self.model = json.load(f)
+        f.close()
+        return self.model
+
+class ModelGenerator(tracegen.TraceGenerator):
+    """Write a synthetic trace of a workload model with the number of
+    processes of each class multiplied by scale"""
+    def __init__(self, model, scale=1.0, seed=0):
+        self.model = model
+        self.scale = scale
+        self.counts = {}
+        for name, c in model["classes"].items():
+            if c["procs"] == 0: continue
+            self.counts[name] = max(int(round(c["procs"] * scale)), 1)
+        procs = max(sum(self.counts.values()), 1)
+        tracegen.TraceGenerator.__init__(self, procs=procs,
+            files=max(int(round(model["shared_files"] * scale)), 1),
+            calls=procs, duration=model["duration"], seed=seed)
+
+    def _layout(self):
+        rand = self.rand
+        classes = self.model["classes"]
+        plan = []
+        for name in sorted(self.counts.keys()):
+            for i in range(0, self.counts[name]):
+                plan.append((sample(classes[name]["start"], rand), name))
+        plan.sort()
+
+        self.klass = {}
+        self.ppid = {}
+        self.life = {}
+        self.files_of = {}
+        self.ncalls = {}
+        self.unlinks = {}
+        self.pids = []
+        members = {}
+        nshared = self.files
+        nfiles = nshared
+        for i, (frac, name) in enumerate(plan):
+            pid = i + 2
+            c = classes[name]
+            self.pids.append(pid)
+            self.klass[pid] = name
+            self.unlinks[pid] = []
+            parent = choice(c["parents"].keys(), c["parents"].values(), rand)
+            candidates = members.get(parent, [])
+            if len(candidates) > 0:
+                self.ppid[pid] = candidates[rand.randrange(len(candidates))]
+            else: self.ppid[pid] = 1
+            members.setdefault(name, []).append(pid)
+            start = frac * self.duration
+            self.life[pid] = (start, start + sample(c["lifetime"], rand))
+            self.ncalls[pid] = int(round(sample(c["calls"], rand)))
+            files = []
+            for j in range(0, max(int(round(sample(c["files"], rand))), 1)):
+                if rand.random() < c["shared"]:
+                    files.append(rand.randrange(nshared) + 1)
+                else:
+                    nfiles += 1
+                    files.append(nfiles)
+            self.files_of[pid] = files
+        self.files = nfiles
+
+    def _cmdline(self, pid):
+        return "/usr/bin/%s --id %d" % (self.klass[pid], pid)
+
+    def _cpu_ratio(self, pid):
+        if not self.klass.has_key(pid):
+            return tracegen.TraceGenerator._cpu_ratio(self, pid)
+        return self.model["classes"][self.klass[pid]]["cpu"]
+
+    def _call_counts(self):
+        return map(lambda pid:self.ncalls[pid], self.pids)
+
+    def _proc_calls(self, pid, ncalls):
+        rand = random.Random("%s-%d" % (self.seed, pid))
+        c = self.model["classes"][self.klass[pid]]
+        states = c["sysc"]
+        if len(states) == 0: return
+        files = self.files_of[pid]
+        extent = {}
+        pos = {}
+        t = self.btime + self.life[pid][0]
+        state = choice(range(len(states)), c["initial"], rand)
+        fid = files[rand.randrange(len(files))]
+        for n in range(0, ncalls):
+            if n > 0:
+                t += sample(c["interarrival"], rand)
+                row = c["transition"][state]
+                if sum(row) > 0: state = choice(range(len(states)), row, rand)
+            sc = states[state]
+            if sc in ["lstat", "access", "open", "creat", "unlink"]:
+                fid = files[rand.randrange(len(files))]
+            res, aux1, aux2 = 0, 0, 0
+            err = c["errors"].get(sc)
+            if err is not None and rand.random() < err[0]:
+                res = -getattr(errno, err[1], errno.EIO)
+            elif c["size"].has_key(sc):
+                sizes = c["size"][sc]
+                aux1 = choice(map(lambda s:s[0], sizes),
+                    map(lambda s:s[1], sizes), rand)
+                aux2 = self._offset(c, sc, fid, aux1, pos, extent, rand)
+                res = aux1
+                pos[fid] = (aux2, aux2 + aux1)
+            elapsed = max(sample(c["latency"].get(sc), rand), 0.0)
+            yield (t, "%f,%d,%d,%d,%d,%f,%d,%d\n" % (t, pid, SYSCALL[sc],
+                fid, res, elapsed, aux1, aux2))
+
+    def _offset(self, c, sc, fid, size, pos, extent, rand):
+        """Return offset of the next request to fid by the offset pattern
+        of the class"""
+        if not extent.has_key(fid):
+            extent[fid] = max(int(sample(c["extent"], rand)), size)
+        prev = pos.get(fid)
+        if prev is None: return 0
+        pattern = choice(PATTERNS, c["pattern"][sc], rand)
+        if pattern == "sequential": return prev[1]
+        if pattern == "strided":
+            return prev[1] + max(int(sample(c["stride"], rand)), 0)
+        if pattern == "backward": return max(prev[0] - size, 0)
+        return rand.randrange(max(extent[fid] - size, 0) / size + 1) * size
+
+__all__ = ["WorkloadModel", "ModelGenerator"]
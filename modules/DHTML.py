@@ -70,6 +70,34 @@ class HTMLDocument():
             tableNode.appendChild(rowNode)
         return tableNode
 
+    def heattable(self, head, rowdata, heat, attrs=None):
+        """Generate a table whose data cells are shaded by heat
+
+        heat has the same shape as rowdata, each value is either None
+        (no shading) or in [0, 1], from white to full red.
+        """
+        tableNode = self.tag("table", attrs=attrs)
+        for row in head:
+            rowNode = self.tag("tr")
+            for v in row:
+                rowNode.appendChild(self.tag("th", value=v))
+            tableNode.appendChild(rowNode)
+        for row, hrow in zip(rowdata, heat):
+            rowNode = self.tag("tr")
+            for v, h in zip(row, hrow):
+                cellAttrs = None
+                if h is not None:
+                    level = int(255 * (1.0 - min(max(h, 0.0), 1.0)))
+                    cellAttrs = {"style":"background-color: #ff%02x%02x" 
+                        % (level, level)}
+                cellNode = self.tag("td", attrs=cellAttrs)
+                if not isinstance(v, xml.dom.Node):
+                    v = self.doc.createTextNode("%s" % v)
+                cellNode.appendChild(v)
+                rowNode.appendChild(cellNode)
+            tableNode.appendChild(rowNode)
+        return tableNode
+
     def makeList(self, items, attrs={}):
         if len(items) == 0:
             return None
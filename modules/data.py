@@ -25,13 +25,67 @@ import os
 import sqlite3
 import cPickle
 
+from modules.utils import timer
+
+# SQL statistics, collected only by databases opened with PROFILE_SQL set
+PROFILE_SQL = False
+SQL_STATS = {"queries":0, "time":0.0, "rows":0}
+
+class ProfiledCursor(sqlite3.Cursor):
+    """Cursor accounting queries, time and rows into SQL_STATS"""
+    def execute(self, *args):
+        t = timer()
+        try:
+            return sqlite3.Cursor.execute(self, *args)
+        finally:
+            SQL_STATS["queries"] += 1
+            SQL_STATS["time"] += timer() - t
+            if self.rowcount > 0: SQL_STATS["rows"] += self.rowcount
+
+    def executemany(self, *args):
+        t = timer()
+        try:
+            return sqlite3.Cursor.executemany(self, *args)
+        finally:
+            SQL_STATS["queries"] += 1
+            SQL_STATS["time"] += timer() - t
+            if self.rowcount > 0: SQL_STATS["rows"] += self.rowcount
+
+    def fetchone(self):
+        t = timer()
+        res = sqlite3.Cursor.fetchone(self)
+        SQL_STATS["time"] += timer() - t
+        if res is not None: SQL_STATS["rows"] += 1
+        return res
+
+    def fetchmany(self, *args):
+        t = timer()
+        res = sqlite3.Cursor.fetchmany(self, *args)
+        SQL_STATS["time"] += timer() - t
+        SQL_STATS["rows"] += len(res)
+        return res
+
+    def fetchall(self):
+        t = timer()
+        res = sqlite3.Cursor.fetchall(self)
+        SQL_STATS["time"] += timer() - t
+        SQL_STATS["rows"] += len(res)
+        return res
+
+class ProfiledConnection(sqlite3.Connection):
+    def cursor(self, factory=ProfiledCursor):
+        return sqlite3.Connection.cursor(self, factory)
+
 class Database:
     """
     Common database
     """
     def __init__(self, path):
         self.db = os.path.abspath(path)
-        self.con = sqlite3.connect(self.db)
+        if PROFILE_SQL:
+            self.con = sqlite3.connect(self.db, factory=ProfiledConnection)
+        else:
+            self.con = sqlite3.connect(self.db)
         self.cur = self.con.cursor()
         self.tab = {}
         self._set_tabs()
@@ -0,0 +1,125 @@
+#############################################################################
+# ParaTrac: Scalable Tracking Tools for Parallel Applications
+# Copyright (C) 2009,2010  Nan Dun <dunnan@yl.is.s.u-tokyo.ac.jp>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#############################################################################
+
+#
+# modules/prof.py
+# Per-stage profiling of wall time, cpu time, memory and SQL activity
+#
+# Stages are opened and closed with begin() and end() and may nest, the
+# figures of an outer stage include its inner stages. Nothing is
+# recorded until enable() is called, so the hooks cost a function call
+# when profiling is off. Stages are also announced to the progress
+# meter of modules.verbose.
+#
+
+import os
+import sys
+import json
+import time
+import resource
+
+from modules import data
+from modules import verbose
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.stages = []
+        self.stack = []
+
+    def enable(self):
+        """Start recording, SQL is accounted only for databases opened
+        after this call"""
+        self.enabled = True
+        data.PROFILE_SQL = True
+
+    def _sample(self):
+        c = os.times()
+        return {"wall":time.time(), "cpu":c[0] + c[1], "rss":rss_kb(),
+            "sql_queries":data.SQL_STATS["queries"],
+            "sql_time":data.SQL_STATS["time"],
+            "sql_rows":data.SQL_STATS["rows"]}
+
+    def begin(self, name):
+        if not self.enabled: return
+        stage = {"name":name, "depth":len(self.stack), "rows":None}
+        self.stages.append(stage)
+        self.stack.append((stage, self._sample()))
+
+    def end(self, rows=None):
+        """Close the innermost stage, rows is the number of records it
+        processed if known, otherwise the number of SQL rows it read and
+        wrote"""
+        if not self.enabled or len(self.stack) == 0: return
+        stage, s0 = self.stack.pop()
+        s1 = self._sample()
+        stage["wall"] = s1["wall"] - s0["wall"]
+        stage["cpu"] = s1["cpu"] - s0["cpu"]
+        stage["peak_rss"] = \
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        stage["rss_growth"] = s1["rss"] - s0["rss"]
+        stage["sql_queries"] = s1["sql_queries"] - s0["sql_queries"]
+        stage["sql_time"] = s1["sql_time"] - s0["sql_time"]
+        if rows is None: rows = s1["sql_rows"] - s0["sql_rows"]
+        stage["rows"] = rows
+
+    def save(self, path):
+        """Save closed stages as JSON"""
+        f = open(path, "w")
+        json.dump({"date":time.strftime("%Y-%m-%d %H:%M:%S"),
+            "argv":sys.argv,
+            "stages":filter(lambda s:s.has_key("wall"), self.stages)},
+            f, indent=1, sort_keys=True)
+        f.close()
+
+    def summary(self, out=sys.stdout):
+        """Write a table of closed stages, inner stages indented"""
+        out.write("%-36s %9s %9s %10s %10s %8s %9s\n" % ("stage", "wall",
+            "cpu", "peak_rss", "rows", "queries", "sql_time"))
+        for s in self.stages:
+            if not s.has_key("wall"): continue
+            name = "  " * s["depth"] + s["name"]
+            out.write("%-36s %8.3fs %8.3fs %8dKB %10d %8d %8.3fs\n" % (
+                name[:36], s["wall"], s["cpu"], s["peak_rss"], s["rows"],
+                s["sql_queries"], s["sql_time"]))
+
+def rss_kb():
+    """Return current resident set size in KB"""
+    try:
+        f = open("/proc/self/statm")
+        pages = int(f.read().split()[1])
+        f.close()
+        return pages * resource.getpagesize() / 1024
+    except (IOError, IndexError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+# process wide profiler used by the stage hooks below
+PROFILER = Profiler()
+
+def enable():
+    PROFILER.enable()
+
+def begin(name):
+    verbose.stage_begin(name)
+    PROFILER.begin(name)
+
+def end(rows=None):
+    PROFILER.end(rows)
+    verbose.stage_end()
+
+__all__ = ["Profiler", "PROFILER", "enable", "begin", "end", "rss_kb"]
@@ -0,0 +1,127 @@
+#############################################################################
+# ParaTrac: Scalable Tracking Tools for Parallel Applications
+# Copyright (C) 2009,2010  Nan Dun <dunnan@yl.is.s.u-tokyo.ac.jp>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#############################################################################
+
+#
+# modules/sketch.py
+# Bounded memory summaries of data streams
+#
+
+import heapq
+
+import numpy
+
+class TopK:
+    """Weighted Space-Saving heavy hitters
+
+    Keeps at most capacity counters. Counts are exact as long as the
+    number of distinct keys never exceeds capacity. Otherwise the key
+    with the smallest counter is evicted and its count inherited by the
+    newcomer, so each count overestimates the true value by at most its
+    error. The smallest counter is found through a min-heap with lazy
+    deletion of stale entries.
+    """
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.heap = []
+        self.total = 0
+        self.evicted = 0
+
+    def update(self, key, weight=1):
+        self.total += weight
+        if key in self.counts:
+            self.counts[key] += weight
+        elif len(self.counts) < self.capacity:
+            self.counts[key] = weight
+            self.errors[key] = 0
+        else:
+            minkey, mincount = self._pop_min()
+            del self.counts[minkey]
+            del self.errors[minkey]
+            self.counts[key] = mincount + weight
+            self.errors[key] = mincount
+            self.evicted += 1
+        heapq.heappush(self.heap, (self.counts[key], key))
+        if len(self.heap) > 4 * self.capacity:
+            self._rebuild()
+
+    def _pop_min(self):
+        while True:
+            count, key = heapq.heappop(self.heap)
+            if self.counts.get(key) == count:
+                return key, count
+
+    def _rebuild(self):
+        self.heap = map(lambda (k,c):(c,k), self.counts.items())
+        heapq.heapify(self.heap)
+
+    def exact(self):
+        """Return True if no counter has ever been evicted"""
+        return self.evicted == 0
+
+    def top(self, k):
+        """Return list of (key, count, error) of the k largest counters"""
+        items = heapq.nlargest(k, self.counts.items(), key=lambda (_,c):c)
+        return map(lambda (key,c):(key, c, self.errors[key]), items)
+
+class LogHistogram:
+    """Quantile sketch of non-negative values with bounded relative error
+
+    Values are counted in logarithmic buckets, bins_per_octave buckets
+    per doubling between min_value and max_value, so quantiles have a
+    relative error below 2^(1/bins_per_octave) - 1 and memory does not
+    depend on the stream length. Values below min_value fall in bucket
+    0 and are reported as 0.
+    """
+    def __init__(self, bins_per_octave=32, min_value=1.0e-9, max_value=1.0e6):
+        self.scale = bins_per_octave
+        self.min_value = min_value
+        self.nbins = int(numpy.ceil(numpy.log2(max_value / min_value) 
+            * bins_per_octave)) + 2
+        self.counts = numpy.zeros(self.nbins, dtype=numpy.int64)
+        self.total = 0
+
+    def bucket(self, values):
+        values = numpy.asarray(values, dtype=numpy.float64)
+        small = values < self.min_value
+        values = numpy.maximum(values, self.min_value)
+        bucket = numpy.floor(numpy.log2(values / self.min_value) 
+            * self.scale).astype(numpy.int64) + 1
+        bucket[small] = 0
+        return numpy.minimum(bucket, self.nbins - 1)
+
+    def value(self, bucket):
+        """Return the geometric midpoint of bucket"""
+        if bucket == 0: return 0.0
+        return self.min_value * 2.0 ** ((bucket - 0.5) / self.scale)
+
+    def update(self, values):
+        """Count an array of values"""
+        self.counts += numpy.bincount(self.bucket(values), 
+            minlength=self.nbins)
+        self.total += len(values)
+
+    def quantile(self, q):
+        """Return the approximate q-quantile, 0 <= q <= 1"""
+        if self.total == 0: return 0.0
+        cum = numpy.cumsum(self.counts)
+        bucket = numpy.searchsorted(cum, max(q * self.total, 1))
+        return self.value(min(bucket, self.nbins - 1))
+
+__all__ = ["TopK", "LogHistogram"]
@@ -95,6 +95,24 @@ else:
 def timer2():
     return time.localtime(), timer()
 
+class LazyModule:
+    """Proxy of a module which is imported on first attribute access,
+    setup is called once right before the import"""
+    def __init__(self, name, setup=None):
+        self.__dict__["_name"] = name
+        self.__dict__["_setup"] = setup
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        if self._module is None:
+            if self._setup is not None: self._setup()
+            __import__(self._name)
+            self.__dict__["_module"] = sys.modules[self._name]
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
 def parse_datasize(size):
     size = size.upper()
     if size.isdigit():
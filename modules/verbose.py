@@ -20,11 +20,21 @@
 # modules/verbose.py
 # Verbose and user interaction
 #
+# Progress prints a dot per second until work is metered. Stages feed
+# row and byte counters through the module level stage_begin(),
+# stage_end(), set_total() and advance() calls, which go to the
+# Progress currently started. On a terminal the meter redraws a status
+# line with stage, rate and ETA, otherwise it emits a structured
+# key=value line to stderr every interval seconds.
+#
 
+import os
 import sys
 import threading
 import time
 
+from modules.utils import smart_datasize
+
 def stdout_flush(s):
     sys.stdout.write(s)
     sys.stdout.flush()
@@ -46,29 +56,179 @@ class Progress:
                 self.func()
                 self.stop.wait(self.delay)
             
-    def __init__(self, smsg="Start", emsg="End", delay=1, dot='.'):
+    def __init__(self, smsg="Start", emsg="End", delay=1, dot='.',
+        interval=10, tty=None):
         self.smsg = smsg
         self.emsg = emsg
         self.delay = delay
         self.dot = dot
+        self.interval = interval
+        if tty is None: tty = sys.stdout.isatty()
+        self.tty = tty
         self.stop = threading.Event()
-        self.tmr = self.Tick(self.stop, self.delay, self._print_dot)
+        self.tmr = self.Tick(self.stop, self.delay, self._tick)
+        
+        # meter state, stages is a stack of [name, total, rows, bytes, 
+        # start], counters of inner stages also count for outer ones
+        self.stages = []
+        self.metered = False
+        self.rows = 0
+        self.bytes = 0
+        self.msg = ""
+        self.status = ""
+        self.t_start = None
+        self.t_advance = None
+        self.t_report = None
 
     def _print_dot(self):
         stdout_flush(self.dot)
 
+    def _tick(self):
+        if not self.tty:
+            now = time.time()
+            if now - self.t_report >= self.interval:
+                self.t_report = now
+                stderr_flush(self.structured() + "\n")
+        elif self.metered:
+            status = self.status_line()
+            pad = " " * max(len(self.status) - len(status), 0)
+            self.status = status
+            stdout_flush("\r%s %s%s" % (self.msg, status, pad))
+        else:
+            self._print_dot()
+
     def start(self, msg=None):
+        global METER
         if msg is None: msg = self.smsg
+        self.msg = msg.rstrip("\n")
         stdout_flush(msg)
+        if not self.tty: stdout_flush("\n")
+        self.t_start = self.t_advance = self.t_report = time.time()
+        METER = self
         self.stop.clear()
         self.tmr.start()
     
+    def _finish(self):
+        global METER
+        self.stop.set()
+        if self.tmr.isAlive(): self.tmr.join()
+        if METER is self: METER = None
+        if self.tty and self.metered:
+            stdout_flush("\r%s%s\r%s" % (self.msg, 
+                " " * (len(self.status) + 1), self.msg))
+
     def cancel(self, msg=None):
+        self._finish()
         if msg is not None:
             stderr_flush(msg)
-        self.stop.set()
 
     def end(self, msg=None):
         if msg is None: msg = self.emsg
-        self.stop.set()
+        self._finish()
+        if not self.tty:
+            stderr_flush(self.structured("done") + "\n")
+            msg = msg.lstrip()
         stdout_flush(msg)
+
+    # meter
+    def stage_begin(self, name, total=None):
+        """Enter stage name, total is the number of bytes it will process
+        if known"""
+        self.stages.append([name, total, 0, 0, time.time()])
+        self.metered = True
+
+    def stage_end(self):
+        if len(self.stages) > 0: self.stages.pop()
+
+    def set_total(self, total):
+        if len(self.stages) > 0: self.stages[-1][1] = total
+
+    def advance(self, rows=0, nbytes=0):
+        self.rows += rows
+        self.bytes += nbytes
+        for s in self.stages:
+            s[2] += rows
+            s[3] += nbytes
+        self.t_advance = time.time()
+
+    def progress(self):
+        """Return (stage, rows, bytes, row rate, byte rate, fraction done,
+        ETA seconds) of the current stage, unknown values are None"""
+        now = time.time()
+        if len(self.stages) == 0:
+            name, total, rows, nbytes, start = \
+                None, None, self.rows, self.bytes, self.t_start
+        else:
+            name, total, rows, nbytes, start = self.stages[-1]
+        elapsed = max(now - start, 1.0e-6)
+        row_rate = rows / elapsed
+        byte_rate = nbytes / elapsed
+        done = eta = None
+        if total:
+            done = min(float(nbytes) / total, 1.0)
+            if byte_rate > 0: eta = max(total - nbytes, 0) / byte_rate
+        return name, rows, nbytes, row_rate, byte_rate, done, eta
+
+    def status_line(self):
+        name, rows, nbytes, row_rate, byte_rate, done, eta = \
+            self.progress()
+        items = []
+        if name is not None: items.append(name)
+        if done is not None: items.append("%3d%%" % (done * 100))
+        items.append("%d rows" % rows)
+        if nbytes > 0:
+            items.append("%.1f%s/s" % smart_datasize(byte_rate))
+        else:
+            items.append("%.0f rows/s" % row_rate)
+        if eta is not None:
+            items.append("ETA %d:%02d:%02d" % (eta / 3600, eta % 3600 / 60,
+                eta % 60))
+        return " ".join(items)
+
+    def structured(self, state="running"):
+        """Return key=value progress line for batch systems"""
+        name, rows, nbytes, row_rate, byte_rate, done, eta = \
+            self.progress()
+        now = time.time()
+        items = [("state", state), ("pid", os.getpid()),
+            ("stage", name or "-"), ("rows", rows), ("bytes", nbytes),
+            ("rows_per_sec", "%.1f" % row_rate),
+            ("bytes_per_sec", "%.1f" % byte_rate),
+            ("elapsed", "%.1f" % (now - self.t_start)),
+            ("idle", "%.1f" % (now - self.t_advance))]
+        if done is not None: items.append(("done", "%.4f" % done))
+        if eta is not None: items.append(("eta", "%.1f" % eta))
+        return "progress: " + " ".join(map(lambda (k,v):"%s=%s" % (k,v),
+            items))
+
+# the started Progress fed by the stage functions below
+METER = None
+
+def stage_begin(name, total=None):
+    if METER is not None: METER.stage_begin(name, total)
+
+def stage_end():
+    if METER is not None: METER.stage_end()
+
+def set_total(total):
+    if METER is not None: METER.set_total(total)
+
+def advance(rows=0, nbytes=0):
+    if METER is not None: METER.advance(rows, nbytes)
+
+def metered_lines(f, every=4096):
+    """Iterate lines of file f, feeding the started Progress with the
+    file size as total of the current stage"""
+    if METER is None:
+        for l in f: yield l
+        return
+    set_total(os.fstat(f.fileno()).st_size)
+    rows = nbytes = 0
+    for l in f:
+        yield l
+        rows += 1
+        nbytes += len(l)
+        if rows == every:
+            advance(rows, nbytes)
+            rows = nbytes = 0
+    advance(rows, nbytes)
@@ -0,0 +1,103 @@
+#############################################################################
+# ParaTrac: Scalable Tracking Tools for Parallel Applications
+# Copyright (C) 2009,2010  Nan Dun <dunnan@yl.is.s.u-tokyo.ac.jp>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#############################################################################
+
+#
+# tests/__init__.py
+# Unit tests, run from the top directory by
+#   python -m unittest discover -s tests -t .
+#
+
+import os
+import shutil
+import tempfile
+import unittest
+
+# networkx leaves its own top level version module behind on import,
+# load ours before any test pulls networkx in
+import version
+from modules.utils import SYSCALL
+from fs.data import Database
+
+BTIME = 1262304000.0
+
+class TraceTestCase(unittest.TestCase):
+    """Test case with a scratch directory and small hand-written traces"""
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix="paratrac-test-")
+        self.db = None
+
+    def tearDown(self):
+        if self.db is not None: self.db.close()
+        shutil.rmtree(self.tmpdir)
+
+    def trace(self, calls, procs=None, files=None):
+        """Write trace logs in ftrac format and import them, return the
+        Database
+
+        calls are (stamp, pid, syscall name, fid, res, elapsed, aux1,
+        aux2) with stamps in seconds from the first call, procs are
+        (pid, ppid, start, end, cmdline) in the same seconds, optionally
+        followed by user and system time, and default to children of pid
+        1 living through the trace, files map fid to path and default to
+        /mnt/file-<fid>.
+        """
+        path = self.tmpdir
+        f = open("%s/runtime.log" % path, "w")
+        for item, val in [("version", "0.4"), ("hostname", "localhost"),
+            ("platform", "Linux"), ("mountpoint", "/mnt"),
+            ("user", "paratrac"), ("uid", "1000"), ("iid", "0"),
+            ("pid", "1"), ("cmdline", "test"), ("start", "%d" % BTIME),
+            ("end", "%d" % (BTIME + 60)), ("clktck", "100"),
+            ("sysbtime", "%d" % (BTIME - 3600))]:
+            f.write("%s:%s\n" % (item, val))
+        f.close()
+
+        if files is None:
+            files = {}
+            for c in calls: files[c[3]] = "/mnt/file-%d" % c[3]
+        f = open("%s/file.log" % path, "w")
+        for fid in sorted(files.keys()):
+            f.write("%d:%s\n" % (fid, files[fid]))
+        f.close()
+
+        f = open("%s/sysc.log" % path, "w")
+        for stamp, pid, sc, fid, res, elapsed, aux1, aux2 in calls:
+            f.write("%f,%d,%d,%d,%d,%f,%d,%d\n" % (BTIME + stamp, pid,
+                SYSCALL[sc], fid, res, elapsed, aux1, aux2))
+        f.close()
+
+        if procs is None:
+            end = max(map(lambda c:c[0], calls)) + 1.0
+            procs = map(lambda p:(p, 1, 0.0, end, "/bin/p%d" % p),
+                sorted(set(map(lambda c:c[1], calls))))
+        ftask = open("%s/taskstat.log" % path, "w")
+        fproc = open("%s/proc.log" % path, "w")
+        for p in procs:
+            pid, ppid, start, end, cmd = p[:5]
+            utime, stime = (tuple(p[5:]) + (0.0, 0.0))[:2]
+            ftask.write("%d,%d,0,0,%f,%d,%d,%d,%s\n" % (pid, ppid,
+                BTIME + start, (end - start) * 1000000.0, utime * 1000000.0,
+                stime * 1000000.0, cmd))
+            fproc.write("1|#|%d|#|%d|#|0|#|0|#|0|#|0|#|%s|#|PATH=/bin\n"
+                % (pid, ppid, cmd))
+        ftask.close()
+        fproc.close()
+
+        self.db = Database("%s/trace.sqlite" % path)
+        self.db.import_logs()
+        return self.db
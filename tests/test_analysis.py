@@ -0,0 +1,179 @@
+#############################################################################
+# ParaTrac: Scalable Tracking Tools for Parallel Applications
+# Copyright (C) 2009,2010  Nan Dun <dunnan@yl.is.s.u-tokyo.ac.jp>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#############################################################################
+
+#
+# tests/test_analysis.py
+# Vectorized analysis routines on small known inputs
+#
+
+import unittest
+
+import numpy
+
+from fs import analysis
+
+def arrays(*cols):
+    return map(lambda c:numpy.array(c, dtype=numpy.int64), cols)
+
+class AccessPatternTest(unittest.TestCase):
+    def setUp(self):
+        # stream (1, 7): sequential, sequential, strided, strided,
+        # backward, random; stream (2, 7) starts off 0 so it is random
+        self.pid, self.fid, self.stamp, self.off, self.length = arrays(
+            [1, 2, 1, 1, 1, 1, 1],
+            [7, 7, 7, 7, 7, 7, 7],
+            [0, 1, 2, 3, 4, 5, 6],
+            [0, 5, 10, 30, 50, 20, 100],
+            [10, 8, 10, 10, 10, 10, 5])
+
+    def test_classes(self):
+        order, cls, start = analysis.access_pattern(self.pid, self.fid,
+            self.stamp, self.off, self.length)
+        self.assertEqual(order.tolist(), [0, 2, 3, 4, 5, 6, 1])
+        S, T, B, R = analysis.ACCESS_SEQUENTIAL, analysis.ACCESS_STRIDED, \
+            analysis.ACCESS_BACKWARD, analysis.ACCESS_RANDOM
+        self.assertEqual(cls.tolist(), [S, S, T, T, B, R, R])
+        self.assertEqual(start.tolist(),
+            [True, False, False, False, False, False, True])
+
+    def test_summary(self):
+        order, cls, start = analysis.access_pattern(self.pid, self.fid,
+            self.stamp, self.off, self.length)
+        rows = analysis.access_summary(cls, start, self.length[order])
+        self.assertEqual(rows, [
+            ("sequential", 2, 20, 1, 2.0, 2),
+            ("strided", 2, 20, 1, 2.0, 2),
+            ("backward", 1, 10, 1, 1.0, 1),
+            ("random", 2, 13, 2, 1.0, 1)])
+
+    def test_runs_split_at_streams(self):
+        cls = numpy.array([0, 0, 0, 3], dtype=numpy.int8)
+        start = numpy.array([True, False, True, False])
+        run_cls, run_len = analysis.access_runs(cls, start)
+        self.assertEqual(run_cls.tolist(), [0, 0, 3])
+        self.assertEqual(run_len.tolist(), [2, 1, 1])
+
+    def test_group_classes(self):
+        order, cls, start = analysis.access_pattern(self.pid, self.fid,
+            self.stamp, self.off, self.length)
+        pids, counts, nbytes = analysis.group_classes(self.pid[order], cls,
+            self.length[order])
+        self.assertEqual(pids.tolist(), [1, 2])
+        self.assertEqual(counts.tolist(), [[2, 2, 1, 1], [0, 0, 0, 1]])
+        self.assertEqual(nbytes.tolist(), [[20, 20, 10, 5], [0, 0, 0, 8]])
+
+class SessionIdTest(unittest.TestCase):
+    def test_open_close_pairs(self):
+        # open read close read | open close on one stream, then another
+        pid, fid = arrays([1, 1, 1, 1, 1, 1, 2], [3, 3, 3, 3, 3, 3, 3])
+        is_open = numpy.array([1, 0, 0, 0, 1, 0, 0], dtype=bool)
+        is_close = numpy.array([0, 0, 1, 0, 0, 1, 0], dtype=bool)
+        sid = analysis.session_ids(pid, fid, is_open, is_close)
+        self.assertEqual(sid.tolist(), [0, 0, 0, 1, 2, 2, 3])
+
+class SizeBucketTest(unittest.TestCase):
+    def test_buckets(self):
+        b = analysis.size_bucket([0, -1, 1, 2, 3, 4, 4095, 4096, 2 ** 60])
+        self.assertEqual(b.tolist(), [0, 0, 1, 2, 2, 3, 12, 13,
+            analysis.SIZE_BUCKETS - 1])
+        self.assertEqual(map(analysis.bucket_lower, [0, 1, 2, 13]),
+            [0, 1, 2, 4096])
+
+    def test_histogram(self):
+        keys, bucket = arrays([5, 3, 5, 5], [1, 2, 1, 13])
+        uniq, hist = analysis.bucket_histogram(keys, bucket)
+        self.assertEqual(uniq.tolist(), [3, 5])
+        self.assertEqual(hist.shape, (2, analysis.SIZE_BUCKETS))
+        self.assertEqual(numpy.flatnonzero(hist[0]).tolist(), [2])
+        self.assertEqual(hist[1][[1, 13]].tolist(), [2, 1])
+        self.assertEqual(hist.sum(), 4)
+
+class HeatmapTest(unittest.TestCase):
+    def test_rows(self):
+        R = analysis.HEATMAP_ROWS_PER_DECADE
+        rows = analysis.latency_row([0.0, 0.5e-7, 3.0e-7, 2.0, 1.0e5])
+        self.assertEqual(rows.tolist(), [0, 0, 2, 7 * R + 2,
+            analysis.HEATMAP_ROWS - 1])
+
+    def test_row_lower(self):
+        R = analysis.HEATMAP_ROWS_PER_DECADE
+        self.assertEqual(analysis.latency_row_lower(0), 0.0)
+        self.assertEqual(analysis.latency_row_lower(1), 1.0e-7)
+        self.assertAlmostEqual(analysis.latency_row_lower(R + 1), 1.0e-6)
+        # every row starts at or after the lower bound of its own row
+        lower = map(analysis.latency_row_lower, range(1, 20))
+        self.assertEqual(analysis.latency_row(map(lambda l:l * 1.01,
+            lower)).tolist(), range(1, 20))
+
+    def test_counts(self):
+        counts = analysis.heatmap([0, 1, 0], [0, 1, 0], [2, 2, 3], 2, 2)
+        self.assertEqual(counts.shape, (2, 2, analysis.HEATMAP_ROWS))
+        self.assertEqual(counts.sum(), 3)
+        self.assertEqual(zip(*numpy.nonzero(counts)),
+            [(0, 0, 2), (0, 0, 3), (1, 1, 2)])
+
+class ConcurrencyTest(unittest.TestCase):
+    def test_two_overlapping_calls(self):
+        times, level = analysis.concurrency(numpy.array([0.0, 2.0]),
+            numpy.array([4.0, 6.0]))
+        self.assertEqual(times.tolist(), [0.0, 2.0, 4.0, 6.0])
+        self.assertEqual(level.tolist(), [1, 2, 1, 0])
+
+    def test_end_before_start(self):
+        times, level = analysis.concurrency(numpy.array([0.0, 2.0]),
+            numpy.array([2.0, 4.0]))
+        self.assertEqual(level.max(), 1)
+
+    def test_groups(self):
+        keys = numpy.array([1, 1, 2])
+        uniq, peak, avg, busy = analysis.group_concurrency(keys,
+            numpy.array([0.0, 2.0, 0.0]), numpy.array([4.0, 6.0, 1.0]))
+        self.assertEqual(uniq.tolist(), [1, 2])
+        self.assertEqual(peak.tolist(), [2, 1])
+        self.assertEqual(avg.tolist(), [8.0 / 6, 1.0])
+        self.assertEqual(busy.tolist(), [1.0, 1.0])
+
+    def test_idle_gap(self):
+        uniq, peak, avg, busy = analysis.group_concurrency(
+            numpy.zeros(2, dtype=int), numpy.array([0.0, 3.0]),
+            numpy.array([1.0, 4.0]))
+        self.assertEqual((peak[0], avg[0], busy[0]), (1, 0.5, 0.5))
+
+    def test_step_maxima(self):
+        times = numpy.array([0.0, 1.0, 1.5, 4.0])
+        level = numpy.array([1, 3, 1, 0])
+        wstart, peak = analysis.step_maxima(times, level, 4)
+        self.assertEqual(wstart.tolist(), [0.0, 1.0, 2.0, 3.0])
+        self.assertEqual(peak.tolist(), [1, 3, 1, 1])
+
+class CoverageTest(unittest.TestCase):
+    def test_depths(self):
+        keys, lo, hi, depth = analysis.coverage(numpy.array([1, 1, 2, 1]),
+            numpy.array([0, 5, 0, 20]), numpy.array([10, 15, 4, 22]))
+        self.assertEqual(zip(keys.tolist(), lo.tolist(), hi.tolist(),
+            depth.tolist()), [(1, 0, 5, 1), (1, 5, 10, 2), (1, 10, 15, 1),
+            (1, 20, 22, 1), (2, 0, 4, 1)])
+
+    def test_touching(self):
+        keys, lo, hi, depth = analysis.coverage(numpy.zeros(2, dtype=int),
+            numpy.array([0, 4]), numpy.array([4, 8]))
+        self.assertEqual(zip(lo.tolist(), hi.tolist(), depth.tolist()),
+            [(0, 4, 1), (4, 8, 1)])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+#############################################################################
+# ParaTrac: Scalable Tracking Tools for Parallel Applications
+# Copyright (C) 2009,2010  Nan Dun <dunnan@yl.is.s.u-tokyo.ac.jp>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#############################################################################
+
+#
+# tests/test_cachesim.py
+# Cache policies on short access strings
+#
+
+import random
+import unittest
+
+import numpy
+
+from fs import cachesim
+from tests import TraceTestCase
+
+def hits(policy, size, keys):
+    access = cachesim.POLICIES[policy](size).access
+    return map(access, keys)
+
+class PolicyTest(unittest.TestCase):
+    def test_lru(self):
+        self.assertEqual(hits("LRU", 2, "abacba"),
+            [False, False, True, False, False, False])
+
+    def test_lfu(self):
+        # c evicts b, the least recent of the least frequent
+        self.assertEqual(hits("LFU", 2, "abacba"),
+            [False, False, True, False, False, True])
+
+    def test_clock(self):
+        self.assertEqual(hits("CLOCK", 2, "abacba"),
+            [False, False, True, False, False, False])
+
+    def test_scan(self):
+        # a is used twice, then a scan of b c d must not evict it
+        # from ARC and LFU
+        keys = "aabcda"
+        self.assertEqual(map(lambda p:sum(hits(p, 2, keys)),
+            ["LRU", "LFU", "ARC", "CLOCK"]), [1, 2, 2, 1])
+
+    def test_arc_lists(self):
+        arc = cachesim.ARCCache(2)
+        map(arc.access, "abacb")
+        # b came back from the ghost list b1 and grew the target of t1
+        self.assertEqual(arc.p, 1)
+        self.assertEqual(arc.t1.keys(), ["c"])
+        self.assertEqual(arc.t2.keys(), ["b"])
+        self.assertEqual(arc.b2.keys(), ["a"])
+
+    def test_capacity(self):
+        for p in cachesim.POLICIES.keys():
+            self.assertEqual(sum(hits(p, 3, "abcabcabc")), 6, p)
+            self.assertEqual(sum(hits(p, 1, "aabb")), 2, p)
+
+class CacheSimTest(TraceTestCase):
+    def test_run(self):
+        db = self.trace([
+            (0.0, 2, "open", 1, 0, 0.5, 0, 0),
+            (1.0, 2, "read", 1, 200, 0.25, 200, 4000),
+            (2.0, 2, "read", 2, 100, 0.125, 100, 0),
+            (3.0, 2, "read", 1, 100, 0.25, 100, 4100),
+            (4.0, 2, "close", 1, 0, 0.5, 0, 0)])
+        sim = cachesim.CacheSim(db, 4096)
+        keys, lat = zip(*sim.accesses("block"))[0:2]
+        # files are numbered 0 and 1 above the one bit of blocks 0 and 1
+        self.assertEqual(sim.shift, 1)
+        self.assertEqual(keys[0].tolist(), [0, 1, 2, 1])
+        self.assertEqual(sim.key_fids(keys[0]).tolist(), [1, 1, 2, 1])
+        self.assertEqual(lat[0].tolist(), [0.125, 0.125, 0.125, 0.25])
+        self.assertEqual(sim.sizes("block"), [1, 2, 3])
+        # close is not an access at file granularity
+        res = sim.run("file", ["LRU", "ARC"], [1, 2])
+        self.assertEqual(res["LRU"], [(1, 4, 1, 0.25, 0.25),
+            (2, 4, 2, 0.5, 0.5)])
+        self.assertEqual(res["ARC"], res["LRU"])
+        res = sim.run("block", ["LRU"], [1])
+        self.assertEqual(res["LRU"], [(1, 4, 0, 0.0, 0.0)])
+
+    def test_large_fids(self):
+        # fids beyond 2**23 used to overflow (fid << 40) keys
+        big = 1 << 30
+        db = self.trace([
+            (0.0, 2, "read", big, 10, 0.1, 10, 0),
+            (1.0, 2, "read", big + 1, 10, 0.1, 10, 0),
+            (2.0, 2, "read", big, 10, 0.1, 10, (1 << 40) - 10)])
+        sim = cachesim.CacheSim(db, 4096)
+        keys = numpy.concatenate(map(lambda a:a[0], sim.accesses("block")))
+        self.assertEqual(len(set(keys.tolist())), 3)
+        self.assertEqual(sim.key_fids(keys).tolist(), [big, big + 1, big])
+        self.assertEqual(sim.shift, 28)
+
+    def test_lru_by_stack_distance(self):
+        # LRU of every size from stack distances matches simulated caches
+        # over several chunks
+        rand = random.Random(5)
+        calls = map(lambda i:(i * 0.01, 2, "read", rand.randrange(1, 20),
+            10, rand.choice([0.25, 0.5, 1.0]), 10, 0), range(0, 300))
+        db = self.trace(calls)
+        db.FETCH_ROWS = 64
+        sim = cachesim.CacheSim(db, 4096)
+        res = sim.run("file", ["LRU", "CLOCK"], [1, 3, 8, 30])
+        fids = map(lambda c:c[3], calls)
+        for size, total, nhits, ratio, saved in res["LRU"]:
+            lru = cachesim.LRUCache(size)
+            h = map(lru.access, fids)
+            self.assertEqual((total, nhits), (300, sum(h)))
+            self.assertAlmostEqual(saved, sum(map(lambda (c, hit):
+                hit and c[5] or 0.0, zip(calls, h))))
+        for size, total, nhits, ratio, saved in res["CLOCK"]:
+            self.assertEqual(nhits, sum(hits("CLOCK", size, fids)))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,170 @@
+#############################################################################
+# ParaTrac: Scalable Tracking Tools for Parallel Applications
+# Copyright (C) 2009,2010  Nan Dun <dunnan@yl.is.s.u-tokyo.ac.jp>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#############################################################################
+
+#
+# tests/test_data.py
+# Derived tables of the trace database
+#
+
+import errno
+import unittest
+
+from modules.utils import SYSCALL
+from tests import TraceTestCase
+
+class SizeHistTest(TraceTestCase):
+    def test_sizehist(self):
+        db = self.trace([
+            (0.0, 2, "read", 1, 1, 0.001, 1, 0),
+            (1.0, 2, "read", 1, 4096, 0.001, 4096, 1),
+            (2.0, 3, "read", 2, 4096, 0.001, 4096, 0),
+            (3.0, 3, "write", 2, 100, 0.001, 100, 0)])
+        hists = db.sizehist_sel(SYSCALL["read"], "sysc")
+        self.assertEqual(len(hists), 1)
+        self.assertEqual(hists[0][1][[1, 13]].tolist(), [1, 2])
+        self.assertEqual(hists[0][1].sum(), 3)
+        files = dict(db.sizehist_sel(SYSCALL["read"], "file"))
+        self.assertEqual(sorted(files.keys()), [1, 2])
+        self.assertEqual(files[1][[1, 13]].tolist(), [1, 1])
+        self.assertEqual(files[2][13], 1)
+        procs = dict(db.sizehist_sel(SYSCALL["write"], "proc"))
+        self.assertEqual(procs.keys(), [3])
+        self.assertEqual(procs[3][7], 1)
+
+class SessionTest(TraceTestCase):
+    def test_sessions(self):
+        db = self.trace([
+            (0.0, 2, "lstat", 1, 0, 0.1, 0, 0),
+            (1.0, 2, "open", 1, 0, 0.5, 0, 0),
+            (1.5, 3, "creat", 2, 0, 0.25, 0, 0),
+            (2.0, 2, "read", 1, 10, 0.1, 10, 0),
+            (2.5, 3, "write", 2, 4, 0.1, 4, 0),
+            (3.0, 2, "read", 1, 10, 0.1, 10, 10),
+            (4.0, 2, "close", 1, 0, 0.1, 0, 0),
+            (5.0, 2, "write", 1, 5, 0.25, 5, 100),
+            (6.0, 3, "close", 2, 0, 0.1, 0, 0)])
+        ss = db.session_arrays("pid,fid,sysc,start,duration,closed,calls,"
+            "nread,rbytes,nwrite,wbytes,off_first,off_last")
+        rows = sorted(map(lambda s:tuple(s.tolist()), ss),
+            key=lambda r:(r[0], r[1], r[3]))
+        # sessions run from the start of their first call to the stamp
+        # of their last one, a write after close opens an unclosed one
+        self.assertEqual(rows, [
+            (2, 1, SYSCALL["open"], 0.5, 3.5, 1, 4, 2, 20, 0, 0, 0, 20),
+            (2, 1, 0, 4.75, 0.25, 0, 1, 0, 0, 1, 5, 100, 105),
+            (3, 2, SYSCALL["creat"], 1.25, 4.75, 1, 3, 0, 0, 1, 4, 0, 4)])
+
+class ErrStatTest(TraceTestCase):
+    def test_errno_groups(self):
+        db = self.trace([
+            (0.0, 2, "lstat", 1, -errno.ENOENT, 0.25, 0, 0),
+            (1.0, 2, "lstat", 1, 0, 0.25, 0, 0),
+            (2.0, 3, "open", 2, -errno.EACCES, 0.125, 0, 0),
+            (3.0, 3, "lstat", 1, -errno.ENOENT, 0.5, 0, 0),
+            (4.0, 3, "read", 2, 10, 1.0, 10, 0)])
+        LSTAT, OPEN = SYSCALL["lstat"], SYSCALL["open"]
+        self.assertEqual(db.errstat_sel("sysc"), [
+            (LSTAT, 0, errno.ENOENT, 2, 0.75),
+            (OPEN, 0, errno.EACCES, 1, 0.125)])
+        self.assertEqual(db.errstat_sel("file"), [
+            (LSTAT, 1, errno.ENOENT, 2, 0.75),
+            (OPEN, 2, errno.EACCES, 1, 0.125)])
+        self.assertEqual(db.errstat_sel("proc"), [
+            (LSTAT, 3, errno.ENOENT, 1, 0.5),
+            (LSTAT, 2, errno.ENOENT, 1, 0.25),
+            (OPEN, 3, errno.EACCES, 1, 0.125)])
+
+class ScopeTest(TraceTestCase):
+    def setUp(self):
+        TraceTestCase.setUp(self)
+        # 2 forks 3 which forks 4, 5 is a sibling of 2; calls start at
+        # 0.0, 0.5, 1.0, 3.5, 4.5 and 7.5
+        self.trace([
+            (0.0, 2, "lstat", 1, 0, 0.0, 0, 0),
+            (1.0, 2, "read", 1, 10, 0.5, 10, 0),
+            (3.0, 3, "read", 1, 10, 2.0, 10, 10),
+            (4.0, 4, "read", 2, 10, 0.5, 10, 0),
+            (5.0, 3, "write", 2, 10, 0.5, 10, 10),
+            (8.0, 5, "read", 3, 10, 0.5, 10, 0)],
+            [(2, 1, 0.0, 10.0, "/bin/a"), (3, 2, 2.0, 6.0, "/bin/b"),
+             (4, 3, 3.0, 5.0, "/bin/c"), (5, 1, 7.0, 10.0, "/bin/d")])
+
+    def calls(self, *scope):
+        self.db.set_scope(*scope)
+        return sorted(self.db.sysc_arrays("stamp,pid").tolist())
+
+    def test_max_elapsed(self):
+        self.assertEqual(self.db.sysc_max_elapsed(), 2.0)
+        self.assertEqual(float(self.db.runtime_get_value(
+            "sysc_maxelapsed")), 2.0)
+
+    def test_time(self):
+        # calls are in scope by their start, the read of 3 completes
+        # inside [2, 5) but starts before it
+        self.assertEqual(self.calls(2.0, 5.0), [(4.0, 4), (5.0, 3)])
+        self.assertEqual(self.calls(None, 1.0), [(0.0, 2), (1.0, 2)])
+        self.assertEqual(self.calls(4.5, None), [(5.0, 3), (8.0, 5)])
+        self.assertEqual(self.db.scope, (4.5, None, None))
+        self.assertEqual(len(self.calls()), 6)
+        self.assertFalse(self.db.scoped())
+
+    def test_subtree(self):
+        self.assertEqual(self.calls(None, None, 3),
+            [(3.0, 3), (4.0, 4), (5.0, 3)])
+        self.assertEqual(self.calls(None, None, 5), [(8.0, 5)])
+        self.assertEqual(self.calls(None, None, 99), [])
+        self.assertEqual(self.calls(3.0, None, 2), [(4.0, 4), (5.0, 3)])
+
+    def test_procs(self):
+        self.db.set_scope(2.0, 5.0)
+        self.assertEqual(sorted(self.db.proc_sel("pid")), [(2,), (3,), (4,)])
+        self.db.set_scope(None, None, 3)
+        self.assertEqual(sorted(self.db.proc_sel("pid")), [(3,), (4,)])
+
+    def test_helpers(self):
+        # per process helpers see only the scope too
+        db = self.db
+        self.assertEqual(db.sysc_stat("elapsed", sysc="read")[:2],
+            (3.5, 0.875))
+        self.assertEqual(db.proc_throughput(0, 3, 2, "write"), (0.5, 10))
+        db.set_scope(None, None, 3)
+        self.assertEqual(db.sysc_stat("elapsed", sysc="read")[:2],
+            (2.5, 1.25))
+        self.assertEqual(sorted(db.procs(sysc="read")), [3, 4])
+        self.assertEqual(db.proc_cmdline(0, 4, False), "/bin/c")
+        self.assertTrue(db.proc_cmdline(0, 5) is None)
+        self.assertEqual(db.proc_io_sum_elapsed_and_bytes(SYSCALL["read"],
+            0, 4, 2), (0.5, 10))
+        db.set_scope(None, 4.0)
+        self.assertTrue(db.proc_throughput(0, 3, 2, "write") is None)
+        self.assertEqual(db.proc_throughput(0, 3, 1, "read"), (2.0, 10))
+
+    def test_derived(self):
+        # derived tables follow the scope and come back when it is lifted
+        nreads = lambda:self.db.sizehist_sel(SYSCALL["read"],
+            "sysc")[0][1].sum()
+        self.assertEqual(nreads(), 4)
+        self.db.set_scope(None, None, 3)
+        self.assertEqual(nreads(), 2)
+        self.db.set_scope(7.0, None)
+        self.assertEqual(nreads(), 1)
+        self.db.set_scope()
+        self.assertEqual(nreads(), 4)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+#############################################################################
+# ParaTrac: Scalable Tracking Tools for Parallel Applications
+# Copyright (C) 2009,2010  Nan Dun <dunnan@yl.is.s.u-tokyo.ac.jp>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#############################################################################
+
+#
+# tests/test_dataflow.py
+# Byte range ownership and producer to consumer flows
+#
+
+import time
+import random
+import unittest
+
+from fs import dataflow
+from tests import TraceTestCase
+
+def ranges(m):
+    return m.ranges()
+
+class IntervalMapTest(unittest.TestCase):
+    def test_overwrite(self):
+        m = dataflow.IntervalMap()
+        m.assign(0, 10, "a")
+        m.assign(20, 30, "b")
+        m.assign(5, 25, "c")
+        self.assertEqual(ranges(m), [(0, 5, "a"), (5, 25, "c"),
+            (25, 30, "b")])
+        self.assertEqual(m.lookup(0, 30), [(5, "a"), (20, "c"), (5, "b")])
+        self.assertEqual(m.lookup(26, 40), [(4, "b")])
+        self.assertEqual(m.lookup(30, 40), [])
+
+    def test_split_and_merge(self):
+        m = dataflow.IntervalMap()
+        m.assign(0, 100, "a")
+        m.assign(40, 60, "b")
+        self.assertEqual(ranges(m), [(0, 40, "a"), (40, 60, "b"),
+            (60, 100, "a")])
+        m.assign(40, 60, "a")
+        self.assertEqual(ranges(m), [(0, 100, "a")])
+
+    def test_sequential_writes_merge(self):
+        m = dataflow.IntervalMap()
+        for off in range(0, 1000, 10): m.assign(off, off + 10, "a")
+        m.assign(2000, 2010, "a")
+        m.assign(1990, 2000, "a")
+        self.assertEqual(ranges(m), [(0, 1000, "a"), (1990, 2010, "a")])
+
+    def test_against_bytes(self):
+        rand = random.Random(4)
+        m = dataflow.IntervalMap()
+        owner = [None] * 200
+        for i in range(0, 500):
+            start = rand.randrange(200)
+            end = min(start + rand.randint(1, 40), 200)
+            who = rand.randrange(4)
+            m.assign(start, end, who)
+            owner[start:end] = [who] * (end - start)
+        # ranges are disjoint, sorted and maximal
+        for (s0, e0, o0), (s1, e1, o1) in zip(ranges(m), ranges(m)[1:]):
+            self.assertTrue(e0 <= s1)
+            self.assertTrue(e0 < s1 or o0 != o1)
+        for start, end, who in ranges(m):
+            self.assertEqual(owner[start:end], [who] * (end - start))
+        self.assertEqual(sum(map(lambda r:r[1] - r[0], ranges(m))),
+            200 - owner.count(None))
+
+    def test_blocks(self):
+        # small blocks make writes split, merge and span blocks
+        rand = random.Random(7)
+        m = dataflow.IntervalMap()
+        m.BLOCK = 4
+        owner = [None] * 1000
+        for i in range(0, 3000):
+            start = rand.randrange(1000)
+            end = min(start + rand.choice([1, 3, 10, 200]), 1000)
+            who = rand.randrange(3)
+            m.assign(start, end, who)
+            owner[start:end] = [who] * (end - start)
+            if i % 100 == 0:
+                self.assertTrue(max(map(lambda b:len(b[0]), m.blocks)) <=
+                    2 * m.BLOCK)
+                self.assertEqual(m.bends, map(lambda b:b[1][-1], m.blocks))
+        rs = ranges(m)
+        self.assertEqual(len(m), len(rs))
+        self.assertTrue(len(m.blocks) > 1)
+        for start, end, who in rs:
+            self.assertEqual(owner[start:end], [who] * (end - start))
+        self.assertEqual(sum(map(lambda r:r[1] - r[0], rs)),
+            1000 - owner.count(None))
+        self.assertEqual(m.lookup(0, 1000), map(lambda r:(r[1] - r[0],
+            r[2]), rs))
+
+    def test_scaling(self):
+        # interleaved random writes cost about the same per write however
+        # many ranges the file has
+        def run(n):
+            rand = random.Random(1)
+            m = dataflow.IntervalMap()
+            t = time.time()
+            for i in xrange(n):
+                off = rand.randrange(n * 100)
+                m.assign(off, off + 10, i % 3)
+            return time.time() - t
+        small = min(run(10000), run(10000))
+        self.assertTrue(run(80000) < 20 * small)
+
+class DataFlowTest(TraceTestCase):
+    def test_flows(self):
+        db = self.trace([
+            (0.0, 2, "write", 1, 100, 0.1, 100, 0),
+            (1.0, 3, "write", 1, 10, 0.1, 10, 50),
+            (1.5, 2, "write", 2, 10, 0.1, 10, 0),
+            (2.0, 4, "read", 1, 120, 0.1, 120, 0),
+            (3.0, 4, "unlink", 1, 0, 0.1, 0, 0),
+            (4.0, 4, "read", 1, 10, 0.1, 10, 0),
+            # a short read moves res bytes only
+            (5.0, 4, "read", 2, 4, 0.1, 10, 0)])
+        flows, external, nranges = dataflow.DataFlow(db).run()
+        self.assertEqual(flows, {(2, 4, 1):90, (3, 4, 1):10, (2, 4, 2):4})
+        self.assertEqual(external, {1:30})
+        self.assertEqual(nranges, 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+#############################################################################
+# ParaTrac: Scalable Tracking Tools for Parallel Applications
+# Copyright (C) 2009,2010  Nan Dun <dunnan@yl.is.s.u-tokyo.ac.jp>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#############################################################################
+
+#
+# tests/test_plot.py
+# Workflow graph analysis, needs networkx and matplotlib
+#
+
+import unittest
+
+from tests import TraceTestCase
+
+# plotting backends are loaded lazily, try them once here
+try:
+    from fs import plot
+    plot.nx.DiGraph
+    plot.pyplot.clf
+except ImportError:
+    plot = None
+
+@unittest.skipIf(plot is None, "networkx or matplotlib not usable")
+class CriticalPathTest(TraceTestCase):
+    def test_producer_consumer(self):
+        # p2 writes f1 in 1 second of its 10, p3 then reads it in 0.5
+        # seconds of its 4, both forked by the untraced p1
+        self.trace([
+            (0.0, 2, "write", 1, 10, 0.5, 10, 0),
+            (1.0, 2, "write", 1, 10, 0.5, 10, 10),
+            (3.0, 3, "read", 1, 20, 0.5, 20, 0)],
+            [(2, 1, 0.0, 10.0, "/bin/w"), (3, 1, 2.0, 6.0, "/bin/r")])
+        g = plot.WorkflowDAG(self.db)
+        self.db = None
+        path, makespan, io_time, slack = g.critical_path()
+        self.assertEqual(path, ["p1", "p2", "f1", "p3"])
+        self.assertAlmostEqual(makespan, 14.0)
+        self.assertAlmostEqual(io_time, 1.5)
+        self.assertAlmostEqual(slack["p2"], 0.0)
+        self.assertAlmostEqual(slack["p3"], 0.0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+#############################################################################
+# ParaTrac: Scalable Tracking Tools for Parallel Applications
+# Copyright (C) 2009,2010  Nan Dun <dunnan@yl.is.s.u-tokyo.ac.jp>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#############################################################################
+
+#
+# tests/test_proctree.py
+# Array-based process tree on a small known tree
+#
+
+import unittest
+
+from fs.proctree import ProcessTree
+from tests import TraceTestCase
+
+# 10 forks 11 and 12, 11 forks 13 and 14, 20 is a second root as its
+# parent 1 is not traced
+PIDS = [13, 10, 11, 12, 14, 20]
+PPIDS = [11, 1, 10, 10, 11, 1]
+
+class ProcessTreeTest(unittest.TestCase):
+    def setUp(self):
+        self.tree = ProcessTree(PIDS, PPIDS)
+
+    def pids(self, nodes):
+        return map(lambda k:int(self.tree.pids[k]), nodes)
+
+    def test_structure(self):
+        t = self.tree
+        self.assertEqual(len(t), 6)
+        self.assertEqual(t.pids.tolist(), [10, 11, 12, 13, 14, 20])
+        self.assertEqual(self.pids(t.roots), [10, 20])
+        self.assertEqual((t.index(13), t.index(99)), (3, -1))
+        self.assertEqual(self.pids(t.order()), [10, 20, 11, 12, 13, 14])
+        self.assertEqual(t.depth().tolist(), [0, 1, 1, 2, 2, 0])
+
+    def test_subtree(self):
+        t = self.tree
+        self.assertEqual(t.subtree_size().tolist(), [5, 3, 1, 1, 1, 1])
+        self.assertEqual(t.subtree_sum([1, 2, 3, 4, 5, 6]).tolist(),
+            [15.0, 11.0, 3.0, 4.0, 5.0, 6.0])
+
+    def test_euler(self):
+        enter, exit = self.tree.euler()
+        # depth-first order is 10 11 13 14 12 20
+        self.assertEqual(enter.tolist(), [0, 1, 4, 2, 3, 5])
+        self.assertEqual(exit.tolist(), [4, 3, 4, 2, 3, 5])
+
+    def test_fanout(self):
+        fan, count = self.tree.fanout()
+        self.assertEqual(zip(fan.tolist(), count.tolist()),
+            [(0, 4), (2, 2)])
+
+    def test_longest_chain(self):
+        total, chain = self.tree.longest_chain([1, 2, 5, 1, 3, 4])
+        # 10-11-14 and 10-12 both weigh 6, ties go to the smaller pid
+        self.assertEqual((total, self.pids(chain)), (6.0, [10, 11, 14]))
+
+    def test_cycle(self):
+        # 30 and 31 are each other's parent, as from pid reuse
+        t = ProcessTree(PIDS + [30, 31], PPIDS + [31, 30])
+        self.assertEqual(self.pids(t.roots), [10, 20])
+        self.assertEqual(t.depth().tolist()[-2:], [-1, -1])
+        self.assertEqual(t.euler()[0].tolist()[-2:], [-1, -1])
+        self.assertEqual(len(t.order()), 6)
+
+    def test_duplicate_pid(self):
+        t = ProcessTree([2, 3, 2], [1, 2, 3])
+        self.assertEqual(t.parent.tolist(), [-1, 0])
+
+    def test_empty(self):
+        t = ProcessTree([], [])
+        self.assertEqual((len(t), len(t.order())), (0, 0))
+        self.assertEqual(t.longest_chain([]), (0.0, []))
+
+class ProcTreeTableTest(TraceTestCase):
+    def test_matches_subtree(self):
+        procs = map(lambda p:(p[0], p[1], 0.0, 10.0, "/bin/p%d" % p[0]),
+            zip(PIDS, PPIDS))
+        db = self.trace([(0.0, 10, "lstat", 1, 0, 0.1, 0, 0)], procs)
+        db.proctree_build()
+        db.cur.execute("SELECT pid,enter,exit FROM proctree")
+        rows = db.cur.fetchall()
+        self.assertEqual(sorted(rows), [(10, 0, 4), (11, 1, 3), (12, 4, 4),
+            (13, 2, 2), (14, 3, 3), (20, 5, 5)])
+        # the enter range of every process holds the subtree found by
+        # walking its children
+        for pid, enter, exit in rows:
+            inside = map(lambda r:r[0], filter(lambda r:enter <= r[1] <= exit,
+                rows))
+            self.assertEqual(sorted(inside), sorted(db.proc_subtree(pid)))
+
+if __name__ == "__main__":
+    unittest.main()
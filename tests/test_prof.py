@@ -0,0 +1,64 @@
+#############################################################################
+# ParaTrac: Scalable Tracking Tools for Parallel Applications
+# Copyright (C) 2009,2010  Nan Dun <dunnan@yl.is.s.u-tokyo.ac.jp>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#############################################################################
+
+#
+# tests/test_prof.py
+# Per-stage profiling
+#
+
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from modules import prof
+
+class ProfilerTest(unittest.TestCase):
+    def test_disabled_records_nothing(self):
+        p = prof.Profiler()
+        p.begin("a")
+        p.end(5)
+        self.assertEqual(p.stages, [])
+
+    def test_nested_stages(self):
+        p = prof.Profiler()
+        p.enabled = True
+        p.begin("outer")
+        p.begin("inner")
+        p.end(7)
+        p.begin("open")
+        p.end(3)
+        self.assertEqual(map(lambda s:(s["name"], s["depth"], s["rows"]),
+            p.stages), [("outer", 0, None), ("inner", 1, 7), ("open", 1, 3)])
+        self.assertTrue(p.stages[1]["wall"] >= 0.0)
+        self.assertFalse(p.stages[0].has_key("wall"))
+        # only closed stages are saved
+        tmpdir = tempfile.mkdtemp(prefix="paratrac-test-")
+        try:
+            path = os.path.join(tmpdir, "prof.json")
+            p.save(path)
+            stages = json.load(open(path))["stages"]
+        finally:
+            shutil.rmtree(tmpdir)
+        self.assertEqual(map(lambda s:s["name"], stages), ["inner", "open"])
+        p.end(10)
+        self.assertEqual(p.stages[0]["rows"], 10)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+#############################################################################
+# ParaTrac: Scalable Tracking Tools for Parallel Applications
+# Copyright (C) 2009,2010  Nan Dun <dunnan@yl.is.s.u-tokyo.ac.jp>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#############################################################################
+
+#
+# tests/test_readahead.py
+# Readahead policies on short read streams
+#
+
+import random
+import unittest
+
+from modules.utils import KB
+from fs import readahead
+from tests import TraceTestCase
+
+class ReadaheadTest(unittest.TestCase):
+    def test_fixed(self):
+        ra = readahead.FixedReadahead(8)
+        self.assertEqual(map(lambda r:ra.read(*r),
+            [(0, 4), (4, 4), (8, 4), (20, 4)]), [0, 0, 4, 0])
+        ra.close()
+        # the random read drops the window [12, 20)
+        self.assertEqual((ra.prefetched, ra.wasted), (12, 8))
+
+    def test_doubling(self):
+        ra = readahead.DoublingReadahead(4, 16)
+        self.assertEqual(map(lambda o:ra.read(o, 4), range(0, 20, 4)),
+            [0, 0, 4, 4, 4])
+        self.assertEqual(ra.size, 16)
+        ra.close()
+        self.assertEqual((ra.prefetched, ra.wasted), (28, 16))
+
+    def test_linux_sizes(self):
+        ra = readahead.LinuxReadahead(128 * KB)
+        self.assertEqual(map(ra.init_size, [1, 4 * KB, 16 * KB, 200 * KB]),
+            [16 * KB, 16 * KB, 32 * KB, 128 * KB])
+        ra.size = 4 * KB
+        self.assertEqual(ra.next_size(), 16 * KB)
+        ra.size = 16 * KB
+        self.assertEqual(ra.next_size(), 32 * KB)
+
+    def test_linux_stream(self):
+        ra = readahead.LinuxReadahead(128 * KB)
+        # a read at 0 starts a window of 16K, the second read enters its
+        # async part and issues the next 32K
+        self.assertEqual(ra.read(0, 4 * KB), 0)
+        self.assertEqual((ra.start, ra.end), (4 * KB, 16 * KB))
+        self.assertEqual(ra.read(4 * KB, 4 * KB), 4 * KB)
+        self.assertEqual((ra.start, ra.end), (8 * KB, 48 * KB))
+
+    def test_bytes_accounted(self):
+        # every prefetched byte is read or wasted
+        rand = random.Random(3)
+        for name, klass in readahead.POLICIES.items():
+            ra = klass()
+            off = 0
+            hit = 0
+            for i in range(0, 2000):
+                if rand.random() < 0.1: off = rand.randrange(1024) * 4 * KB
+                length = rand.choice([512, 4 * KB, 64 * KB])
+                hit += ra.read(off, length)
+                off += length
+            ra.close()
+            self.assertEqual(ra.prefetched, hit + ra.wasted, name)
+
+class ReadaheadSimTest(TraceTestCase):
+    def test_run(self):
+        db = self.trace([
+            (0.0, 2, "read", 1, 4, 0.5, 4, 0),
+            (1.0, 2, "read", 1, 4, 0.5, 4, 4),
+            (2.0, 3, "read", 1, 4, 0.5, 4, 0),
+            (3.0, 2, "read", 1, 4, 0.5, 4, 8),
+            (4.0, 2, "read", 1, 0, 0.5, 0, 12),
+            (5.0, 2, "read", 1, 4, 0.5, 4, 20)])
+        res = readahead.ReadaheadSim(db).run([("fixed",
+            readahead.FixedReadahead, {"window":8})])
+        # pid 3 is a stream of its own, empty reads are skipped
+        self.assertEqual(res, [("fixed", 5, 20, 12, 1, 4, 8, 0.5)])
+
+if __name__ == "__main__":
+    unittest.main()
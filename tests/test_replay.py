@@ -0,0 +1,127 @@
+#############################################################################
+# ParaTrac: Scalable Tracking Tools for Parallel Applications
+# Copyright (C) 2009,2010  Nan Dun <dunnan@yl.is.s.u-tokyo.ac.jp>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#############################################################################
+
+#
+# tests/test_replay.py
+# Replay of a small trace into a scratch directory
+#
+
+import os
+import json
+import errno
+import unittest
+import StringIO
+
+from fs import replay
+from tests import TraceTestCase
+
+class ReplayTest(TraceTestCase):
+    def setUp(self):
+        TraceTestCase.setUp(self)
+        # file 1 is read before being written, file 2 is written from
+        # scratch, file 3 is only looked up, mkdir is not replayed
+        self.trace([
+            (0.00, 2, "read", 1, 10, 0.001, 10, 0),
+            (0.02, 2, "write", 2, 20, 0.001, 20, 0),
+            (0.04, 3, "open", 1, 0, 0.001, 0, 0),
+            (0.06, 3, "read", 1, 5, 0.001, 5, 10),
+            (0.08, 2, "close", 2, 0, 0.001, 0, 0),
+            (0.10, 3, "lstat", 3, 0, 0.001, 0, 0),
+            (0.12, 3, "mkdir", 4, 0, 0.001, 0, 0)])
+        self.target = "%s/target" % self.tmpdir
+
+    def test_target_path(self):
+        r = replay.Replayer(self.db, self.target)
+        self.assertEqual(r.target_path("/mnt/a/b", "/mnt/"),
+            "%s/a/b" % self.target)
+        self.assertEqual(r.target_path("/other/../x", "/mnt"),
+            "%s/x" % self.target)
+
+    def test_prepare(self):
+        r = replay.Replayer(self.db, self.target)
+        self.assertEqual(r.workers, 2)
+        self.assertEqual(r.prepare(), 2)
+        self.assertEqual(os.path.getsize("%s/file-1" % self.target), 15)
+        self.assertEqual(os.path.getsize("%s/file-3" % self.target), 0)
+        self.assertFalse(os.path.exists("%s/file-2" % self.target))
+
+    def test_run(self):
+        res = replay.Replayer(self.db, self.target).run()
+        self.assertEqual((res["calls"], res["replayed"], res["procs"]),
+            (7, 6, 2))
+        self.assertEqual((res["read_bytes"], res["written_bytes"]), (15, 20))
+        self.assertEqual(sorted(map(lambda s:(s["sysc"], s["calls"],
+            s["errors"]), res["sysc"])), [("close", 1, 0), ("lstat", 1, 0),
+            ("open", 1, 0), ("read", 2, 0), ("write", 1, 0)])
+        self.assertEqual(os.path.getsize("%s/file-2" % self.target), 20)
+
+    def test_failed_calls(self):
+        # a failed read of a missing file and a failed write are skipped,
+        # opening the missing file does not create it
+        self.db.close()
+        self.trace([
+            (0.0, 2, "open", 5, -errno.ENOENT, 0.001, 0, 0),
+            (0.1, 2, "read", 5, -errno.ENOENT, 0.001, 10, 0),
+            (0.2, 2, "write", 6, -errno.ENOSPC, 0.001, 10, 0),
+            (0.3, 3, "read", 7, 10, 0.001, 10, 0),
+            (0.4, 3, "unlink", 7, 0, 0.001, 0, 0),
+            (0.5, 3, "open", 7, 0, 0.001, 0, 0)])
+        res = replay.Replayer(self.db, self.target).run()
+        self.assertEqual((res["calls"], res["failed"], res["replayed"]),
+            (6, 3, 3))
+        self.assertEqual(sorted(os.listdir(self.target)), [])
+        # the open after unlink fails as the file is gone
+        self.assertEqual(map(lambda s:(s["sysc"], s["errors"]),
+            filter(lambda s:s["sysc"] == "open", res["sysc"])),
+            [("open", 1)])
+
+    def test_worker_failure(self):
+        # a worker dying on an unexpected error must not block the feed
+        def issue(call): raise RuntimeError("boom")
+        r = replay.Replayer(self.db, self.target, workers=1)
+        r.BATCH_SIZE = 1
+        r.QUEUE_SIZE = 1
+        orig = replay.ReplayWorker.issue
+        replay.ReplayWorker.issue = lambda self, call:issue(call)
+        try: res = r.run()
+        finally: replay.ReplayWorker.issue = orig
+        self.assertEqual(res["worker_failures"], ["RuntimeError: boom"])
+        self.assertEqual(res["replayed"], 0)
+        out = StringIO.StringIO()
+        replay.summary(res, out)
+        self.assertTrue("worker failed: RuntimeError: boom" in
+            out.getvalue())
+
+    def test_timed(self):
+        res = replay.Replayer(self.db, self.target, "timed", 1).run()
+        self.assertEqual(res["workers"], 1)
+        self.assertTrue(res["elapsed"] >= 0.12)
+
+    def test_summary_and_save(self):
+        res = replay.Replayer(self.db, self.target).run()
+        out = StringIO.StringIO()
+        replay.summary(res, out)
+        self.assertTrue(out.getvalue().startswith(
+            "replayed 6 of 7 calls of 2 processes"))
+        replay.save(res, "%s/replay.json" % self.tmpdir)
+        f = open("%s/replay.json" % self.tmpdir)
+        self.assertEqual(json.load(f)["written_bytes"], 20)
+        f.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,270 @@
+#############################################################################
+# ParaTrac: Scalable Tracking Tools for Parallel Applications
+# Copyright (C) 2009,2010  Nan Dun <dunnan@yl.is.s.u-tokyo.ac.jp>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#############################################################################
+
+#
+# tests/test_report.py
+# Report statistics over small hand-written traces
+#
+
+import unittest
+
+import os
+import errno
+
+import numpy
+
+from fs.report import Report, HTMLReport
+from tests import TraceTestCase
+
+class ReportTest(TraceTestCase):
+    def report(self, calls, procs=None, start=None, end=None, pid=None,
+        klass=Report, groups=None):
+        self.trace(calls, procs)
+        self.db.close()
+        self.db = None
+        return klass("%s/trace.sqlite" % self.tmpdir, False, start, end,
+            pid, groups)
+
+    def test_html_without_figures(self):
+        r = self.report([
+            (0.0, 2, "open", 1, 0, 0.001, 0, 0),
+            (1.0, 2, "read", 1, 10, 0.001, 10, 0),
+            (2.0, 3, "write", 2, 10, 0.001, 10, 0),
+            (3.0, 2, "close", 1, 0, 0.001, 0, 0)], klass=HTMLReport)
+        self.assertTrue(r.plot is None)
+        r.write()
+        rdir = "%s/report" % self.tmpdir
+        self.assertTrue(os.path.exists("%s/index.html" % rdir))
+        self.assertEqual(os.listdir("%s/figures" % rdir), [])
+
+    def test_access_stats(self):
+        r = self.report([
+            (0.0, 2, "read", 1, 10, 0.001, 10, 0),
+            (1.0, 2, "read", 1, 10, 0.001, 10, 10),
+            (2.0, 2, "read", 1, 10, 0.001, 10, 0),
+            (3.0, 2, "write", 2, 10, 0.001, 10, 40)])
+        stats, files, procs = r.access_stats()
+        self.assertEqual(stats, [
+            ("read", "sequential", 2, 20, 1, 2.0, 2),
+            ("read", "strided", 0, 0, 0, 0.0, 0),
+            ("read", "backward", 1, 10, 1, 1.0, 1),
+            ("read", "random", 0, 0, 0, 0.0, 0),
+            ("write", "sequential", 0, 0, 0, 0.0, 0),
+            ("write", "strided", 0, 0, 0, 0.0, 0),
+            ("write", "backward", 0, 0, 0, 0.0, 0),
+            ("write", "random", 1, 10, 1, 1.0, 1)])
+        self.assertEqual(map(lambda f:(f[0], f[1], f[2].tolist()), files),
+            [("read", 1, [2, 0, 1, 0]), ("write", 2, [0, 0, 0, 1])])
+
+    def test_hotspot_stats(self):
+        r = self.report([
+            (0.0, 2, "open", 1, 0, 0.5, 0, 0),
+            (1.0, 2, "read", 1, 100, 0.25, 100, 0),
+            (2.0, 3, "write", 2, 300, 0.125, 300, 0),
+            (3.0, 3, "read", 1, 50, 0.125, 50, 100)])
+        tops = r.hotspot_stats()
+        self.assertEqual(tops[("file", "bytes")].top(2),
+            [(2, 300, 0), (1, 150, 0)])
+        self.assertEqual(tops[("file", "calls")].top(1), [(1, 3, 0)])
+        self.assertEqual(tops[("proc", "latency")].top(2),
+            [(2, 0.75, 0), (3, 0.25, 0)])
+
+    def test_outlier_stats(self):
+        calls = map(lambda i:(float(i), 2, "read", 1, 10, 0.001, 10, 0),
+            range(0, 19))
+        calls.append((19.0, 3, "read", 2, 10, 1.0, 10, 0))
+        r = self.report(calls)
+        stats, outliers, width, wcounts = r.outlier_stats(windows=4)
+        self.assertEqual(len(stats), 1)
+        sc, count, median, mad, thresh, n = stats[0]
+        self.assertEqual((sc, count, n), ("read", 20, 1))
+        self.assertTrue(0.001 <= thresh < 0.01)
+        self.assertEqual(len(outliers), 1)
+        self.assertEqual((int(outliers[0]["pid"]), int(outliers[0]["fid"]),
+            int(outliers[0]["window"])), (3, 2, 3))
+        self.assertEqual(width, 19.0 / 4)
+        self.assertEqual(wcounts.tolist(), [0, 0, 0, 1])
+
+    def test_outlier_quantile_floor(self):
+        # half the calls are slow and beyond the MAD threshold, a floor
+        # at the top quantile holds them back
+        calls = map(lambda i:(float(i), 2, "read", 1, 10,
+            0.001 * (1 + i % 2 * 9), 10, 0), range(0, 20))
+        r = self.report(calls)
+        self.assertEqual(r.outlier_stats()[0][0][5], 10)
+        self.assertEqual(r.outlier_stats(quantile=1.0)[0][0][5], 0)
+
+    def test_latency_heatmap(self):
+        r = self.report([
+            (0.0, 2, "read", 1, 10, 3.0e-4, 10, 0),
+            (0.2, 2, "read", 1, 10, 3.0e-4, 10, 10),
+            (1.0, 2, "read", 1, 10, 0.0, 10, 20),
+            (2.0, 3, "write", 2, 10, 2.0, 10, 0)])
+        names, first, width, counts = r.latency_heatmap(columns=4)
+        self.assertEqual((names, first, width), (["read", "write"], 0.0,
+            0.5))
+        self.assertEqual(map(lambda c:zip(*numpy.nonzero(c)), counts),
+            [[(0, 14), (2, 0)], [(3, 30)]])
+        self.assertEqual(counts[0][0, 14], 2)
+        lines = open("%s/report/data/latency_heatmap.dat"
+            % self.tmpdir).readlines()[1:]
+        self.assertEqual(map(lambda l:l.split()[:2] + l.split()[3:], lines),
+            [["read", "0.000000", "2"], ["read", "1.000000", "1"],
+            ["write", "1.500000", "1"]])
+
+    GROUP_CALLS = [
+        (0.0, 11, "read", 1, 10, 3.0e-4, 10, 0),
+        (1.0, 12, "read", 1, 10, 3.0e-4, 10, 10),
+        (2.0, 13, "write", 2, 10, 2.0, 10, 0),
+        (3.0, 20, "lstat", 3, 0, 0.0, 0, 0),
+        (4.0, 10, "read", 1, 10, 3.0e-4, 10, 20)]
+    # make forks two cc, the first cc forks as, sh is a second root
+    GROUP_PROCS = [
+        (10, 1, 0.0, 5.0, "/bin/make all"),
+        (11, 10, 0.0, 2.0, "/bin/cc a.c"),
+        (12, 11, 1.0, 2.0, "/bin/as a.s"),
+        (13, 10, 2.0, 3.0, "/bin/cc b.c"),
+        (20, 1, 3.0, 4.0, "/bin/sh")]
+
+    def test_pid_groups(self):
+        r = self.report(self.GROUP_CALLS, self.GROUP_PROCS)
+        self.assertEqual(r.pid_groups("exec"), {10:"make", 11:"cc",
+            12:"as", 13:"cc", 20:"sh"})
+        self.assertEqual(r.pid_groups("subtree"), {10:"10-make",
+            11:"11-cc", 12:"11-cc", 13:"13-cc", 20:"20-sh"})
+
+    def test_group_heatmap(self):
+        r = self.report(self.GROUP_CALLS, self.GROUP_PROCS)
+        names, first, width, counts = r.latency_heatmap(columns=4,
+            groups=r.pid_groups("subtree"))
+        self.assertEqual(names, [("read", "10-make"), ("read", "11-cc"),
+            ("write", "13-cc"), ("lstat", "20-sh")])
+        self.assertEqual(map(lambda c:zip(*numpy.nonzero(c)), counts[:2]),
+            [[(3, 14)], [(0, 14), (1, 14)]])
+        lines = open("%s/report/data/latency_heatmap_groups.dat"
+            % self.tmpdir).readlines()[1:]
+        self.assertEqual(map(lambda l:l.split()[0], lines), ["read:10-make",
+            "read:11-cc", "read:11-cc", "write:13-cc", "lstat:20-sh"])
+        # pids outside the groups are left out
+        names, first, width, counts = r.latency_heatmap(columns=4,
+            groups={13:"b"})
+        self.assertEqual((names, counts.sum()), ([("write", "b")], 1))
+
+    def test_group_heatmap_stats(self):
+        r = self.report(self.GROUP_CALLS, self.GROUP_PROCS, pid=11)
+        self.assertEqual(r.group_heatmap_stats("exec"), [
+            ("as", "read", 1, "N/A"), ("cc", "read", 1, "N/A")])
+        r = self.report(self.GROUP_CALLS, self.GROUP_PROCS,
+            klass=HTMLReport, groups="subtree")
+        r.write()
+        index = open("%s/report/index.html" % self.tmpdir).read()
+        self.assertTrue("Latency by Process Group" in index)
+        self.assertTrue("13-cc" in index)
+
+    def test_failure_stats(self):
+        # lstat fails only in the last chunk, its earlier successful
+        # calls still count
+        calls = map(lambda i:(float(i), 2, "lstat", 1, 0, 0.001, 0, 0),
+            range(0, 9))
+        calls += [(9.0, 2, "lstat", 1, -errno.ENOENT, 0.1, 0, 0),
+            (10.0, 3, "lstat", 2, -errno.ENOENT, 0.1, 0, 0),
+            (11.0, 3, "read", 2, 10, 0.5, 10, 0)]
+        r = self.report(calls)
+        r.db.FETCH_ROWS = 4
+        stats = r.failure_stats()
+        self.assertEqual(len(stats), 1)
+        self.assertEqual(stats[0][:3], ("lstat", 11, 2))
+        self.assertAlmostEqual(stats[0][3], 0.001)
+        self.assertAlmostEqual(stats[0][6], 0.1)
+        self.assertTrue(0.0009 < stats[0][4] < 0.0011)
+        self.assertTrue(0.09 < stats[0][7] < 0.11)
+
+    def test_concurrency_stats(self):
+        # stamps are completion times, the calls are in flight over
+        # [0, 1] and [0.5, 3]
+        r = self.report([
+            (1.0, 2, "read", 1, 10, 1.0, 10, 0),
+            (3.0, 3, "write", 2, 10, 2.5, 10, 0)])
+        total, sysc, files, profile = r.concurrency_stats(windows=3)
+        self.assertEqual(total, (None, 2, 2, 3.5 / 3, 1.0))
+        self.assertEqual(sysc, [("read", 1, 1, 1.0, 1.0),
+            ("write", 1, 1, 1.0, 1.0)])
+        self.assertEqual(map(lambda f:f[:3], files), [(1, 1, 1), (2, 1, 1)])
+        self.assertEqual(profile[1].tolist(), [2, 1, 1])
+
+    def test_overwrite_stats(self):
+        r = self.report([
+            (0.0, 2, "write", 1, 10, 0.1, 10, 0),
+            (1.0, 2, "write", 1, 10, 0.1, 10, 5),
+            (2.0, 3, "write", 1, 5, 0.1, 5, 5),
+            (3.0, 3, "write", 1, 10, 0.1, 10, 20),
+            (4.0, 3, "write", 1, 10, 0.1, 10, 20),
+            (5.0, 3, "write", 2, 4, 0.1, 4, 0),
+            # failed and empty writes are no writes
+            (6.0, 3, "write", 2, -28, 0.1, 4, 0),
+            (7.0, 3, "write", 2, 0, 0.1, 4, 4)])
+        total, files, regions = r.overwrite_stats()
+        self.assertEqual(total, (2, 6, 49, 29, 1, 4))
+        self.assertEqual(files, [(1, 5, 45, 25, 3), (2, 1, 4, 4, 1)])
+        self.assertEqual(regions, [(1, 5, 5, 10, 3), (1, 20, 10, 10, 2)])
+
+    def test_lifecycle_stats(self):
+        r = self.report([
+            (0.0, 2, "write", 1, 100, 0.1, 100, 0),
+            (0.5, 3, "read", 3, 10, 0.1, 10, 0),
+            (1.0, 2, "write", 1, 50, 0.1, 50, 100),
+            (1.2, 2, "write", 3, 30, 0.1, 30, 0),
+            (1.5, 2, "write", 2, 20, 0.1, 20, 0),
+            (2.0, 3, "read", 1, 60, 0.1, 60, 0),
+            (2.2, 3, "read", 2, 20, 0.1, 20, 0),
+            (2.5, 4, "read", 1, 10, 0.1, 10, 60),
+            (3.0, 3, "unlink", 1, 0, 0.1, 0, 0),
+            (4.0, 5, "read", 1, -2, 0.1, 10, 0),
+            (5.0, 3, "unlink", 3, 0, 0.1, 0, 0)])
+        files, profile, written = r.lifecycle_stats(windows=2)
+        # file 2 is never unlinked, file 3 is read before it is written
+        self.assertEqual(files, [(1, 150, 150, 70, 1, 2, 0.0, 2.0, 3.0)])
+        self.assertEqual(profile[0].tolist(), [0.0, 1.5])
+        self.assertEqual(profile[1].tolist(), [150, 150])
+        self.assertEqual(written, 200)
+
+    def test_proctree_stats(self):
+        # 10 forks 11 and 12, 11 forks 13 and 14, 20 is a second root
+        r = self.report([
+            (2.0, 14, "read", 1, 10, 0.25, 10, 0),
+            (3.0, 12, "write", 2, 10, 0.5, 10, 0),
+            (4.0, 20, "lstat", 3, 0, 1.0, 0, 0)], [
+            (10, 1, 0.0, 10.0, "/bin/a", 1.0),
+            (11, 10, 1.0, 3.0, "/bin/b"),
+            (12, 10, 1.0, 6.0, "/bin/c"),
+            (13, 11, 2.0, 3.0, "/bin/d", 2.0, 1.0),
+            (14, 11, 2.0, 3.0, "/bin/e"),
+            (20, 1, 0.0, 10.0, "/bin/f", 0.5)])
+        summary, fanout, subtrees, chain = r.proctree_stats(top=3)
+        self.assertEqual(summary, (6, 2, 2, 4, 2, 2.0))
+        self.assertEqual(fanout, [(0, 4), (2, 2)])
+        # ranked by CPU plus read and write time of the whole subtree
+        self.assertEqual(subtrees, [
+            (10, "/bin/a", 0, 2, 5, 4.0, 0.75),
+            (11, "/bin/b", 1, 2, 3, 3.0, 0.25),
+            (13, "/bin/d", 2, 0, 1, 3.0, 0.0)])
+        self.assertEqual(chain, (15.0, [(10, "/bin/a", 10.0),
+            (12, "/bin/c", 5.0)]))
+
+if __name__ == "__main__":
+    unittest.main()
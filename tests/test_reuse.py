@@ -0,0 +1,107 @@
+#############################################################################
+# ParaTrac: Scalable Tracking Tools for Parallel Applications
+# Copyright (C) 2009,2010  Nan Dun <dunnan@yl.is.s.u-tokyo.ac.jp>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#############################################################################
+
+#
+# tests/test_reuse.py
+# Stack distances against known strings and LRU simulation
+#
+
+import random
+import unittest
+
+from fs import reuse
+from fs import cachesim
+from tests import TraceTestCase
+
+def naive_distances(keys):
+    stack = []
+    res = []
+    for k in keys:
+        if k in stack:
+            d = stack.index(k)
+            stack.remove(k)
+        else:
+            d = -1
+        stack.insert(0, k)
+        res.append(d)
+    return res
+
+class StackDistanceTest(unittest.TestCase):
+    def test_short_string(self):
+        sd = reuse.StackDistance()
+        self.assertEqual(map(sd.access, "abcbaac"), [-1, -1, -1, 1, 2, 0, 2])
+
+    def test_compaction(self):
+        # far more accesses than tree positions
+        rand = random.Random(1)
+        keys = map(lambda i:rand.randrange(50), range(0, 5000))
+        sd = reuse.StackDistance()
+        self.assertEqual(map(sd.access, keys), naive_distances(keys))
+
+    def test_growth(self):
+        # the tree starts small and doubles with the distinct keys
+        rand = random.Random(3)
+        keys = range(0, 300) + map(lambda i:rand.randrange(300),
+            range(0, 3000))
+        sd = reuse.StackDistance()
+        self.assertEqual(len(sd.tree), sd.MIN_CAPACITY + 1)
+        self.assertEqual(map(sd.access, keys), naive_distances(keys))
+        self.assertTrue(300 <= sd.cap <= 600)
+
+    def test_histogram(self):
+        h = reuse.DistanceHistogram()
+        h.update([-1, -1, -1, 1])
+        h.update([2, 0, 2])
+        self.assertEqual(h.counts.tolist(), [1, 1, 2])
+        self.assertEqual((h.cold, h.total), (3, 7))
+        sizes, miss = h.miss_ratio([1, 2, 3, 10])
+        self.assertEqual(map(lambda m:round(m * 7, 9), miss.tolist()),
+            [6, 5, 3, 3])
+        self.assertEqual(h.working_set(0.9), 3)
+
+    def test_lru_equivalence(self):
+        rand = random.Random(2)
+        keys = map(lambda i:rand.randrange(30), range(0, 2000))
+        sd = reuse.StackDistance()
+        h = reuse.DistanceHistogram()
+        h.update(map(sd.access, keys))
+        sizes, miss = h.miss_ratio([1, 4, 16, 64])
+        for size, m in zip(sizes.tolist(), miss.tolist()):
+            lru = cachesim.LRUCache(size)
+            nhits = sum(map(lru.access, keys))
+            self.assertEqual(int(round((1 - m) * len(keys))), nhits)
+
+class ReuseAnalysisTest(TraceTestCase):
+    def test_per_file(self):
+        # blocks of file 1: 0 1 0, of file 2: 0 0
+        db = self.trace([
+            (0.0, 2, "read", 1, 10, 0.1, 10, 0),
+            (1.0, 2, "read", 2, 10, 0.1, 10, 0),
+            (2.0, 2, "read", 1, 10, 0.1, 10, 4096),
+            (3.0, 2, "read", 2, 10, 0.1, 10, 0),
+            (4.0, 2, "read", 1, 10, 0.1, 10, 0)])
+        hist, files = reuse.ReuseAnalysis(db, 4096).run()
+        self.assertEqual(hist.counts.tolist(), [0, 1, 1])
+        self.assertEqual(hist.cold, 3)
+        self.assertEqual(sorted(files.keys()), [1, 2])
+        self.assertEqual(files[1].counts.tolist(), [0, 1])
+        self.assertEqual(files[2].counts.tolist(), [1])
+        self.assertEqual((files[1].cold, files[2].cold), (2, 1))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+#############################################################################
+# ParaTrac: Scalable Tracking Tools for Parallel Applications
+# Copyright (C) 2009,2010  Nan Dun <dunnan@yl.is.s.u-tokyo.ac.jp>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#############################################################################
+
+#
+# tests/test_schedsim.py
+# Workflow scheduling simulation on a fork of two children
+#
+
+import unittest
+
+from fs import schedsim
+from tests import TraceTestCase
+
+class WorkflowSimTest(TraceTestCase):
+    def setUp(self):
+        TraceTestCase.setUp(self)
+        # p2 computes 4 of its 10 seconds and forks p3 and p4 half way
+        # through its lifetime, they compute for 2 and 3 seconds
+        self.trace([(0.0, 2, "lstat", 1, 0, 0.1, 0, 0)], [
+            (2, 1, 0.0, 10.0, "/bin/p", 3.0, 1.0),
+            (3, 2, 5.0, 9.0, "/bin/c", 2.0),
+            (4, 2, 5.0, 8.0, "/bin/c", 3.0)])
+        self.sim = schedsim.WorkflowSim(self.db, {})
+
+    def test_tasks(self):
+        self.assertEqual(self.sim.tasks.keys(), [2, 3, 4])
+        t = self.sim.tasks[2]
+        self.assertEqual((t.compute, t.io, t.npred), (4.0, 0.0, 0))
+        self.assertEqual(map(lambda (s, f):(s.pid, f), t.succ),
+            [(3, 0.5), (4, 0.5)])
+        self.assertEqual(self.sim.measured(), 10.0)
+
+    def test_unlimited_cores(self):
+        # children are released 2 seconds into p2
+        self.assertEqual(self.sim.run(), (5.0, None, 0.0))
+        self.assertEqual(self.sim.run(cpu_scale=2.0)[0], 2.5)
+
+    def test_one_core(self):
+        # critical and longest run p4 first, fifo breaks the tie by pid
+        self.assertEqual(self.sim.run(1, "critical"), (9.0, 1.0, 7.0 / 3))
+        self.assertEqual(self.sim.run(1, "longest"), (9.0, 1.0, 7.0 / 3))
+        self.assertEqual(self.sim.run(1, "fifo"), (9.0, 1.0, 2.0))
+        # with two cores p3 waits for p2 to finish
+        self.assertEqual(self.sim.run(2, "critical")[0], 6.0)
+        self.assertRaises(ValueError, self.sim.run, 1, "random")
+
+if __name__ == "__main__":
+    unittest.main()
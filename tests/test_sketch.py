@@ -0,0 +1,86 @@
+#############################################################################
+# ParaTrac: Scalable Tracking Tools for Parallel Applications
+# Copyright (C) 2009,2010  Nan Dun <dunnan@yl.is.s.u-tokyo.ac.jp>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#############################################################################
+
+#
+# tests/test_sketch.py
+# Stream summaries against exact counts
+#
+
+import unittest
+
+from modules import sketch
+
+class TopKTest(unittest.TestCase):
+    def test_exact_within_capacity(self):
+        top = sketch.TopK(3)
+        for key, w in [("a", 5), ("b", 1), ("a", 2), ("c", 4), ("b", 1)]:
+            top.update(key, w)
+        self.assertTrue(top.exact())
+        self.assertEqual(top.total, 13)
+        self.assertEqual(top.top(2), [("a", 7, 0), ("c", 4, 0)])
+        self.assertEqual(top.top(5), [("a", 7, 0), ("c", 4, 0),
+            ("b", 2, 0)])
+
+    def test_eviction_inherits_minimum(self):
+        top = sketch.TopK(2)
+        for key in "aabc":
+            top.update(key)
+        # b (1) is evicted, c takes over its count as error
+        self.assertFalse(top.exact())
+        self.assertEqual(top.evicted, 1)
+        self.assertEqual(sorted(top.top(2)), [("a", 2, 0), ("c", 2, 1)])
+        top.update("c", 3)
+        self.assertEqual(top.top(1), [("c", 5, 1)])
+
+    def test_heavy_hitter_survives(self):
+        top = sketch.TopK(4)
+        for i in range(0, 1000):
+            top.update("hot")
+            top.update(i)
+        key, count, error = top.top(1)[0]
+        self.assertEqual(key, "hot")
+        # Space-Saving never underestimates
+        self.assertTrue(count - error <= 1000 <= count)
+
+class LogHistogramTest(unittest.TestCase):
+    def test_quantiles_within_relative_error(self):
+        h = sketch.LogHistogram()
+        h.update(range(1, 1001))
+        err = 2.0 ** (1.0 / h.scale) - 1.0
+        self.assertEqual(h.total, 1000)
+        for q, exact in [(0.001, 1), (0.5, 500), (0.9, 900), (1.0, 1000)]:
+            self.assertTrue(abs(h.quantile(q) - exact) <= err * exact,
+                (q, h.quantile(q)))
+
+    def test_buckets(self):
+        h = sketch.LogHistogram(bins_per_octave=1, min_value=1.0,
+            max_value=8.0)
+        self.assertEqual(h.nbins, 5)
+        self.assertEqual(h.bucket([0.0, 0.5, 1.0, 1.9, 2.0, 7.9, 1.0e9])
+            .tolist(), [0, 0, 1, 1, 2, 3, 4])
+        self.assertEqual(h.value(0), 0.0)
+        self.assertEqual(h.value(2), 2.0 ** 1.5)
+
+    def test_small_and_empty(self):
+        h = sketch.LogHistogram()
+        self.assertEqual(h.quantile(0.5), 0.0)
+        h.update([0.0, 1.0e-12, 1.0e-12])
+        self.assertEqual(h.quantile(0.5), 0.0)
+
+if __name__ == "__main__":
+    unittest.main()
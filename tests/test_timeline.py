@@ -0,0 +1,73 @@
+#############################################################################
+# ParaTrac: Scalable Tracking Tools for Parallel Applications
+# Copyright (C) 2009,2010  Nan Dun <dunnan@yl.is.s.u-tokyo.ac.jp>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#############################################################################
+
+#
+# tests/test_timeline.py
+# Trace-event JSON export
+#
+
+import json
+import unittest
+
+from fs.timeline import TimelineExport
+from tests import TraceTestCase, BTIME
+
+class TimelineExportTest(TraceTestCase):
+    def setUp(self):
+        TraceTestCase.setUp(self)
+        self.trace([
+            (0.0, 2, "open", 1, 0, 0.25, 0, 0),
+            (2.0, 2, "read", 1, 10, 0.5, 10, 0),
+            (4.0, 3, "write", 2, 10, 1.0, 10, 0)],
+            [(2, 1, -1.0, 5.0, "/bin/a"), (3, 2, 1.0, 5.0, "/bin/b")])
+        self.path = "%s/timeline.json" % self.tmpdir
+
+    def events(self):
+        res = json.load(open(self.path))
+        calls = {}
+        lives = {}
+        for e in res["traceEvents"]:
+            if e["ph"] != "X": continue
+            if e["tid"] == 0: lives[e["pid"]] = (e["ts"], e["dur"])
+            else: calls[e["name"]] = (e["pid"], e["ts"], e["dur"])
+        return res, calls, lives
+
+    def test_whole_trace(self):
+        n = TimelineExport(self.db).write(self.path)
+        res, calls, lives = self.events()
+        self.assertEqual(n, 11)
+        self.assertEqual(len(res["traceEvents"]), 11)
+        # the earliest process start is the origin, calls start at
+        # stamp - elapsed
+        self.assertEqual(res["otherData"]["btime"], BTIME - 1.0)
+        self.assertEqual(calls, {"open":(2, 750000.0, 250000.0),
+            "read":(2, 2500000.0, 500000.0),
+            "write":(3, 4000000.0, 1000000.0)})
+        self.assertEqual(lives, {2:(0.0, 6000000.0), 3:(2000000.0,
+            4000000.0)})
+
+    def test_window_by_start_time(self):
+        # read completes in the window but starts before it
+        self.db.set_scope(1.6, 3.5)
+        self.assertEqual(TimelineExport(self.db).write(self.path), 9)
+        res, calls, lives = self.events()
+        self.assertEqual(calls, {"write":(3, 1400000.0, 1000000.0)})
+        self.assertEqual(sorted(lives.keys()), [2, 3])
+
+if __name__ == "__main__":
+    unittest.main()
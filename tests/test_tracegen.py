@@ -0,0 +1,65 @@
+#############################################################################
+# ParaTrac: Scalable Tracking Tools for Parallel Applications
+# Copyright (C) 2009,2010  Nan Dun <dunnan@yl.is.s.u-tokyo.ac.jp>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#############################################################################
+
+#
+# tests/test_tracegen.py
+# Synthetic traces and their import
+#
+
+import unittest
+
+import numpy
+
+from fs import analysis
+from fs.tracegen import TraceGenerator
+from fs.data import Database
+from tests import TraceTestCase
+
+class TraceGeneratorTest(TraceTestCase):
+    def generate(self, path, **kws):
+        TraceGenerator(procs=4, files=8, calls=202, duration=10.0,
+            **kws).write(path)
+        return open("%s/sysc.log" % path).read()
+
+    def test_deterministic(self):
+        a = self.generate("%s/a" % self.tmpdir, seed=3)
+        b = self.generate("%s/b" % self.tmpdir, seed=3)
+        c = self.generate("%s/c" % self.tmpdir, seed=4)
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, c)
+
+    def test_import(self):
+        self.generate(self.tmpdir)
+        self.db = Database("%s/trace.sqlite" % self.tmpdir)
+        self.db.import_logs()
+        calls = self.db.sysc_arrays("stamp,pid,res")
+        self.assertEqual(len(calls), 202)
+        self.assertEqual(calls.stamp[0], 0.0)
+        self.assertTrue((numpy.diff(calls.stamp) >= 0).all())
+        self.assertTrue(calls.stamp[-1] < 10.0)
+        # calls are split evenly over the processes below init
+        pids, counts = analysis.group_sum(calls.pid)
+        self.assertEqual(pids.tolist(), [2, 3, 4, 5])
+        self.assertEqual(sorted(counts.tolist()), [50, 50, 51, 51])
+        procs = self.db.proc_sel("pid,ppid")
+        self.assertEqual(sorted(procs), [(1, 0), (2, 1), (3, 2), (4, 2),
+            (5, 2)])
+        self.assertEqual(len(self.db.file_sel("fid")), 8)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+#############################################################################
+# ParaTrac: Scalable Tracking Tools for Parallel Applications
+# Copyright (C) 2009,2010  Nan Dun <dunnan@yl.is.s.u-tokyo.ac.jp>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#############################################################################
+
+#
+# tests/test_utils.py
+# Utility routines
+#
+
+import sys
+import unittest
+
+from modules import utils
+
+class LazyModuleTest(unittest.TestCase):
+    def test_import_on_first_use(self):
+        calls = []
+        sys.modules.pop("colorsys", None)
+        mod = utils.LazyModule("colorsys", lambda:calls.append(1))
+        self.assertFalse(sys.modules.has_key("colorsys"))
+        self.assertEqual(calls, [])
+        self.assertEqual(mod.rgb_to_hsv(1.0, 0.0, 0.0), (0.0, 1.0, 1.0))
+        self.assertTrue(sys.modules.has_key("colorsys"))
+        mod.hsv_to_rgb(0.0, 0.0, 0.0)
+        self.assertEqual(calls, [1])
+
+    def test_missing_module(self):
+        mod = utils.LazyModule("paratrac_no_such_module")
+        self.assertRaises(ImportError, getattr, mod, "anything")
+
+if __name__ == "__main__":
+    unittest.main()
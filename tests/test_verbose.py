@@ -0,0 +1,69 @@
+#############################################################################
+# ParaTrac: Scalable Tracking Tools for Parallel Applications
+# Copyright (C) 2009,2010  Nan Dun <dunnan@yl.is.s.u-tokyo.ac.jp>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#############################################################################
+
+#
+# tests/test_verbose.py
+# Progress meter
+#
+
+import tempfile
+import time
+import unittest
+
+from modules import verbose
+
+class ProgressTest(unittest.TestCase):
+    def setUp(self):
+        self.pgs = verbose.Progress(tty=False)
+        self.pgs.t_start = self.pgs.t_advance = time.time()
+
+    def test_stages(self):
+        pgs = self.pgs
+        pgs.stage_begin("outer")
+        pgs.advance(2, 10)
+        pgs.stage_begin("inner", 100)
+        pgs.advance(3, 40)
+        name, rows, nbytes, _, _, done, eta = pgs.progress()
+        self.assertEqual((name, rows, nbytes, done), ("inner", 3, 40, 0.4))
+        self.assertTrue(eta is not None)
+        pgs.stage_end()
+        name, rows, nbytes, _, _, done, eta = pgs.progress()
+        self.assertEqual((name, rows, nbytes, done, eta),
+            ("outer", 5, 50, None, None))
+        self.assertEqual((pgs.rows, pgs.bytes), (5, 50))
+        line = pgs.structured()
+        self.assertTrue(line.startswith("progress: state=running "))
+        self.assertTrue(" stage=outer rows=5 bytes=50 " in line)
+
+    def test_metered_lines(self):
+        f = tempfile.TemporaryFile()
+        f.write("a\nbb\nccc\n")
+        f.seek(0)
+        verbose.METER = self.pgs
+        try:
+            self.pgs.stage_begin("import")
+            lines = list(verbose.metered_lines(f, every=2))
+        finally:
+            verbose.METER = None
+            f.close()
+        self.assertEqual(lines, ["a\n", "bb\n", "ccc\n"])
+        self.assertEqual(self.pgs.stages[-1][1:4], [9, 3, 9])
+        self.assertEqual(self.pgs.progress()[5], 1.0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+#############################################################################
+# ParaTrac: Scalable Tracking Tools for Parallel Applications
+# Copyright (C) 2009,2010  Nan Dun <dunnan@yl.is.s.u-tokyo.ac.jp>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#############################################################################
+
+#
+# tests/test_workload.py
+# Workload model of a small trace and traces generated from it
+#
+
+import random
+import unittest
+
+from modules.utils import SYSCALL
+from fs import workload
+from fs.data import Database
+from tests import TraceTestCase
+
+class SampleTest(unittest.TestCase):
+    def test_quantiles(self):
+        q = workload.quantiles(range(0, 101))
+        self.assertEqual(len(q), 21)
+        self.assertEqual((q[0], q[1], q[-1]), (0.0, 5.0, 100.0))
+        self.assertTrue(workload.quantiles([]) is None)
+
+    def test_sample(self):
+        q = workload.quantiles(range(0, 101))
+        rand = random.Random(0)
+        values = map(lambda i:workload.sample(q, rand), range(0, 1000))
+        self.assertTrue(min(values) >= 0.0 and max(values) <= 100.0)
+        self.assertEqual(workload.sample(None, rand), 0.0)
+
+    def test_choice(self):
+        rand = random.Random(0)
+        picks = map(lambda i:workload.choice("ab", [0, 1], rand),
+            range(0, 100))
+        self.assertEqual(set(picks), set(["b"]))
+
+class WorkloadModelTest(TraceTestCase):
+    def setUp(self):
+        TraceTestCase.setUp(self)
+        # two cat processes read file 1 sequentially, one cp writes
+        # file 2 and fails once
+        self.trace([
+            (0.0, 2, "open", 1, 0, 0.001, 0, 0),
+            (1.0, 2, "read", 1, 10, 0.002, 10, 0),
+            (2.0, 2, "read", 1, 10, 0.002, 10, 10),
+            (3.0, 2, "read", 1, 10, 0.002, 10, 20),
+            (4.0, 3, "read", 1, 10, 0.002, 10, 0),
+            (5.0, 4, "write", 2, 20, 0.004, 20, 0),
+            (6.0, 4, "write", 2, -28, 0.004, 20, 0)],
+            [(2, 1, 0.0, 4.0, "/bin/cat a", 1.0, 1.0),
+             (3, 2, 4.0, 5.0, "/bin/cat b"),
+             (4, 1, 5.0, 8.0, "/bin/cp")])
+        self.model = workload.WorkloadModel().fit(self.db)
+
+    def test_fit(self):
+        m = self.model
+        self.assertEqual((m["duration"], m["files"], m["shared_files"]),
+            (6.0, 2, 1))
+        self.assertEqual(sorted(m["classes"].keys()), ["cat", "cp"])
+        cat = m["classes"]["cat"]
+        self.assertEqual((cat["procs"], cat["parents"], cat["shared"]),
+            (2, {"":1, "cat":1}, 1.0))
+        self.assertEqual(cat["cpu"], [0.2, 0.2])
+        self.assertEqual((cat["start"][0], cat["start"][-1]), (0.0, 4.0 / 6))
+        self.assertEqual((cat["calls"][0], cat["calls"][-1]), (1.0, 4.0))
+        self.assertEqual(cat["interarrival"], [1.0] * 21)
+        # pid 2 opens then reads, pid 3 only reads
+        self.assertEqual(cat["sysc"], ["read", "open"])
+        self.assertEqual(cat["initial"], [0.5, 0.5])
+        self.assertEqual(cat["transition"], [[1.0, 0.0], [1.0, 0.0]])
+        self.assertEqual(cat["size"], {"read":[[10, 1.0]]})
+        self.assertEqual(cat["pattern"], {"read":[1.0, 0.0, 0.0, 0.0]})
+        self.assertEqual(cat["extent"], [30.0] * 21)
+        self.assertEqual(cat["latency"]["open"], [0.001] * 21)
+        self.assertEqual(cat["errors"], {})
+        cp = m["classes"]["cp"]
+        self.assertEqual(cp["errors"], {"write":[0.5, "ENOSPC"]})
+        self.assertEqual(cp["lifetime"], [3.0] * 21)
+
+    def test_unknown_class(self):
+        # calls of processes that were not traced form class unknown
+        self.db.close()
+        self.trace([
+            (0.0, 2, "read", 1, 10, 0.002, 10, 0),
+            (1.0, 9, "read", 1, 10, 0.002, 10, 10),
+            (2.0, 9, "read", 1, 10, 0.002, 10, 20)],
+            [(2, 1, 0.0, 4.0, "/bin/cat a")])
+        m = workload.WorkloadModel().fit(self.db)
+        self.assertEqual(sorted(m["classes"].keys()), ["cat", "unknown"])
+        unknown = m["classes"]["unknown"]
+        self.assertEqual((unknown["procs"], unknown["calls"][-1]), (0, 2.0))
+        self.assertEqual(m["classes"]["cat"]["calls"], [1.0] * 21)
+
+    def test_save_load(self):
+        path = "%s/model.json" % self.tmpdir
+        workload.WorkloadModel(self.model).save(path)
+        self.assertEqual(workload.WorkloadModel().load(path), self.model)
+
+    def test_generate(self):
+        path = "%s/gen" % self.tmpdir
+        gen = workload.ModelGenerator(self.model, scale=2.0, seed=1)
+        self.assertEqual(gen.counts, {"cat":4, "cp":2})
+        gen.write(path)
+        db = Database("%s/trace.sqlite" % path)
+        db.import_logs()
+        calls = db.sysc_arrays("pid,sysc,res,aux1")
+        cmds = map(lambda p:p[0].split(" ")[0], db.proc_sel("cmdline"))
+        db.close()
+        self.assertEqual(sorted(filter(lambda c:c != "/sbin/init", cmds)),
+            ["/usr/bin/cat"] * 4 + ["/usr/bin/cp"] * 2)
+        self.assertTrue(set(calls.sysc.tolist()) <= set([SYSCALL["open"],
+            SYSCALL["read"], SYSCALL["write"]]))
+        # request sizes come from the model
+        ok = calls.res >= 0
+        reads = calls.aux1[ok & (calls.sysc == SYSCALL["read"])]
+        writes = calls.aux1[ok & (calls.sysc == SYSCALL["write"])]
+        self.assertEqual(set(reads.tolist()), set([10]))
+        self.assertEqual(set(writes.tolist()) - set([20]), set())
+
+    def test_deterministic(self):
+        logs = []
+        for name in ["a", "b"]:
+            path = "%s/%s" % (self.tmpdir, name)
+            workload.ModelGenerator(self.model, seed=5).write(path)
+            logs.append(open("%s/sysc.log" % path).read())
+        self.assertEqual(logs[0], logs[1])
+
+if __name__ == "__main__":
+    unittest.main()